@@ -1,36 +1,304 @@
 """FastAPI server for Chatbruti API."""
 
+import asyncio
+import contextvars
+import heapq
+import hmac
+import json
 import logging
-import uuid
-from typing import Dict, List, Optional
+import math
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 
+# Optional faster JSON rendering for read-heavy endpoints
+try:
+    import orjson  # noqa: F401 (required by ORJSONResponse)
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+# Optional HTTP client for forwarding requests between cluster nodes
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 from ..config import get_settings
-from ..models import create_model
-from ..utils import get_system_prompt, ConversationHistory
+from ..models import (
+    BaseModelInterface,
+    GenerationCancelled,
+    ModelSwapper,
+    TrafficMirror,
+    create_model,
+)
+from ..utils import (
+    get_system_prompt,
+    ConversationHistory,
+    ConversationCompactor,
+    SessionIndex,
+    QuotaExceeded,
+    UsageTracker,
+    AdmissionController,
+    AdmissionRejected,
+    PRIORITIES,
+    Cluster,
+    DegradationPolicy,
+    IdempotencyConflict,
+    IdempotencyStore,
+    request_fingerprint,
+    TrafficRecorder,
+    AllocationTracer,
+    deep_sizeof,
+    process_memory,
+    torch_memory,
+    iter_export,
+    snapshot_sessions,
+    AuditLog,
+    setup_queue_logging,
+    tenant_from_headers,
+    metrics,
+)
 
 logger = logging.getLogger(__name__)
 
-# Global model instance
-_model = None
+# Global model instance, replaceable at runtime
+_model_swapper: Optional[ModelSwapper] = None
+# Model leased by the current request, so it uses one instance across a swap
+_leased_model: contextvars.ContextVar = contextvars.ContextVar("leased_model", default=None)
 _system_prompt = None
 _conversations: Dict[str, ConversationHistory] = {}
+_session_index = SessionIndex()
+_allocation_tracer = AllocationTracer()
+_compactor: Optional[ConversationCompactor] = None
+_usage_tracker: Optional[UsageTracker] = None
+_admission: Optional[AdmissionController] = None
+_degradation: Optional[DegradationPolicy] = None
+_cluster: Optional[Cluster] = None
+_idempotency_store: Optional[IdempotencyStore] = None
+_mirror: Optional[TrafficMirror] = None
+_traffic_recorder: Optional[TrafficRecorder] = None
+_audit_log: Optional[AuditLog] = None
+_mirror_lock = threading.Lock()
+_cluster_client = None
+_background_tasks: set = set()
+
+# How often in-flight /chat requests check whether the client went away
+DISCONNECT_POLL_SECONDS = 0.25
+
+# Longest accepted Idempotency-Key header
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Prompt generated by a hot-swapped model before it serves traffic
+WARMUP_PROMPT = "Hello"
+# Settings a hot swap may change besides backend and model_name; file paths,
+# endpoints and credentials stay as configured on the server
+SWAPPABLE_SETTINGS = frozenset({
+    "device", "torch_dtype",
+    "draft_model_name", "num_assistant_tokens", "prompt_lookup_num_tokens",
+    "onnx_quantize", "onnx_num_threads",
+    "gguf_n_ctx", "gguf_n_threads", "gguf_n_batch", "gguf_cache_mb", "gguf_chat_format",
+    "groq_max_retries", "groq_timeout", "reasoning_effort",
+    "router_small_backend", "router_small_model", "router_large_backend",
+    "router_threshold", "router_shadow_rate",
+    "pool_backend", "pool_replicas", "pool_core_sets",
+    "max_new_tokens", "temperature", "top_p", "top_k", "do_sample",
+})
+
+# Set on requests forwarded to a session's owner, which serves them as-is
+FORWARDED_HEADER = "x-chatbruti-forwarded"
+# Shared secret (CLUSTER_KEY) proving a request came from another node
+FORWARDED_KEY_HEADER = "x-chatbruti-cluster-key"
+# Connection-level headers not copied between forwarded requests and responses
+HOP_HEADERS = {
+    "host", "connection", "keep-alive", "transfer-encoding",
+    "content-length", "content-encoding", "accept-encoding",
+}
+
+
+def get_model_swapper() -> ModelSwapper:
+    """Get or create the holder of the serving model."""
+    global _model_swapper
+    if _model_swapper is None:
+        _model_swapper = ModelSwapper(drain_timeout=get_settings().model_swap_drain_timeout)
+    return _model_swapper
 
 
 def get_model():
-    """Get or initialize the model."""
-    global _model
-    if _model is None:
+    """Get or initialize the model (the one leased by the current request, if any)."""
+    leased = _leased_model.get()
+    if leased is not None:
+        return leased
+    swapper = get_model_swapper()
+    if swapper.current is None:
         settings = get_settings()
-        logger.info(f"Initializing model with backend: {settings.backend}")
-        _model = create_model(backend=settings.backend, settings=settings)
-        _model.load()
+        logger.info("Initializing model with backend: %s", settings.backend)
+        model = create_model(backend=settings.backend, settings=settings)
+        model.load()
+        swapper.current = model
         logger.info("Model loaded successfully")
-    return _model
+    return swapper.current
+
+
+@contextmanager
+def _model_lease() -> Iterator[BaseModelInterface]:
+    """
+    Pin the current model for a generation.
+    
+    ``get_model()`` returns the leased model inside the block (including in
+    worker threads started from it), and a hot swap waits for the block to
+    exit before freeing it.
+    """
+    with get_model_swapper().lease() as model:
+        token = _leased_model.set(model)
+        try:
+            yield model
+        finally:
+            _leased_model.reset(token)
+
+
+def _copy_settings(settings, **update):
+    """Copy settings with some fields replaced."""
+    if hasattr(settings, "model_copy"):
+        return settings.model_copy(update=update)
+    return settings.copy(update=update)
+
+
+def get_traffic_recorder() -> Optional[TrafficRecorder]:
+    """Get or create the /chat traffic recorder (None when capture is off)."""
+    global _traffic_recorder
+    settings = get_settings()
+    if not settings.capture_path:
+        return None
+    if _traffic_recorder is None:
+        _traffic_recorder = TrafficRecorder(
+            settings.capture_path,
+            include_content=settings.capture_content,
+            sample_rate=settings.capture_sample_rate,
+            queue_size=settings.capture_queue_size,
+        )
+        logger.info("Capturing /chat traffic to %s", _traffic_recorder.path)
+    return _traffic_recorder
+
+
+def get_audit_log() -> Optional[AuditLog]:
+    """Get or create the conversation audit log (None when it is off)."""
+    global _audit_log
+    settings = get_settings()
+    if not settings.audit_log_dir:
+        return None
+    if _audit_log is None:
+        _audit_log = AuditLog(
+            settings.audit_log_dir,
+            max_file_bytes=settings.audit_max_file_mb << 20,
+            max_files=settings.audit_max_files,
+            queue_size=settings.audit_queue_size,
+            flush_seconds=settings.audit_flush_seconds,
+        )
+        logger.info("Writing conversation audit log to %s", settings.audit_log_dir)
+    return _audit_log
+
+
+def _audit_turn(
+    source: str,
+    session_id: str,
+    message: str,
+    response: str,
+    usage: Optional[Dict[str, int]] = None,
+    error: Optional[str] = None,
+) -> None:
+    """Queue an audit event for a completed turn, if the audit log is on."""
+    audit = get_audit_log()
+    if audit is None:
+        return
+    fields: Dict[str, Any] = {"source": source, "usage": usage, "error": error}
+    if get_settings().audit_include_content:
+        fields["message"] = message
+        fields["response"] = response
+    audit.record("turn", session_id, **fields)
+
+
+def get_mirror() -> Optional[TrafficMirror]:
+    """Get or create the traffic mirror (None when mirroring is off)."""
+    global _mirror
+    settings = get_settings()
+    if not settings.mirror_backend or settings.mirror_rate <= 0:
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            candidate_settings = _copy_settings(
+                settings,
+                backend=settings.mirror_backend,
+                model_name=settings.mirror_model_name or settings.model_name,
+            )
+            _mirror = TrafficMirror(
+                build=lambda: create_model(
+                    backend=settings.mirror_backend, settings=candidate_settings
+                ),
+                rate=settings.mirror_rate,
+                max_concurrency=settings.mirror_max_concurrency,
+                timeout_seconds=settings.mirror_timeout_seconds,
+            )
+    return _mirror
+
+
+def _mirror_turn(
+    prompt: str,
+    system_prompt: Optional[str],
+    history: List[Dict[str, str]],
+    temperature: Optional[float],
+    params: Dict[str, Any],
+    latency: float,
+    usage: Optional[Dict[str, int]] = None,
+    error: Optional[str] = None,
+    ttft: Optional[float] = None,
+) -> None:
+    """Copy a served turn to the candidate model if it is sampled (never blocks)."""
+    mirror = get_mirror()
+    if mirror is not None:
+        mirror.submit(
+            prompt,
+            system_prompt,
+            history,
+            {"temperature": temperature, **params},
+            {"latency": latency, "usage": usage, "error": error, "ttft": ttft},
+        )
+
+
+def _warm_up(model: BaseModelInterface) -> None:
+    """Run a short generation on a newly loaded model before it takes traffic."""
+    response = model.generate(
+        prompt=WARMUP_PROMPT,
+        system_prompt=get_system_prompt_cached(),
+        max_new_tokens=8,
+    )
+    if not isinstance(response, str):
+        raise RuntimeError(f"Warm-up returned {type(response).__name__}, expected text")
+
+
+def _on_model_swapped(model: BaseModelInterface) -> None:
+    """Adapt the admission limit to a new model (call from the event loop)."""
+    if _admission is not None and not get_settings().admission_max_concurrency:
+        _admission.resize(model.max_concurrency)
 
 
 def get_system_prompt_cached():
@@ -41,6 +309,377 @@ def get_system_prompt_cached():
     return _system_prompt
 
 
+def get_compactor() -> ConversationCompactor:
+    """Get or create the conversation compactor."""
+    global _compactor
+    if _compactor is None:
+        settings = get_settings()
+        _compactor = ConversationCompactor(
+            token_threshold=settings.compaction_token_threshold,
+            keep_messages=settings.compaction_keep_messages,
+            max_summary_tokens=settings.compaction_max_tokens,
+        )
+    return _compactor
+
+
+def get_usage_tracker() -> UsageTracker:
+    """Get or create the usage tracker."""
+    global _usage_tracker
+    if _usage_tracker is None:
+        settings = get_settings()
+        _usage_tracker = UsageTracker(
+            window_seconds=settings.quota_window_seconds,
+            requests_per_window=settings.tenant_requests_per_window,
+            tokens_per_window=settings.tenant_tokens_per_window,
+            session_token_limit=settings.session_token_limit,
+            max_tenants=settings.usage_max_tenants,
+        )
+    return _usage_tracker
+
+
+def get_admission() -> AdmissionController:
+    """Get or create the admission controller (requires the model to be loaded)."""
+    global _admission
+    if _admission is None:
+        settings = get_settings()
+        _admission = AdmissionController(
+            max_concurrency=settings.admission_max_concurrency or get_model().max_concurrency,
+            max_queue=settings.admission_max_queue,
+            max_wait_seconds={
+                "interactive": settings.admission_max_wait_seconds,
+                "api": settings.admission_max_wait_seconds,
+                "batch": settings.admission_batch_max_wait_seconds,
+            },
+        )
+    return _admission
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Get or create the store of /chat results by idempotency key."""
+    global _idempotency_store
+    if _idempotency_store is None:
+        settings = get_settings()
+        _idempotency_store = IdempotencyStore(
+            ttl_seconds=settings.idempotency_ttl_seconds,
+            max_entries=settings.idempotency_max_entries,
+        )
+    return _idempotency_store
+
+
+def get_degradation_policy() -> DegradationPolicy:
+    """Get or create the load degradation policy."""
+    global _degradation
+    if _degradation is None:
+        settings = get_settings()
+        _degradation = DegradationPolicy.from_json(
+            settings.degradation_tiers,
+            cooldown_seconds=settings.degradation_cooldown_seconds,
+        )
+    return _degradation
+
+
+def get_cluster() -> Cluster:
+    """Get or create the cluster membership view."""
+    global _cluster
+    if _cluster is None:
+        settings = get_settings()
+        cluster = Cluster.from_settings(
+            settings.cluster_self_url, settings.cluster_members, settings.cluster_vnodes
+        )
+        if cluster.enabled and httpx is None:
+            raise ImportError(
+                "httpx is required for clustering. Install it with: pip install httpx"
+            )
+        if cluster.enabled and not settings.cluster_key:
+            raise ValueError("CLUSTER_KEY must be set when CLUSTER_MEMBERS is set")
+        _cluster = cluster
+    return _cluster
+
+
+def _get_cluster_client():
+    """Get or create the HTTP client used to reach other nodes."""
+    global _cluster_client
+    if _cluster_client is None:
+        _cluster_client = httpx.AsyncClient(timeout=get_settings().cluster_forward_timeout)
+    return _cluster_client
+
+
+def _new_session_id() -> str:
+    """Random ID for a new session, owned by this node."""
+    return get_cluster().new_session_id()
+
+
+def _is_forwarded(headers) -> bool:
+    """
+    Whether a request was forwarded by another cluster node.
+    
+    The forwarding header is only trusted from a current member with the
+    matching cluster key, so clients cannot make a node serve a session it
+    does not own.
+    """
+    sender = headers.get(FORWARDED_HEADER)
+    if not sender or sender not in get_cluster().members:
+        return False
+    cluster_key = get_settings().cluster_key
+    key = headers.get(FORWARDED_KEY_HEADER)
+    return bool(cluster_key and key) and hmac.compare_digest(key, cluster_key)
+
+
+def _session_owner(session_id: Optional[str], headers) -> Optional[str]:
+    """
+    URL of the node a session's requests belong to, or None to serve here.
+    
+    Requests forwarded by another node are always served by the receiving
+    node, so nodes with briefly different member lists cannot bounce a
+    request around.
+    """
+    if not session_id or _is_forwarded(headers):
+        return None
+    cluster = get_cluster()
+    return None if cluster.is_local(session_id) else cluster.owner(session_id)
+
+
+async def _forward(
+    owner: str,
+    method: str,
+    path: str,
+    headers,
+    content: Optional[bytes] = None,
+):
+    """
+    Send a request to another node.
+    
+    Raises:
+        HTTPException: 502 if the node cannot be reached
+    """
+    headers = {
+        key: value for key, value in headers.items()
+        if key.lower() not in HOP_HEADERS and key.lower() != FORWARDED_KEY_HEADER
+    }
+    headers[FORWARDED_HEADER] = get_cluster().self_url
+    cluster_key = get_settings().cluster_key
+    if cluster_key:
+        headers[FORWARDED_KEY_HEADER] = cluster_key
+    metrics.inc("cluster_forwarded", method=method)
+    try:
+        return await _get_cluster_client().request(
+            method, owner + path, headers=headers, content=content
+        )
+    except httpx.HTTPError as e:
+        metrics.inc("cluster_forward_errors")
+        logger.error("Forwarding %s %s to %s failed: %s", method, path, owner, e)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Session owner unavailable: {owner}"
+        )
+
+
+async def _forward_request(request: Request, owner: str) -> Response:
+    """Proxy an HTTP request to the node owning its session."""
+    path = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+    upstream = await _forward(owner, request.method, path, request.headers, await request.body())
+    return Response(
+        content=upstream.content,
+        status_code=upstream.status_code,
+        headers={
+            key: value for key, value in upstream.headers.items()
+            if key.lower() not in HOP_HEADERS
+        },
+    )
+
+
+async def _migrate_sessions() -> int:
+    """
+    Hand every session this node no longer owns to its new owner.
+    
+    Sessions are sent to the owner's ``/cluster/sessions`` endpoint and
+    dropped here once accepted; backend caches are rebuilt on the owner.
+    Sessions that cannot be sent stay here and are retried on the next
+    membership change.
+    
+    Returns:
+        Number of sessions moved
+    """
+    cluster = get_cluster()
+    headers = {"content-type": "application/json"}
+    
+    moved = 0
+    for session_id in list(_conversations):
+        owner = None if cluster.is_local(session_id) else cluster.owner(session_id)
+        conversation = _conversations.get(session_id)
+        if owner is None or conversation is None:
+            continue
+        try:
+            # Resend if a turn finished while the session was in transit
+            while True:
+                updated_at = conversation.updated_at
+                upstream = await _forward(
+                    owner, "POST", "/cluster/sessions", headers,
+                    json.dumps(conversation.to_state()).encode("utf-8"),
+                )
+                if upstream.status_code != 200 or conversation.updated_at == updated_at:
+                    break
+        except HTTPException:
+            continue
+        if upstream.status_code != 200:
+            logger.warning(
+                "Node %s refused session %s: %s", owner, session_id, upstream.status_code
+            )
+            continue
+        
+        _conversations.pop(session_id, None)
+        _session_index.remove(session_id)
+        get_usage_tracker().forget_session(session_id)
+        moved += 1
+    
+    metrics.inc("cluster_sessions_migrated", moved)
+    logger.info("Moved %s sessions to their new owners", moved)
+    return moved
+
+
+def _generation_params(max_tokens: Optional[int]) -> Dict[str, Any]:
+    """
+    Generation budget for a request under the current load.
+    
+    Call from the event loop once the model is loaded. Under pressure the
+    degradation policy may lower ``max_new_tokens`` and ``reasoning_effort``
+    or route to a faster model.
+    """
+    params: Dict[str, Any] = {"max_new_tokens": max_tokens}
+    policy = get_degradation_policy()
+    if not policy.enabled:
+        return params
+    
+    settings = get_settings()
+    model = get_model()
+    rate_limit = model.get_rate_limit()
+    policy.update(
+        queue_depth=get_admission().queue_depth,
+        latency_seconds=metrics.percentile("generation_seconds", 95),
+        rate_limit_remaining=rate_limit["remaining_fraction"] if rate_limit else None,
+    )
+    params.update(policy.overrides(
+        max_tokens, settings.max_new_tokens, settings.reasoning_effort, model.tunable_parameters
+    ))
+    return params
+
+
+def _request_priority(api_key: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Priority class of a request: widget traffic is interactive, API key traffic is api.
+    
+    An ``X-Priority`` header may lower the priority but never raise it.
+    """
+    priority = "api" if api_key else "interactive"
+    if requested in PRIORITIES and PRIORITIES[requested] > PRIORITIES[priority]:
+        priority = requested
+    return priority
+
+
+def _overloaded(error: AdmissionRejected) -> HTTPException:
+    """503 telling the client when to retry a shed request."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server overloaded, retry later",
+        headers={"Retry-After": str(max(math.ceil(error.retry_after), 1))},
+    )
+
+
+def _quota_detail(error: QuotaExceeded) -> str:
+    """Client-facing message for a quota rejection."""
+    if error.reason == "session_budget":
+        return "Session token budget exhausted"
+    if error.reason == "too_large":
+        return "Request exceeds the request quota"
+    return "Usage quota exceeded"
+
+
+def _enforce_quota(tenant: str, session_id: Optional[str] = None, requests: int = 1) -> None:
+    """
+    Reject a request over quota before it reaches the backend.
+    
+    A full tenant window gives 429 with Retry-After; an exhausted session
+    budget gives 403 and a request larger than the request quota 413, since
+    retrying them later cannot succeed.
+    """
+    try:
+        get_usage_tracker().check(tenant, session_id, requests)
+    except QuotaExceeded as e:
+        logger.warning("Quota exceeded for tenant %s (%s)", tenant, e.reason)
+        if e.reason == "session_budget":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=_quota_detail(e))
+        if e.reason == "too_large":
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=_quota_detail(e)
+            )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=_quota_detail(e),
+            headers={"Retry-After": str(max(math.ceil(e.retry_after), 1))},
+        )
+
+
+def _require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """
+    Dependency guarding admin endpoints with ADMIN_API_KEY.
+    
+    Admin endpoints are disabled (403) while ADMIN_API_KEY is unset.
+    """
+    admin_key = get_settings().admin_api_key
+    if not admin_key:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled; set ADMIN_API_KEY to enable them"
+        )
+    if not (x_admin_key and hmac.compare_digest(x_admin_key, admin_key)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing admin key"
+        )
+
+
+def _require_cluster_key(x_chatbruti_cluster_key: Optional[str] = Header(None)) -> None:
+    """
+    Dependency guarding node-to-node endpoints with CLUSTER_KEY.
+    
+    They are disabled (403) while CLUSTER_KEY is unset.
+    """
+    cluster_key = get_settings().cluster_key
+    if not cluster_key:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cluster endpoints are disabled; set CLUSTER_KEY to enable them"
+        )
+    if not (x_chatbruti_cluster_key and hmac.compare_digest(x_chatbruti_cluster_key, cluster_key)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing cluster key"
+        )
+
+
+def _schedule_compaction(session_id: str) -> None:
+    """Compact a long conversation in the background, off the request path."""
+    conversation = _conversations.get(session_id)
+    compactor = get_compactor()
+    if conversation is None or not compactor.needs_compaction(conversation):
+        return
+    
+    conversation.compacting = True
+    task = asyncio.ensure_future(_compact(conversation, compactor))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _compact(conversation: ConversationHistory, compactor: ConversationCompactor) -> None:
+    """Summarize a conversation at batch priority, skipping it when overloaded."""
+    try:
+        async with get_admission().slot("batch"):
+            with _model_lease() as model:
+                await run_in_threadpool(compactor.compact, conversation, model)
+    except AdmissionRejected:
+        conversation.compacting = False
+
+
 # Pydantic models for request/response
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
@@ -49,6 +688,7 @@ class ChatRequest(BaseModel):
     temperature: Optional[float] = Field(None, description="Sampling temperature")
     max_tokens: Optional[int] = Field(None, description="Maximum tokens to generate")
     stream: bool = Field(False, description="Whether to stream the response")
+    timeout: Optional[float] = Field(None, gt=0, description="Deadline in seconds for the response")
 
 
 class ChatResponse(BaseModel):
@@ -56,6 +696,30 @@ class ChatResponse(BaseModel):
     response: str = Field(..., description="Model response")
     session_id: str = Field(..., description="Conversation session ID")
     message_count: int = Field(..., description="Number of messages in conversation")
+    usage: Optional[Dict[str, int]] = Field(None, description="Token usage reported by the backend")
+
+
+class BatchChatRequest(BaseModel):
+    """Request model for batch chat endpoint."""
+    items: List[ChatRequest] = Field(..., description="Independent chat requests")
+    stream: bool = Field(False, description="Stream results as NDJSON as they finish")
+
+
+class BatchChatResult(BaseModel):
+    """Result of a single batch item."""
+    index: int = Field(..., description="Position of the item in the request")
+    response: Optional[str] = Field(None, description="Model response")
+    session_id: Optional[str] = Field(None, description="Conversation session ID")
+    message_count: Optional[int] = Field(None, description="Number of messages in conversation")
+    usage: Optional[Dict[str, int]] = Field(None, description="Token usage reported by the backend")
+    error: Optional[str] = Field(None, description="Error message if the item failed")
+
+
+class BatchChatResponse(BaseModel):
+    """Response model for batch chat endpoint."""
+    results: List[BatchChatResult]
+    total: int
+    failed: int
 
 
 class ConversationResponse(BaseModel):
@@ -63,6 +727,8 @@ class ConversationResponse(BaseModel):
     session_id: str
     messages: List[Dict[str, str]]
     message_count: int
+    offset: int = 0
+    summary: Optional[str] = None
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
 
@@ -75,8 +741,725 @@ class HealthResponse(BaseModel):
     timestamp: str
 
 
+class ModelSwapRequest(BaseModel):
+    """Request model for replacing the serving model."""
+    backend: Optional[str] = Field(
+        None, description="Backend of the new model (defaults to the current one)"
+    )
+    model_name: Optional[str] = Field(
+        None, description="Model of the new backend (defaults to the current one)"
+    )
+    settings: Dict[str, Any] = Field(
+        default_factory=dict, description="Other settings for the new model"
+    )
+
+
+class ClusterMembersRequest(BaseModel):
+    """Request model for updating cluster membership."""
+    members: List[str] = Field(..., description="Base URLs of all API nodes")
+
+
+def _get_or_create_conversation(session_id: str) -> ConversationHistory:
+    """Get a conversation session, creating it with the system prompt if needed."""
+    if session_id not in _conversations:
+        conversation = ConversationHistory(session_id=session_id)
+        system_prompt = get_system_prompt_cached()
+        if system_prompt:
+            conversation.add_message("system", system_prompt)
+        _conversations[session_id] = conversation
+        _session_index.touch(session_id, conversation.updated_at)
+    return _conversations[session_id]
+
+
+def _touch_session(conversation: ConversationHistory) -> None:
+    """Record conversation activity in the session index."""
+    _session_index.touch(conversation.session_id, conversation.updated_at)
+
+
+def _request_deadline(timeout: Optional[float]) -> Optional[float]:
+    """Convert a request timeout (or the configured default) to a monotonic deadline."""
+    timeout = timeout or get_settings().request_timeout_seconds
+    return time.monotonic() + timeout if timeout else None
+
+
+async def _watch_disconnect(request: Request, cancel_event: threading.Event) -> bool:
+    """Set ``cancel_event`` if the client disconnects before it is otherwise set."""
+    while not cancel_event.is_set():
+        if await request.is_disconnected():
+            cancel_event.set()
+            return True
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+    return False
+
+
+@asynccontextmanager
+async def _admission_slot(
+    priority: str,
+    deadline: Optional[float] = None,
+    watcher: Optional[asyncio.Future] = None,
+) -> AsyncIterator[float]:
+    """
+    Hold an admission slot, giving up the wait if ``watcher`` finishes first.
+    
+    ``watcher`` is a disconnect watcher: a client that goes away while
+    queued leaves the queue at once instead of taking a slot later.
+    
+    Raises:
+        AdmissionRejected: If the request is shed
+        GenerationCancelled: If the client disconnected while queued
+    """
+    admission = get_admission()
+    acquiring = asyncio.ensure_future(admission.acquire(priority, deadline))
+    if watcher is not None:
+        try:
+            await asyncio.wait({acquiring, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            acquiring.cancel()
+            raise
+        if not acquiring.done():
+            # Cancelling the wait also gives back a slot handed over meanwhile
+            acquiring.cancel()
+            try:
+                await acquiring
+            except asyncio.CancelledError:
+                pass
+            raise GenerationCancelled("", "disconnect")
+    waited = await acquiring
+    started = time.monotonic()
+    try:
+        yield waited
+    finally:
+        admission.release(time.monotonic() - started)
+
+
+def _record_cancellation(reason: str, elapsed: float) -> None:
+    """Count a generation stopped before completion."""
+    metrics.inc("generations_cancelled", reason=reason)
+    metrics.observe("cancelled_generation_seconds", elapsed, reason=reason)
+    logger.info("Generation cancelled (%s) after %.2fs", reason, elapsed)
+
+
+def _chat_sync(
+    request: ChatRequest,
+    cancel_event: Optional[threading.Event] = None,
+    deadline: Optional[float] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> ChatResponse:
+    """
+    Run one chat turn against the model (blocking; call from a worker thread).
+    
+    Raises:
+        GenerationCancelled: If ``cancel_event`` is set or ``deadline`` passes
+    """
+    # Abandoned while queued: do not spend a backend call on it
+    if deadline is not None and time.monotonic() >= deadline:
+        raise GenerationCancelled("", "deadline")
+    if cancel_event is not None and cancel_event.is_set():
+        raise GenerationCancelled("", "cancelled")
+    
+    model = get_model()
+    params = params or {"max_new_tokens": request.max_tokens}
+    system_prompt = get_system_prompt_cached()
+    
+    # Get or create conversation session
+    session_id = request.session_id or _new_session_id()
+    conversation = _get_or_create_conversation(session_id)
+    
+    # Earlier turns only; the new message is sent once, as the prompt
+    history = conversation.get_messages(include_system=False)
+    system_prompt = conversation.build_system_prompt(system_prompt)
+    
+    # Generate response
+    started = time.perf_counter()
+    try:
+        response = model.generate(
+            prompt=request.message,
+            system_prompt=system_prompt,
+            conversation_history=history,
+            temperature=request.temperature,
+            stream=request.stream,
+            token_cache=conversation.token_cache,
+            cancel_event=cancel_event,
+            deadline=deadline,
+            **params,
+        )
+    except GenerationCancelled:
+        raise
+    except Exception as e:
+        _mirror_turn(
+            request.message, system_prompt, history, request.temperature, params,
+            time.perf_counter() - started, error=str(e),
+        )
+        raise
+    
+    usage = model.get_last_usage()
+    _mirror_turn(
+        request.message, system_prompt, history, request.temperature, params,
+        time.perf_counter() - started, usage,
+    )
+    
+    # Add the completed turn to history
+    conversation.add_message("user", request.message)
+    conversation.add_message("assistant", response)
+    _touch_session(conversation)
+    _audit_turn("chat", session_id, request.message, response, usage)
+    
+    if usage:
+        logger.info(
+            "Usage for %s: %s prompt (%s cached), %s completion tokens",
+            session_id, usage["prompt_tokens"], usage["cached_tokens"], usage["completion_tokens"],
+        )
+    
+    return ChatResponse(
+        response=response,
+        session_id=session_id,
+        message_count=len(conversation.messages),
+        usage=usage,
+    )
+
+
+def _chat_batch_item(
+    index: int,
+    request: ChatRequest,
+    params: Optional[Dict[str, Any]] = None,
+) -> BatchChatResult:
+    """Run one batch item, capturing failures in the result."""
+    started = time.perf_counter()
+    try:
+        response = _chat_sync(request, deadline=_request_deadline(request.timeout), params=params)
+        return BatchChatResult(index=index, **response.model_dump())
+    except GenerationCancelled as e:
+        _record_cancellation(e.reason, time.perf_counter() - started)
+        return BatchChatResult(index=index, session_id=request.session_id, error=str(e))
+    except Exception as e:
+        logger.error("Error in batch item %s: %s", index, e)
+        return BatchChatResult(index=index, session_id=request.session_id, error=str(e))
+
+
+def _chat_batch_chunk(
+    indexed: List[Tuple[int, ChatRequest]],
+    params: Optional[Dict[str, Any]] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> List[BatchChatResult]:
+    """
+    Run session-less batch items through the backend's native batching.
+    
+    The chunk runs under the earliest deadline of its items and stops as a
+    whole when it passes or ``cancel_event`` is set.
+    """
+    model = get_model()
+    system_prompt = get_system_prompt_cached()
+    first = indexed[0][1]
+    params = params or {"max_new_tokens": first.max_tokens}
+    deadlines = [_request_deadline(request.timeout) for _, request in indexed]
+    deadline = min((d for d in deadlines if d is not None), default=None)
+    started = time.perf_counter()
+    try:
+        responses = model.generate_batch(
+            [request.message for _, request in indexed],
+            system_prompt=system_prompt,
+            temperature=first.temperature,
+            cancel_event=cancel_event,
+            deadline=deadline,
+            **params,
+        )
+    except GenerationCancelled as e:
+        _record_cancellation(e.reason, time.perf_counter() - started)
+        return [BatchChatResult(index=index, error=str(e)) for index, _ in indexed]
+    except Exception as e:
+        logger.error("Error in batch chunk: %s", e)
+        return [BatchChatResult(index=index, error=str(e)) for index, _ in indexed]
+    
+    usages = model.get_last_batch_usage() or [None] * len(indexed)
+    results = []
+    for (index, request), response, usage in zip(indexed, responses, usages):
+        session_id = _new_session_id()
+        conversation = _get_or_create_conversation(session_id)
+        conversation.add_message("user", request.message)
+        conversation.add_message("assistant", response)
+        _touch_session(conversation)
+        _audit_turn("batch", session_id, request.message, response, usage)
+        results.append(BatchChatResult(
+            index=index,
+            response=response,
+            session_id=session_id,
+            message_count=len(conversation.messages),
+            usage=usage,
+        ))
+    return results
+
+
+async def _chat_turn(
+    request: ChatRequest,
+    http_request: Request,
+    tenant: str,
+    watch_disconnect: bool = True,
+) -> ChatResponse:
+    """
+    Run one /chat turn under quotas, admission control and the request deadline.
+    
+    With ``watch_disconnect``, generation stops when the client goes away;
+    without it, the turn completes so a retry can collect the response.
+    """
+    _enforce_quota(tenant, request.session_id)
+    priority = _request_priority(
+        http_request.headers.get("x-api-key"), http_request.headers.get("x-priority")
+    )
+    await run_in_threadpool(get_model)
+    params = _generation_params(request.max_tokens)
+    
+    # Stop generating if the client goes away or the deadline passes
+    cancel_event = threading.Event()
+    deadline = _request_deadline(request.timeout)
+    watcher = (
+        asyncio.ensure_future(_watch_disconnect(http_request, cancel_event))
+        if watch_disconnect else None
+    )
+    started = time.perf_counter()
+    try:
+        # Queue behind in-flight generations, or shed load if the wait is too long
+        async with _admission_slot(priority, deadline, watcher):
+            with _model_lease():
+                response = await run_in_threadpool(
+                    _chat_sync, request, cancel_event, deadline, params
+                )
+        get_usage_tracker().record(
+            tenant, response.session_id, response.usage, time.perf_counter() - started
+        )
+        _schedule_compaction(response.session_id)
+        return response
+    except AdmissionRejected as e:
+        raise _overloaded(e)
+    except GenerationCancelled as e:
+        reason = "disconnect" if watcher and watcher.done() and watcher.result() else e.reason
+        _record_cancellation(reason, time.perf_counter() - started)
+        if reason == "deadline":
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Generation deadline exceeded"
+            )
+        # Client Closed Request; nobody is left to read it
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    except Exception as e:
+        logger.error("Error in chat endpoint: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating response: {str(e)}"
+        )
+    finally:
+        cancel_event.set()
+        if watcher is not None:
+            watcher.cancel()
+
+
+def _memory_report(top_sessions: int) -> Dict[str, Any]:
+    """Approximate bytes held by sessions, caches and the model (walks every session)."""
+    sessions = [
+        (deep_sizeof(conversation), session_id, conversation)
+        for session_id, conversation in list(_conversations.items())
+    ]
+    largest = heapq.nlargest(top_sessions, sessions, key=lambda entry: entry[0])
+    model = get_model_swapper().current
+    return {
+        "process": process_memory(),
+        "sessions": {
+            "count": len(sessions),
+            "bytes": sum(size for size, _, _ in sessions),
+            "index_bytes": deep_sizeof(_session_index),
+            "largest": [
+                {
+                    "session_id": session_id,
+                    "bytes": size,
+                    "messages": len(conversation.messages),
+                    "transcript_messages": len(conversation.transcript),
+                }
+                for size, session_id, conversation in largest
+            ],
+        },
+        "system_prompt_bytes": deep_sizeof(_system_prompt),
+        "idempotency_bytes": deep_sizeof(_idempotency_store) if _idempotency_store else 0,
+        "model": (
+            {"info": model.get_model_info(), "memory": model.memory_usage()} if model else None
+        ),
+        "torch": torch_memory(),
+    }
+
+
+def _session_filter(
+    min_age_seconds: Optional[float] = None,
+    max_age_seconds: Optional[float] = None,
+    min_messages: Optional[int] = None,
+    max_messages: Optional[int] = None,
+) -> Callable[[ConversationHistory], bool]:
+    """Predicate selecting sessions by age and message count."""
+    now = time.time()
+    
+    def matches(conv: ConversationHistory) -> bool:
+        age = now - conv.created_at
+        count = len(conv.messages)
+        return not (
+            (min_age_seconds is not None and age < min_age_seconds)
+            or (max_age_seconds is not None and age > max_age_seconds)
+            or (min_messages is not None and count < min_messages)
+            or (max_messages is not None and count > max_messages)
+        )
+    
+    return matches
+
+
+async def _capture_turn(request: ChatRequest, turn: Awaitable[ChatResponse]) -> ChatResponse:
+    """Await a /chat turn, recording its shape if traffic capture is on."""
+    recorder = get_traffic_recorder()
+    if recorder is None:
+        return await turn
+    
+    arrived = time.monotonic()
+    try:
+        response = await turn
+    except HTTPException as e:
+        recorder.record(
+            request.session_id or _new_session_id(),
+            request.session_id is None,
+            request.message,
+            arrived,
+            e.status_code,
+            time.monotonic() - arrived,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+        )
+        raise
+    recorder.record(
+        response.session_id,
+        request.session_id is None,
+        request.message,
+        arrived,
+        status.HTTP_200_OK,
+        time.monotonic() - arrived,
+        response=response.response,
+        usage=response.usage,
+        max_tokens=request.max_tokens,
+        temperature=request.temperature,
+    )
+    return response
+
+
+async def _stream_turn(
+    websocket: WebSocket,
+    session_id: str,
+    payload: Dict,
+    cancel_event: threading.Event,
+    tenant: str,
+    priority: str,
+) -> None:
+    """
+    Run one WebSocket chat turn, pushing token deltas to the client.
+    
+    Deltas pass through a bounded queue: when the client reads slower than
+    the model generates, the generating thread waits, so each connection
+    buffers at most ``ws_send_queue_size`` deltas.
+    """
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    deltas: asyncio.Queue = asyncio.Queue(maxsize=max(settings.ws_send_queue_size, 1))
+    errors: List[str] = []
+    usage: List[Dict[str, int]] = []
+    
+    message = payload.get("message")
+    if not isinstance(message, str) or not message.strip():
+        await websocket.send_json({"type": "error", "detail": "Field 'message' is required"})
+        return
+    
+    def put(delta: str) -> bool:
+        """Hand a delta to the event loop, waiting while the queue is full."""
+        future = asyncio.run_coroutine_threadsafe(deltas.put(delta), loop)
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return True
+            except FutureTimeoutError:
+                if cancel_event.is_set():
+                    future.cancel()
+                    return False
+    
+    def produce(
+        history: List[Dict[str, str]],
+        conversation: ConversationHistory,
+        params: Dict[str, Any],
+    ) -> None:
+        system_prompt = conversation.build_system_prompt(get_system_prompt_cached())
+        started = time.perf_counter()
+        ttft = None
+        try:
+            with get_model_swapper().lease() as model:
+                for delta in model.generate_stream(
+                    prompt=message,
+                    system_prompt=system_prompt,
+                    conversation_history=history,
+                    temperature=payload.get("temperature"),
+                    token_cache=conversation.token_cache,
+                    cancel_event=cancel_event,
+                    **params,
+                ):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    if cancel_event.is_set() or not put(delta):
+                        break
+                if model.get_last_usage():
+                    usage.append(model.get_last_usage())
+        except Exception as e:
+            logger.error("Error in WebSocket generation: %s", e)
+            errors.append(str(e))
+        if not cancel_event.is_set():
+            _mirror_turn(
+                message, system_prompt, history, payload.get("temperature"), params,
+                time.perf_counter() - started, usage[0] if usage else None,
+                errors[0] if errors else None, ttft,
+            )
+    
+    await run_in_threadpool(get_model)
+    params = _generation_params(payload.get("max_tokens"))
+    admission = get_admission()
+    try:
+        await admission.acquire(priority)
+    except AdmissionRejected as e:
+        await websocket.send_json({
+            "type": "error",
+            "detail": "Server overloaded, retry later",
+            "retry_after": max(math.ceil(e.retry_after), 1),
+        })
+        return
+    
+    conversation = _get_or_create_conversation(session_id)
+    history = conversation.get_messages(include_system=False)
+    
+    started = time.perf_counter()
+    producer = asyncio.ensure_future(run_in_threadpool(produce, history, conversation, params))
+    parts: List[str] = []
+    try:
+        while True:
+            getter = asyncio.ensure_future(deltas.get())
+            done, _ = await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                break
+            parts.append(getter.result())
+            await websocket.send_json({"type": "delta", "content": parts[-1]})
+        
+        # Flush deltas queued before the producer finished
+        while not deltas.empty():
+            parts.append(deltas.get_nowait())
+            await websocket.send_json({"type": "delta", "content": parts[-1]})
+    finally:
+        if not producer.done():
+            cancel_event.set()
+        await producer
+        admission.release(time.perf_counter() - started)
+    
+    response = "".join(parts).strip()
+    get_usage_tracker().record(
+        tenant, session_id, usage[0] if usage else None, time.perf_counter() - started
+    )
+    if parts or not errors:
+        conversation.add_message("user", message)
+        conversation.add_message("assistant", response)
+        _touch_session(conversation)
+        _audit_turn(
+            "websocket", session_id, message, response,
+            usage[0] if usage else None, str(errors[0]) if errors else None,
+        )
+        _schedule_compaction(session_id)
+    
+    if errors:
+        await websocket.send_json({
+            "type": "error",
+            "detail": f"Error generating response: {errors[0]}",
+        })
+    elif cancel_event.is_set():
+        await websocket.send_json({
+            "type": "cancelled",
+            "response": response,
+            "message_count": len(conversation.messages),
+        })
+    else:
+        await websocket.send_json({
+            "type": "done",
+            "response": response,
+            "message_count": len(conversation.messages),
+            "usage": usage[0] if usage else None,
+        })
+
+
+async def _forward_batch_item(
+    owner: str, index: int, request: ChatRequest, headers
+) -> BatchChatResult:
+    """Run a batch item of a session owned by another node through that node's /chat."""
+    headers = {
+        key: value for key, value in headers.items()
+        if key.lower() in ("x-api-key", "origin")
+    }
+    headers.update({"content-type": "application/json", "x-priority": "batch"})
+    try:
+        body = request.model_dump_json(exclude_none=True).encode("utf-8")
+        upstream = await _forward(owner, "POST", "/chat", headers, body)
+    except HTTPException as e:
+        return BatchChatResult(index=index, session_id=request.session_id, error=e.detail)
+    try:
+        body = upstream.json()
+    except ValueError:
+        body = None
+    if upstream.status_code != 200 or not isinstance(body, dict):
+        detail = body.get("detail") if isinstance(body, dict) else None
+        return BatchChatResult(
+            index=index,
+            session_id=request.session_id,
+            error=str(detail or f"Session owner returned {upstream.status_code}"),
+        )
+    try:
+        return BatchChatResult(index=index, **body)
+    except (TypeError, ValueError) as e:
+        return BatchChatResult(
+            index=index, session_id=request.session_id, error=f"Invalid owner response: {e}"
+        )
+
+
+async def _run_batch(
+    items: List[ChatRequest],
+    tenant: str,
+    headers=None,
+) -> AsyncIterator[BatchChatResult]:
+    """
+    Dispatch batch items under the concurrency cap, yielding results as they finish.
+    
+    Items of sessions owned by another cluster node are run on that node.
+    """
+    settings = get_settings()
+    tracker = get_usage_tracker()
+    model = await run_in_threadpool(get_model)
+    admission = get_admission()
+    semaphore = asyncio.Semaphore(max(settings.batch_max_concurrency, 1))
+    results: asyncio.Queue = asyncio.Queue()
+    
+    # Items of one session must run in order; others are independent
+    sessions: Dict[str, List[int]] = {}
+    stateless: Dict[Tuple, List[int]] = {}
+    for index, item in enumerate(items):
+        if item.session_id:
+            sessions.setdefault(item.session_id, []).append(index)
+        elif model.supports_batching:
+            stateless.setdefault((item.temperature, item.max_tokens), []).append(index)
+        else:
+            sessions.setdefault(f"__item_{index}", []).append(index)
+    
+    def put_missing(indices: List[int], answered: set, error: str) -> None:
+        """Answer every index that has no result yet, so the batch cannot hang."""
+        for index in indices:
+            if index not in answered:
+                results.put_nowait(
+                    BatchChatResult(index=index, session_id=items[index].session_id, error=error)
+                )
+    
+    async def run_session(indices: List[int]) -> None:
+        answered = set()
+        error = "Batch item not run"
+        try:
+            owner = _session_owner(items[indices[0]].session_id, headers or {})
+            for index in indices:
+                if owner is not None:
+                    async with semaphore:
+                        result = await _forward_batch_item(
+                            owner, index, items[index], headers or {}
+                        )
+                    answered.add(index)
+                    await results.put(result)
+                    continue
+                async with semaphore:
+                    started = time.perf_counter()
+                    params = _generation_params(items[index].max_tokens)
+                    try:
+                        async with admission.slot("batch"):
+                            with _model_lease():
+                                result = await run_in_threadpool(
+                                    _chat_batch_item, index, items[index], params
+                                )
+                    except AdmissionRejected:
+                        result = BatchChatResult(
+                            index=index,
+                            session_id=items[index].session_id,
+                            error="Server overloaded, retry later",
+                        )
+                answered.add(index)
+                await results.put(result)
+                if result.error is None:
+                    tracker.record(
+                        tenant, result.session_id, result.usage, time.perf_counter() - started
+                    )
+                if result.session_id:
+                    _schedule_compaction(result.session_id)
+        except Exception as e:
+            logger.error("Error in batch session: %s", e)
+            error = str(e)
+        finally:
+            put_missing(indices, answered, error)
+    
+    async def run_chunk(indices: List[int]) -> None:
+        answered = set()
+        error = "Batch item not run"
+        # Stops the chunk's generation if the batch is abandoned
+        cancel_event = threading.Event()
+        try:
+            async with semaphore:
+                started = time.perf_counter()
+                params = _generation_params(items[indices[0]].max_tokens)
+                try:
+                    async with admission.slot("batch"):
+                        with _model_lease():
+                            chunk = await run_in_threadpool(
+                                _chat_batch_chunk,
+                                [(index, items[index]) for index in indices],
+                                params,
+                                cancel_event,
+                            )
+                except AdmissionRejected:
+                    chunk = [
+                        BatchChatResult(index=index, error="Server overloaded, retry later")
+                        for index in indices
+                    ]
+            latency = time.perf_counter() - started
+            for result in chunk:
+                answered.add(result.index)
+                await results.put(result)
+                if result.error is None:
+                    tracker.record(tenant, result.session_id, result.usage, latency)
+        except Exception as e:
+            logger.error("Error in batch chunk: %s", e)
+            error = str(e)
+        finally:
+            cancel_event.set()
+            put_missing(indices, answered, error)
+    
+    tasks = [asyncio.create_task(run_session(indices)) for indices in sessions.values()]
+    size = max(settings.batch_size, 1)
+    for indices in stateless.values():
+        for start in range(0, len(indices), size):
+            tasks.append(asyncio.create_task(run_chunk(indices[start:start + size])))
+    
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application."""
+    # Keep log formatting and I/O off the request path
+    setup_queue_logging(get_settings().log_queue_size)
+    # Reject an invalid DEGRADATION_TIERS at startup rather than on the first request
+    get_degradation_policy()
+    # Refuse cluster mode without a shared key
+    get_cluster()
+    
     app = FastAPI(
         title="Chatbruti API",
         description="REST API for Chatbruti LLM chatbot",
@@ -115,67 +1498,406 @@ def create_app() -> FastAPI:
                 timestamp=datetime.now().isoformat()
             )
         except Exception as e:
-            logger.error(f"Health check failed: {e}")
+            logger.error("Health check failed: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail=f"Service unavailable: {str(e)}"
             )
     
     @app.post("/chat", response_model=ChatResponse, tags=["Chat"])
-    async def chat(request: ChatRequest):
+    async def chat(request: ChatRequest, http_request: Request, http_response: Response):
         """
         Send a message and get a response from the model.
         
-        Maintains conversation history using session_id.
+        Maintains conversation history using session_id. In a cluster, requests
+        for sessions owned by another node are forwarded to it. Requests with an
+        ``Idempotency-Key`` header run once: retries with the same key get the
+        original response (marked with ``Idempotent-Replayed: true``).
         """
+        owner = _session_owner(request.session_id, http_request.headers)
+        if owner is not None:
+            return await _forward_request(http_request, owner)
+        
+        tenant = tenant_from_headers(
+            http_request.headers.get("x-api-key"), http_request.headers.get("origin")
+        )
+        idempotency_key = http_request.headers.get("idempotency-key")
+        if not idempotency_key:
+            return await _capture_turn(request, _chat_turn(request, http_request, tenant))
+        if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key longer than {MAX_IDEMPOTENCY_KEY_LENGTH} characters"
+            )
+        
+        # Retries with the same key share one generation
         try:
-            model = get_model()
-            system_prompt = get_system_prompt_cached()
-            
-            # Get or create conversation session
-            session_id = request.session_id or str(uuid.uuid4())
-            if session_id not in _conversations:
-                _conversations[session_id] = ConversationHistory(session_id=session_id)
-                if system_prompt:
-                    _conversations[session_id].add_message("system", system_prompt)
-            
-            conversation = _conversations[session_id]
-            
-            # Add user message to history
-            conversation.add_message("user", request.message)
-            
-            # Get conversation history for context
-            history = conversation.get_messages(include_system=False)
-            
-            # Generate response
-            response = model.generate(
-                prompt=request.message,
-                system_prompt=system_prompt,
-                conversation_history=history,
-                temperature=request.temperature,
-                max_new_tokens=request.max_tokens,
-                stream=request.stream,
+            response, replayed = await get_idempotency_store().run(
+                f"{tenant}:{idempotency_key}",
+                request_fingerprint(request.model_dump_json()),
+                lambda: _capture_turn(
+                    request, _chat_turn(request, http_request, tenant, watch_disconnect=False)
+                ),
             )
-            
-            # Add assistant response to history
-            conversation.add_message("assistant", response)
-            
-            return ChatResponse(
-                response=response,
-                session_id=session_id,
-                message_count=len(conversation.messages)
+        except IdempotencyConflict:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request"
             )
+        if replayed:
+            http_response.headers["Idempotent-Replayed"] = "true"
+        return response
+    
+    @app.post("/chat/batch", response_model=BatchChatResponse, tags=["Chat"])
+    async def chat_batch(request: BatchChatRequest, http_request: Request):
+        """
+        Run many independent chat requests in one call.
+        
+        Items are dispatched concurrently (or in forward batches on backends
+        with native batching). Items sharing a session_id run in order.
+        Per-item failures are reported in the item's ``error`` field.
+        With ``stream`` enabled, results are sent as NDJSON lines as they finish.
+        """
+        settings = get_settings()
+        if len(request.items) > settings.batch_max_items:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch too large: {len(request.items)} items "
+                       f"(maximum {settings.batch_max_items})"
+            )
+        
+        tenant = tenant_from_headers(
+            http_request.headers.get("x-api-key"), http_request.headers.get("origin")
+        )
+        _enforce_quota(tenant, requests=len(request.items))
+        
+        if request.stream:
+            async def ndjson_lines():
+                async for result in _run_batch(request.items, tenant, http_request.headers):
+                    yield result.model_dump_json() + "\n"
             
-        except Exception as e:
-            logger.error(f"Error in chat endpoint: {e}")
+            return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+        
+        results = [
+            result async for result in _run_batch(request.items, tenant, http_request.headers)
+        ]
+        results.sort(key=lambda result: result.index)
+        return BatchChatResponse(
+            results=results,
+            total=len(results),
+            failed=sum(1 for result in results if result.error is not None),
+        )
+    
+    @app.websocket("/ws/chat")
+    async def chat_websocket(websocket: WebSocket, session_id: Optional[str] = None):
+        """
+        Persistent chat session over a WebSocket.
+        
+        Client messages are JSON objects: ``{"type": "message", "message": ...}``
+        (optionally with ``temperature`` and ``max_tokens``) starts a turn and
+        ``{"type": "cancel"}`` stops the turn in flight. The server replies with
+        ``session``, ``delta``, ``done``, ``cancelled`` and ``error`` events.
+        One turn runs at a time per connection. In a cluster, connecting with a
+        session owned by another node gets a ``redirect`` event naming the
+        owner, and the connection is closed.
+        """
+        await websocket.accept()
+        tenant = tenant_from_headers(
+            websocket.headers.get("x-api-key"), websocket.headers.get("origin")
+        )
+        priority = _request_priority(
+            websocket.headers.get("x-api-key"), websocket.headers.get("x-priority")
+        )
+        owner = _session_owner(session_id, websocket.headers)
+        if owner is not None:
+            # WebSockets are not proxied: the client reconnects to the owner
+            await websocket.send_json(
+                {"type": "redirect", "session_id": session_id, "owner": owner}
+            )
+            await websocket.close()
+            return
+        session_id = session_id or _new_session_id()
+        await websocket.send_json({"type": "session", "session_id": session_id})
+        
+        turn: Optional[asyncio.Task] = None
+        cancel_event = threading.Event()
+        try:
+            while True:
+                try:
+                    payload = json.loads(await websocket.receive_text())
+                except json.JSONDecodeError:
+                    await websocket.send_json({"type": "error", "detail": "Invalid JSON"})
+                    continue
+                if not isinstance(payload, dict):
+                    await websocket.send_json({"type": "error", "detail": "Expected a JSON object"})
+                    continue
+                
+                kind = payload.get("type", "message")
+                if kind == "cancel":
+                    if turn is not None and not turn.done() and not cancel_event.is_set():
+                        metrics.inc("generations_cancelled", reason="client")
+                    cancel_event.set()
+                elif kind == "message":
+                    if turn is not None and not turn.done():
+                        await websocket.send_json({
+                            "type": "error",
+                            "detail": "A response is already being generated",
+                        })
+                        continue
+                    try:
+                        get_usage_tracker().check(tenant, session_id)
+                    except QuotaExceeded as e:
+                        error = {"type": "error", "detail": _quota_detail(e)}
+                        if e.retry_after is not None:
+                            error["retry_after"] = max(math.ceil(e.retry_after), 1)
+                        await websocket.send_json(error)
+                        continue
+                    cancel_event = threading.Event()
+                    turn = asyncio.create_task(
+                        _stream_turn(websocket, session_id, payload, cancel_event, tenant, priority)
+                    )
+                else:
+                    await websocket.send_json({"type": "error", "detail": f"Unknown type: {kind}"})
+        except WebSocketDisconnect:
+            logger.info("WebSocket disconnected: %s", session_id)
+        finally:
+            if turn is not None and not turn.done() and not cancel_event.is_set():
+                metrics.inc("generations_cancelled", reason="disconnect")
+            cancel_event.set()
+            if turn is not None:
+                try:
+                    await turn
+                except Exception:
+                    pass
+    
+    @app.get("/metrics", tags=["General"], dependencies=[Depends(_require_admin)])
+    async def get_metrics():
+        """Server metrics: counters, gauges and latency histograms."""
+        return metrics.snapshot()
+    
+    @app.get("/usage", tags=["Usage"], dependencies=[Depends(_require_admin)])
+    async def get_usage(top: int = Query(20, ge=1, le=1000, description="Number of top sessions")):
+        """Token usage per tenant, the heaviest sessions, and the configured quotas."""
+        return get_usage_tracker().summary(top=top)
+    
+    @app.get("/usage/sessions/{session_id}", tags=["Usage"], dependencies=[Depends(_require_admin)])
+    async def get_session_usage(session_id: str):
+        """Token usage of a single session."""
+        usage = get_usage_tracker().session_usage(session_id)
+        if usage is None:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error generating response: {str(e)}"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No usage recorded for session: {session_id}"
             )
+        return {"session_id": session_id, **usage}
+    
+    @app.get("/model", tags=["Model"], dependencies=[Depends(_require_admin)])
+    async def get_model_state():
+        """The serving model and the state of any hot swap."""
+        model = await run_in_threadpool(get_model)
+        return {"model": model.get_model_info(), "swap": get_model_swapper().status()}
+    
+    @app.post(
+        "/model/swap",
+        status_code=status.HTTP_202_ACCEPTED,
+        tags=["Model"],
+        dependencies=[Depends(_require_admin)],
+    )
+    async def swap_model(request: ModelSwapRequest):
+        """
+        Replace the serving model without downtime.
+        
+        The new model is loaded and warmed up in the background while the
+        current one keeps serving, then takes over new requests. The old model
+        is freed once its in-flight requests finish. If loading or warm-up
+        fails, the current model stays. Poll ``GET /model`` for progress.
+        """
+        current = await run_in_threadpool(get_model)
+        base = getattr(current, "settings", None) or get_settings()
+        update = dict(request.settings)
+        refused = sorted(name for name in update if name not in SWAPPABLE_SETTINGS)
+        if refused:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Settings not changeable by a swap: {', '.join(refused)}"
+            )
+        if request.backend:
+            update["backend"] = request.backend
+        if request.model_name:
+            update["model_name"] = request.model_name
+        settings = _copy_settings(base, **update)
+        
+        loop = asyncio.get_running_loop()
+        swapper = get_model_swapper()
+        try:
+            swapper.start_swap(
+                build=lambda: create_model(backend=settings.backend, settings=settings),
+                warm_up=_warm_up,
+                on_swap=lambda model: loop.call_soon_threadsafe(_on_model_swapped, model),
+                target={"backend": settings.backend, "model_name": settings.model_name},
+            )
+        except RuntimeError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        logger.info("Swapping model to %s/%s", settings.backend, settings.model_name)
+        return swapper.status()
+    
+    @app.get("/mirror", tags=["Model"], dependencies=[Depends(_require_admin)])
+    async def get_mirror_stats():
+        """Latency, TTFT, tokens and errors of mirrored requests, primary vs candidate."""
+        mirror = get_mirror()
+        if mirror is None:
+            return {"enabled": False}
+        return {"enabled": True, **mirror.stats()}
+    
+    @app.get("/debug/memory", tags=["Debug"], dependencies=[Depends(_require_admin)])
+    async def get_memory(
+        top: int = Query(10, ge=0, le=1000, description="Number of largest sessions to list"),
+        tracemalloc_top: int = Query(
+            0,
+            ge=0,
+            le=1000,
+            description="Allocation sites to compare with the previous call (0 skips)",
+        ),
+        group_by: str = Query(
+            "lineno", description="Allocation site grouping: lineno, filename or traceback"
+        ),
+    ):
+        """Approximate memory use by component, optionally with a tracemalloc snapshot diff."""
+        report = await run_in_threadpool(_memory_report, top)
+        if tracemalloc_top:
+            try:
+                report["tracemalloc"] = await run_in_threadpool(
+                    _allocation_tracer.diff, tracemalloc_top, group_by
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        else:
+            report["tracemalloc"] = {"tracing": _allocation_tracer.tracing}
+        return report
+    
+    @app.delete("/debug/memory/tracemalloc", tags=["Debug"], dependencies=[Depends(_require_admin)])
+    async def stop_tracemalloc():
+        """Stop the allocation tracing started by /debug/memory."""
+        return {"stopped": _allocation_tracer.stop()}
+    
+    @app.get("/cluster", tags=["Cluster"], dependencies=[Depends(_require_admin)])
+    async def get_cluster_state():
+        """Cluster membership and the number of sessions held by this node."""
+        return {**get_cluster().snapshot(), "local_sessions": len(_conversations)}
+    
+    @app.put("/cluster/members", tags=["Cluster"], dependencies=[Depends(_require_cluster_key)])
+    async def set_cluster_members(request: ClusterMembersRequest):
+        """
+        Replace the member list and move sessions this node no longer owns.
+        
+        Send the same list to every node. Sessions move in the background;
+        consistent hashing only moves those whose owner changed.
+        """
+        cluster = get_cluster()
+        if not cluster.self_url:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="CLUSTER_SELF_URL is not set"
+            )
+        if httpx is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="httpx is required for clustering"
+            )
+        added, removed = cluster.set_members(request.members)
+        moving = sum(1 for session_id in list(_conversations) if not cluster.is_local(session_id))
+        if moving:
+            task = asyncio.ensure_future(_migrate_sessions())
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        logger.info("Cluster members updated: +%s -%s, moving %s sessions", added, removed, moving)
+        return {**cluster.snapshot(), "added": added, "removed": removed, "sessions_moving": moving}
+    
+    @app.post("/cluster/sessions", tags=["Cluster"], dependencies=[Depends(_require_cluster_key)])
+    async def import_session(state: Dict[str, Any]):
+        """Accept a session moved from another node."""
+        try:
+            conversation = ConversationHistory.from_state(state)
+        except (KeyError, TypeError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid session state: {e}"
+            )
+        existing = _conversations.get(conversation.session_id)
+        if existing is None or existing.updated_at <= conversation.updated_at:
+            _conversations[conversation.session_id] = conversation
+            _touch_session(conversation)
+        return {
+            "session_id": conversation.session_id,
+            "message_count": len(_conversations[conversation.session_id].messages),
+        }
+    
+    @app.get(
+        "/conversations/export", tags=["Conversations"], dependencies=[Depends(_require_admin)]
+    )
+    async def export_conversations(
+        format: str = Query(
+            "ndjson", description="ndjson (one session per line) or parquet (one message per row)"
+        ),
+        gzip: bool = Query(False, description="Gzip NDJSON output"),
+        min_age_seconds: Optional[float] = Query(
+            None, ge=0, description="Only sessions created at least this long ago"
+        ),
+        max_age_seconds: Optional[float] = Query(
+            None, ge=0, description="Only sessions created at most this long ago"
+        ),
+        min_messages: Optional[int] = Query(
+            None, ge=0, description="Only sessions with at least this many messages"
+        ),
+        max_messages: Optional[int] = Query(
+            None, ge=0, description="Only sessions with at most this many messages"
+        ),
+    ):
+        """
+        Stream the transcripts of all (or the filtered) sessions of this node.
+        
+        The export covers the sessions and messages present when it starts
+        and is encoded incrementally on a worker thread.
+        """
+        matches = _session_filter(min_age_seconds, max_age_seconds, min_messages, max_messages)
+        sessions = await run_in_threadpool(snapshot_sessions, _conversations, matches)
+        try:
+            chunks = iter_export(sessions, format, gzip)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except ImportError as e:
+            raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+        
+        if format == "parquet":
+            media_type, filename = "application/vnd.apache.parquet", "sessions.parquet"
+        elif gzip:
+            media_type, filename = "application/gzip", "sessions.ndjson.gz"
+        else:
+            media_type, filename = "application/x-ndjson", "sessions.ndjson"
+        metrics.inc("exports", format=format)
+        return StreamingResponse(
+            chunks,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
     
     @app.get("/conversations/{session_id}", response_model=ConversationResponse, tags=["Conversations"])
-    async def get_conversation(session_id: str):
-        """Get conversation history for a session."""
+    async def get_conversation(
+        session_id: str,
+        http_request: Request,
+        offset: int = Query(0, ge=0, description="Index of the first message to return"),
+        limit: Optional[int] = Query(
+            None, ge=1, description="Maximum number of messages to return"
+        ),
+        transcript: bool = Query(
+            False, description="Return the full transcript, including compacted turns"
+        ),
+    ):
+        """Get conversation history for a session, optionally a range of messages."""
+        owner = _session_owner(session_id, http_request.headers)
+        if owner is not None:
+            return await _forward_request(http_request, owner)
+        
         if session_id not in _conversations:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -183,19 +1905,27 @@ def create_app() -> FastAPI:
             )
         
         conversation = _conversations[session_id]
-        conv_dict = conversation.to_dict()
+        messages = conversation.transcript if transcript else conversation.messages
+        end = len(messages) if limit is None else offset + limit
         
-        return ConversationResponse(
-            session_id=conv_dict["session_id"],
-            messages=conv_dict["messages"],
-            message_count=conv_dict["message_count"],
-            created_at=conv_dict["messages"][0]["timestamp"] if conv_dict["messages"] else None,
-            updated_at=conv_dict["messages"][-1]["timestamp"] if conv_dict["messages"] else None,
-        )
+        # Built directly to skip response model validation on this read-heavy path
+        return FastJSONResponse({
+            "session_id": session_id,
+            "messages": messages[offset:end],
+            "message_count": len(messages),
+            "offset": offset,
+            "summary": conversation.summary,
+            "created_at": messages[0]["timestamp"] if messages else None,
+            "updated_at": messages[-1]["timestamp"] if messages else None,
+        })
     
     @app.delete("/conversations/{session_id}", tags=["Conversations"])
-    async def delete_conversation(session_id: str):
+    async def delete_conversation(session_id: str, http_request: Request):
         """Delete a conversation session."""
+        owner = _session_owner(session_id, http_request.headers)
+        if owner is not None:
+            return await _forward_request(http_request, owner)
+        
         if session_id not in _conversations:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -203,11 +1933,20 @@ def create_app() -> FastAPI:
             )
         
         del _conversations[session_id]
+        _session_index.remove(session_id)
+        audit = get_audit_log()
+        if audit is not None:
+            audit.record("session_deleted", session_id)
+        get_usage_tracker().forget_session(session_id)
         return {"message": f"Conversation {session_id} deleted"}
     
     @app.post("/conversations/{session_id}/clear", tags=["Conversations"])
-    async def clear_conversation(session_id: str):
+    async def clear_conversation(session_id: str, http_request: Request):
         """Clear conversation history (keeps system prompt)."""
+        owner = _session_owner(session_id, http_request.headers)
+        if owner is not None:
+            return await _forward_request(http_request, owner)
+        
         if session_id not in _conversations:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -216,28 +1955,71 @@ def create_app() -> FastAPI:
         
         conversation = _conversations[session_id]
         conversation.clear()
+        audit = get_audit_log()
+        if audit is not None:
+            audit.record("session_cleared", session_id)
         
         # Re-add system prompt if available
         system_prompt = get_system_prompt_cached()
         if system_prompt:
             conversation.add_message("system", system_prompt)
+        _touch_session(conversation)
         
         return {"message": f"Conversation {session_id} cleared", "session_id": session_id}
     
     @app.get("/conversations", tags=["Conversations"])
-    async def list_conversations():
-        """List all active conversation sessions."""
-        return {
-            "sessions": [
-                {
-                    "session_id": session_id,
-                    "message_count": len(conv.messages),
-                    "created_at": conv.messages[0]["timestamp"] if conv.messages else None,
-                }
-                for session_id, conv in _conversations.items()
-            ],
-            "total": len(_conversations)
-        }
+    async def list_conversations(
+        cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
+        limit: int = Query(50, ge=1, le=500, description="Maximum sessions per page"),
+        min_age_seconds: Optional[float] = Query(
+            None, ge=0, description="Only sessions created at least this long ago"
+        ),
+        max_age_seconds: Optional[float] = Query(
+            None, ge=0, description="Only sessions created at most this long ago"
+        ),
+        min_messages: Optional[int] = Query(
+            None, ge=0, description="Only sessions with at least this many messages"
+        ),
+        max_messages: Optional[int] = Query(
+            None, ge=0, description="Only sessions with at most this many messages"
+        ),
+    ):
+        """
+        List conversation sessions, most recently active first.
+        
+        Results are paginated: pass ``next_cursor`` from a response as
+        ``cursor`` to get the following page.
+        """
+        session_matches = _session_filter(
+            min_age_seconds, max_age_seconds, min_messages, max_messages
+        )
+        
+        def matches(session_id: str) -> bool:
+            conv = _conversations.get(session_id)
+            return conv is not None and session_matches(conv)
+        
+        try:
+            session_ids, next_cursor = _session_index.page(cursor, limit, matches)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        sessions = []
+        for session_id in session_ids:
+            conv = _conversations.get(session_id)
+            if conv is None:
+                continue
+            sessions.append({
+                "session_id": session_id,
+                "message_count": len(conv.messages),
+                "created_at": conv.messages[0]["timestamp"] if conv.messages else None,
+                "updated_at": conv.messages[-1]["timestamp"] if conv.messages else None,
+            })
+        
+        return FastJSONResponse({
+            "sessions": sessions,
+            "total": len(_conversations),
+            "next_cursor": next_cursor,
+        })
     
     return app
 
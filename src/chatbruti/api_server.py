@@ -21,9 +21,9 @@ def main():
     host = os.getenv("API_HOST", "0.0.0.0")  # Listen on all interfaces
     port = int(os.getenv("API_PORT", "8000"))
     
-    logger.info(f"Starting Chatbruti API server on http://{host}:{port}")
-    logger.info(f"API documentation available at http://{host}:{port}/docs")
-    logger.info(f"Using backend: {settings.backend}")
+    logger.info("Starting Chatbruti API server on http://%s:%s", host, port)
+    logger.info("API documentation available at http://%s:%s/docs", host, port)
+    logger.info("Using backend: %s", settings.backend)
     
     uvicorn.run(
         "chatbruti.api.server:app",
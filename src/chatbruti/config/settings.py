@@ -25,7 +25,7 @@ class Settings(BaseSettings):
     backend: str = Field(
         default="groq",
         env="BACKEND",
-        description="Backend to use: 'huggingface' or 'groq'"
+        description="Backend to use: 'huggingface', 'onnx', 'gguf', 'groq', 'router' or 'pool'"
     )
     
     # Hugging Face configuration
@@ -50,12 +50,99 @@ class Settings(BaseSettings):
         description="Load model in 4-bit mode (quantization)"
     )
     
+    # Speculative (assisted) decoding for the Hugging Face backend
+    draft_model_name: Optional[str] = Field(
+        default=None,
+        env="DRAFT_MODEL_NAME",
+        description=(
+            "Small draft model for assisted generation "
+            "(must share the main model's tokenizer)"
+        )
+    )
+    num_assistant_tokens: int = Field(
+        default=5,
+        env="NUM_ASSISTANT_TOKENS",
+        description="Number of tokens the draft model proposes per verification step"
+    )
+    prompt_lookup_num_tokens: Optional[int] = Field(
+        default=None,
+        env="PROMPT_LOOKUP_NUM_TOKENS",
+        description="Enable draft-free prompt-lookup decoding with this many candidate tokens"
+    )
+    
+    # ONNX Runtime backend
+    onnx_model_dir: Optional[str] = Field(
+        default=None,
+        env="ONNX_MODEL_DIR",
+        description=(
+            "Directory of the exported ONNX model (exported there on first load if empty; "
+            "default: ~/.cache/chatbruti/onnx/<model>)"
+        )
+    )
+    onnx_quantize: bool = Field(
+        default=False,
+        env="ONNX_QUANTIZE",
+        description="Dynamically quantize the ONNX model weights to int8"
+    )
+    onnx_num_threads: int = Field(
+        default=0,
+        env="ONNX_NUM_THREADS",
+        description="ONNX Runtime intra-op threads (0 lets ONNX Runtime decide)"
+    )
+    
+    # GGUF backend (llama.cpp)
+    gguf_model_path: Optional[str] = Field(
+        default=None,
+        env="GGUF_MODEL_PATH",
+        description="Path to a quantized .gguf model file"
+    )
+    gguf_n_ctx: int = Field(
+        default=4096,
+        env="GGUF_N_CTX",
+        description="Context window in tokens"
+    )
+    gguf_n_threads: int = Field(
+        default=0,
+        env="GGUF_N_THREADS",
+        description="Decode threads (0 lets llama.cpp decide)"
+    )
+    gguf_n_batch: int = Field(
+        default=512,
+        env="GGUF_N_BATCH",
+        description="Prompt tokens evaluated per batch"
+    )
+    gguf_cache_mb: int = Field(
+        default=1024,
+        env="GGUF_CACHE_MB",
+        description="RAM cache for prompt KV states in MB (0 disables)"
+    )
+    gguf_chat_format: Optional[str] = Field(
+        default=None,
+        env="GGUF_CHAT_FORMAT",
+        description="llama.cpp chat format (default: the template stored in the GGUF file)"
+    )
+    
     # Groq API configuration
     groq_api_key: Optional[str] = Field(
         default=None,
         env="GROQ_API_KEY",
         description="Groq API key for cloud inference"
     )
+    groq_base_url: Optional[str] = Field(
+        default=None,
+        env="GROQ_BASE_URL",
+        description="Groq API base URL (e.g. a local mock server for load tests)"
+    )
+    groq_max_retries: int = Field(
+        default=2,
+        env="GROQ_MAX_RETRIES",
+        description="Retries on connection errors, 408, 429 and 5xx responses"
+    )
+    groq_timeout: float = Field(
+        default=60.0,
+        env="GROQ_TIMEOUT",
+        description="Groq API request timeout in seconds"
+    )
     
     # Groq-specific parameters
     reasoning_effort: Optional[str] = Field(
@@ -64,6 +151,50 @@ class Settings(BaseSettings):
         description="Reasoning effort for Groq models: 'low', 'medium', or 'high'"
     )
     
+    # Complexity-based routing (router backend)
+    router_small_backend: str = Field(
+        default="groq",
+        env="ROUTER_SMALL_BACKEND",
+        description="Backend serving easy requests"
+    )
+    router_small_model: str = Field(
+        default="llama-3.1-8b-instant",
+        env="ROUTER_SMALL_MODEL",
+        description="Small, fast model serving easy requests"
+    )
+    router_large_backend: str = Field(
+        default="groq",
+        env="ROUTER_LARGE_BACKEND",
+        description="Backend serving hard requests with MODEL_NAME"
+    )
+    router_threshold: float = Field(
+        default=0.5,
+        env="ROUTER_THRESHOLD",
+        description="Complexity score (0 to 1) at or above which requests go to the large model"
+    )
+    router_shadow_rate: float = Field(
+        default=0.0,
+        env="ROUTER_SHADOW_RATE",
+        description="Fraction of requests also run on the other route to evaluate routing"
+    )
+    
+    # Replica pool (pool backend)
+    pool_backend: str = Field(
+        default="huggingface",
+        env="POOL_BACKEND",
+        description="Backend each replica of the pool runs"
+    )
+    pool_replicas: int = Field(
+        default=0,
+        env="POOL_REPLICAS",
+        description="Number of replicas (0 for one per NUMA node)"
+    )
+    pool_core_sets: Optional[str] = Field(
+        default=None,
+        env="POOL_CORE_SETS",
+        description="Cores per replica as ';'-separated cpulists, e.g. '0-15;16-31'"
+    )
+    
     # Generation parameters
     max_new_tokens: int = Field(
         default=8192,
@@ -91,6 +222,275 @@ class Settings(BaseSettings):
         description="Whether to use sampling"
     )
     
+    # Request deadlines
+    request_timeout_seconds: float = Field(
+        default=0.0,
+        env="REQUEST_TIMEOUT_SECONDS",
+        description="Default generation deadline for chat requests in seconds (0 disables)"
+    )
+    
+    # Batch chat configuration
+    batch_max_items: int = Field(
+        default=1000,
+        env="BATCH_MAX_ITEMS",
+        description="Maximum number of items accepted by one /chat/batch request"
+    )
+    batch_max_concurrency: int = Field(
+        default=4,
+        env="BATCH_MAX_CONCURRENCY",
+        description="Maximum number of batch items generated concurrently"
+    )
+    batch_size: int = Field(
+        default=8,
+        env="BATCH_SIZE",
+        description="Prompts per forward batch for backends with native batching"
+    )
+    
+    # WebSocket chat configuration
+    ws_send_queue_size: int = Field(
+        default=64,
+        env="WS_SEND_QUEUE_SIZE",
+        description="Token deltas buffered per WebSocket before generation waits for the client"
+    )
+    
+    # Conversation compaction
+    compaction_token_threshold: int = Field(
+        default=0,
+        env="COMPACTION_TOKEN_THRESHOLD",
+        description="Estimated prompt tokens above which old turns are summarized (0 disables)"
+    )
+    compaction_keep_messages: int = Field(
+        default=6,
+        env="COMPACTION_KEEP_MESSAGES",
+        description="Most recent messages kept verbatim when compacting"
+    )
+    compaction_max_tokens: int = Field(
+        default=512,
+        env="COMPACTION_MAX_TOKENS",
+        description="Maximum tokens generated for a conversation summary"
+    )
+    
+    # Usage accounting and quotas
+    admin_api_key: Optional[str] = Field(
+        default=None,
+        env="ADMIN_API_KEY",
+        description="Key required in the X-Admin-Key header for admin endpoints (unset: disabled)"
+    )
+    quota_window_seconds: float = Field(
+        default=60.0,
+        env="QUOTA_WINDOW_SECONDS",
+        description="Sliding window for per-tenant quotas"
+    )
+    tenant_requests_per_window: int = Field(
+        default=0,
+        env="TENANT_REQUESTS_PER_WINDOW",
+        description="Maximum requests per tenant and window (0 disables)"
+    )
+    tenant_tokens_per_window: int = Field(
+        default=0,
+        env="TENANT_TOKENS_PER_WINDOW",
+        description="Maximum tokens per tenant and window (0 disables)"
+    )
+    session_token_limit: int = Field(
+        default=0,
+        env="SESSION_TOKEN_LIMIT",
+        description="Maximum total tokens per conversation session (0 disables)"
+    )
+    usage_max_tenants: int = Field(
+        default=10000,
+        env="USAGE_MAX_TENANTS",
+        description=(
+            "Tenants tracked at most; the least recently active are dropped "
+            "beyond this (0 for no limit)"
+        )
+    )
+    
+    # Admission control
+    admission_max_concurrency: int = Field(
+        default=0,
+        env="ADMISSION_MAX_CONCURRENCY",
+        description="Maximum concurrent generations (0 uses the backend's default)"
+    )
+    admission_max_queue: int = Field(
+        default=64,
+        env="ADMISSION_MAX_QUEUE",
+        description="Maximum number of requests waiting for a generation slot"
+    )
+    admission_max_wait_seconds: float = Field(
+        default=10.0,
+        env="ADMISSION_MAX_WAIT_SECONDS",
+        description="Maximum queueing time for interactive and API requests"
+    )
+    admission_batch_max_wait_seconds: float = Field(
+        default=120.0,
+        env="ADMISSION_BATCH_MAX_WAIT_SECONDS",
+        description="Maximum queueing time for batch items"
+    )
+    
+    # Load degradation
+    degradation_tiers: Optional[str] = Field(
+        default=None,
+        env="DEGRADATION_TIERS",
+        description="JSON list of degradation tiers, mildest first (unset disables)"
+    )
+    degradation_cooldown_seconds: float = Field(
+        default=30.0,
+        env="DEGRADATION_COOLDOWN_SECONDS",
+        description="Time load must stay below a tier's thresholds before leaving it"
+    )
+    
+    # Traffic mirroring to a candidate model
+    mirror_backend: Optional[str] = Field(
+        default=None,
+        env="MIRROR_BACKEND",
+        description=(
+            "Backend of the candidate model that sampled requests are mirrored to "
+            "(unset disables)"
+        )
+    )
+    mirror_model_name: Optional[str] = Field(
+        default=None,
+        env="MIRROR_MODEL_NAME",
+        description="Model of the candidate backend (defaults to MODEL_NAME)"
+    )
+    mirror_rate: float = Field(
+        default=0.0,
+        env="MIRROR_RATE",
+        description="Fraction of /chat and WebSocket turns mirrored to the candidate (0 disables)"
+    )
+    mirror_max_concurrency: int = Field(
+        default=0,
+        env="MIRROR_MAX_CONCURRENCY",
+        description=(
+            "Maximum concurrent candidate generations "
+            "(0 uses the candidate backend's limit)"
+        )
+    )
+    mirror_timeout_seconds: float = Field(
+        default=120.0,
+        env="MIRROR_TIMEOUT_SECONDS",
+        description="Deadline of a mirrored generation"
+    )
+    
+    # Logging
+    log_queue_size: int = Field(
+        default=10000,
+        env="LOG_QUEUE_SIZE",
+        description=(
+            "Maximum log records waiting for the background log writer "
+            "(0 logs synchronously)"
+        )
+    )
+    
+    # Audit log of conversation events
+    audit_log_dir: Optional[str] = Field(
+        default=None,
+        env="AUDIT_LOG_DIR",
+        description="Directory of the compressed conversation audit log (unset disables)"
+    )
+    audit_include_content: bool = Field(
+        default=True,
+        env="AUDIT_INCLUDE_CONTENT",
+        description="Record message and response text in audit events"
+    )
+    audit_max_file_mb: int = Field(
+        default=64,
+        env="AUDIT_MAX_FILE_MB",
+        description="Compressed size in MB at which an audit file is rotated"
+    )
+    audit_max_files: int = Field(
+        default=20,
+        env="AUDIT_MAX_FILES",
+        description="Number of audit files kept (0 keeps all)"
+    )
+    audit_queue_size: int = Field(
+        default=10000,
+        env="AUDIT_QUEUE_SIZE",
+        description="Maximum audit events waiting to be written before events are dropped"
+    )
+    audit_flush_seconds: float = Field(
+        default=1.0,
+        env="AUDIT_FLUSH_SECONDS",
+        description="Longest time an audit event waits before its batch is written"
+    )
+    
+    # Traffic capture for replay benchmarks
+    capture_path: Optional[str] = Field(
+        default=None,
+        env="CAPTURE_PATH",
+        description=(
+            "JSONL file name /chat requests are recorded to for replay, "
+            "one file per run (unset disables)"
+        )
+    )
+    capture_content: bool = Field(
+        default=False,
+        env="CAPTURE_CONTENT",
+        description="Record message text in the capture (otherwise only sizes)"
+    )
+    capture_sample_rate: float = Field(
+        default=1.0,
+        env="CAPTURE_SAMPLE_RATE",
+        description="Fraction of sessions captured"
+    )
+    capture_queue_size: int = Field(
+        default=10000,
+        env="CAPTURE_QUEUE_SIZE",
+        description="Maximum capture records waiting to be written before records are dropped"
+    )
+    
+    # Idempotency keys on /chat
+    idempotency_ttl_seconds: float = Field(
+        default=3600.0,
+        env="IDEMPOTENCY_TTL_SECONDS",
+        description="How long /chat responses are kept for retries with the same Idempotency-Key"
+    )
+    idempotency_max_entries: int = Field(
+        default=10000,
+        env="IDEMPOTENCY_MAX_ENTRIES",
+        description="Maximum number of stored /chat responses for idempotent retries"
+    )
+    
+    # Clustering (session affinity across API nodes)
+    cluster_self_url: Optional[str] = Field(
+        default=None,
+        env="CLUSTER_SELF_URL",
+        description="Base URL other nodes reach this node at"
+    )
+    cluster_members: Optional[str] = Field(
+        default=None,
+        env="CLUSTER_MEMBERS",
+        description=(
+            "Comma-separated base URLs of all API nodes, including this one "
+            "(unset disables)"
+        )
+    )
+    cluster_key: Optional[str] = Field(
+        default=None,
+        env="CLUSTER_KEY",
+        description=(
+            "Shared secret nodes authenticate each other with "
+            "(required with CLUSTER_MEMBERS)"
+        )
+    )
+    cluster_vnodes: int = Field(
+        default=128,
+        env="CLUSTER_VNODES",
+        description="Virtual nodes per member on the consistent hash ring"
+    )
+    cluster_forward_timeout: float = Field(
+        default=120.0,
+        env="CLUSTER_FORWARD_TIMEOUT",
+        description="Timeout in seconds for requests forwarded to a session's owner"
+    )
+    
+    # Model hot swap
+    model_swap_drain_timeout: float = Field(
+        default=300.0,
+        env="MODEL_SWAP_DRAIN_TIMEOUT",
+        description="Maximum time to wait for requests on a replaced model before freeing it"
+    )
+    
     # System prompt configuration
     system_prompt_file: Optional[str] = Field(
         default="system_prompt.txt",
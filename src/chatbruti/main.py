@@ -1,13 +1,17 @@
 """Main application entry point."""
 
 import argparse
+import json
 import logging
 import sys
-from typing import Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 from .config import get_settings
 from .models import create_model
-from .utils import get_system_prompt
+from .utils import ConversationHistory, get_system_prompt, iter_export
 
 # Configure logging
 logging.basicConfig(
@@ -35,7 +39,7 @@ def main():
     parser.add_argument(
         "--backend",
         type=str,
-        choices=["huggingface", "groq"],
+        choices=["huggingface", "onnx", "gguf", "groq", "router", "pool"],
         help="Backend to use (overrides environment variable)",
     )
     parser.add_argument(
@@ -48,6 +52,64 @@ def main():
         type=float,
         help="Sampling temperature",
     )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        metavar="INPUT_JSONL",
+        help="Run every prompt of a JSONL file (one {\"prompt\": ...} object per line)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        metavar="OUTPUT_JSONL",
+        help="Output JSONL file for --batch (results are appended as they finish)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        help="Checkpoint file for --batch (default: OUTPUT_JSONL.ckpt)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Concurrent requests for --batch (default: BATCH_MAX_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Prompts per forward batch for --batch on backends with native batching",
+    )
+    parser.add_argument(
+        "--export",
+        type=str,
+        metavar="OUTPUT",
+        help=(
+            "Export saved sessions to OUTPUT (.ndjson, .ndjson.gz or .parquet; "
+            "- for stdout) and exit"
+        ),
+    )
+    parser.add_argument(
+        "--sessions-dir",
+        type=str,
+        default="conversations",
+        help="Directory of saved session files for --export (default: conversations)",
+    )
+    parser.add_argument(
+        "--export-format",
+        type=str,
+        choices=["ndjson", "parquet"],
+        help="Format for --export (default: from the OUTPUT extension)",
+    )
+    parser.add_argument(
+        "--min-messages",
+        type=int,
+        help="Only export sessions with at least this many messages",
+    )
+    parser.add_argument(
+        "--max-messages",
+        type=int,
+        help="Only export sessions with at most this many messages",
+    )
     parser.add_argument(
         "--model-info",
         action="store_true",
@@ -55,15 +117,28 @@ def main():
     )
     
     args = parser.parse_args()
+    if args.batch and not args.output:
+        parser.error("--batch requires --output")
     
     try:
+        # Export needs no model
+        if args.export:
+            run_export(
+                sessions_dir=args.sessions_dir,
+                output_path=args.export,
+                fmt=args.export_format,
+                min_messages=args.min_messages,
+                max_messages=args.max_messages,
+            )
+            return
+        
         # Get settings
         settings = get_settings()
         if args.backend:
             settings.backend = args.backend
         
         # Create model
-        logger.info(f"Initializing model with backend: {settings.backend}")
+        logger.info("Initializing model with backend: %s", settings.backend)
         model = create_model(backend=settings.backend, settings=settings)
         
         # Load model
@@ -87,8 +162,22 @@ def main():
                 print(f"\nSystem Prompt (first 100 chars): {system_prompt[:100]}...")
             return
         
+        # Offline batch mode
+        if args.batch:
+            run_batch(
+                model,
+                settings,
+                system_prompt,
+                input_path=args.batch,
+                output_path=args.output,
+                checkpoint_path=args.checkpoint,
+                concurrency=args.concurrency or settings.batch_max_concurrency,
+                batch_size=args.batch_size or settings.batch_size,
+                max_new_tokens=args.max_tokens,
+                temperature=args.temperature,
+            )
         # Interactive mode
-        if args.interactive:
+        elif args.interactive:
             run_interactive(model, settings, system_prompt)
         # Single prompt mode
         elif args.prompt:
@@ -108,7 +197,7 @@ def main():
         logger.info("\nInterrupted by user")
         sys.exit(0)
     except Exception as e:
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
         sys.exit(1)
 
 
@@ -150,10 +239,254 @@ def run_interactive(model, settings, system_prompt=None):
             print("\nGoodbye!")
             break
         except Exception as e:
-            logger.error(f"Error: {e}")
+            logger.error("Error: %s", e)
             print(f"Error: {e}\n")
 
 
+def _iter_batch_input(input_path: str, done: Set[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Stream (line number, record) pairs from a JSONL file, skipping finished lines."""
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line_number in done or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = {"_error": f"Invalid JSON: {e}"}
+            if isinstance(record, str):
+                record = {"prompt": record}
+            elif not isinstance(record, dict):
+                record = {"_error": "Expected a JSON object"}
+            yield line_number, record
+
+
+def _load_checkpoint(checkpoint_path: Path) -> Set[int]:
+    """Load the line numbers recorded as finished by a previous run."""
+    if not checkpoint_path.exists():
+        return set()
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        return {int(line) for line in f if line.strip()}
+
+
+def _count_tokens(model, text: str) -> int:
+    """Count tokens with the model's tokenizer, or estimate them by whitespace."""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+    return len(text.split())
+
+
+def run_batch(
+    model,
+    settings,
+    system_prompt: Optional[str],
+    input_path: str,
+    output_path: str,
+    checkpoint_path: Optional[str] = None,
+    concurrency: int = 1,
+    batch_size: int = 1,
+    max_new_tokens: Optional[int] = None,
+    temperature: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Run every prompt of a JSONL file and append results to an output JSONL file.
+    
+    Input lines are read lazily. Each result is written and flushed as soon as
+    it is available. Line numbers of successful results are then appended to
+    the checkpoint file, so a restarted run skips them and retries failed
+    lines (their error results stay in the output). A crash between the two
+    writes can repeat one result on resume.
+    
+    Each input line is a JSON object with a ``prompt`` (or ``message``) and
+    optional ``id``, ``system_prompt``, ``max_tokens`` and ``temperature`` keys.
+    
+    Returns:
+        Summary statistics of the run
+    """
+    checkpoint = Path(checkpoint_path or f"{output_path}.ckpt")
+    done = _load_checkpoint(checkpoint)
+    if done:
+        logger.info("Resuming batch: %s prompts already completed", len(done))
+    
+    stats = {"completed": 0, "failed": 0, "skipped": len(done), "output_tokens": 0}
+    start_time = time.perf_counter()
+    
+    def run_one(line_number: int, record: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = {"line": line_number, "id": record.get("id")}
+        try:
+            if "_error" in record:
+                raise ValueError(record["_error"])
+            prompt = record.get("prompt") or record.get("message")
+            if not prompt:
+                raise ValueError("Missing 'prompt'")
+            result["response"] = model.generate(
+                prompt=prompt,
+                system_prompt=record.get("system_prompt", system_prompt),
+                max_new_tokens=record.get("max_tokens", max_new_tokens),
+                temperature=record.get("temperature", temperature),
+            )
+            usage = model.get_last_usage()
+            if usage:
+                result["usage"] = usage
+        except Exception as e:
+            result["error"] = str(e)
+        result["latency"] = round(time.perf_counter() - started, 3)
+        return result
+    
+    def run_chunk(chunk: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        # Malformed records and records with per-prompt overrides run one by one
+        valid, invalid = [], []
+        for n, r in chunk:
+            overrides = {"system_prompt", "max_tokens", "temperature"} & r.keys()
+            if "_error" in r or overrides or not (r.get("prompt") or r.get("message")):
+                invalid.append(run_one(n, r))
+            else:
+                valid.append((n, r))
+        if not valid:
+            return invalid
+        started = time.perf_counter()
+        try:
+            responses = model.generate_batch(
+                [r.get("prompt") or r.get("message") for _, r in valid],
+                system_prompt=system_prompt,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+            )
+        except Exception as e:
+            logger.error("Batch chunk failed, retrying prompts one by one: %s", e)
+            return invalid + [run_one(n, r) for n, r in valid]
+        latency = round(time.perf_counter() - started, 3)
+        usages = model.get_last_batch_usage() or [None] * len(valid)
+        results = []
+        for (n, r), response, usage in zip(valid, responses, usages):
+            result = {"line": n, "id": r.get("id"), "response": response, "latency": latency}
+            if usage:
+                result["usage"] = usage
+            results.append(result)
+        return invalid + results
+    
+    with open(output_path, "a", encoding="utf-8") as out, \
+            open(checkpoint, "a", encoding="utf-8") as ckpt:
+        
+        def write_results(results: List[Dict[str, Any]]) -> None:
+            for result in results:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                if "error" in result:
+                    stats["failed"] += 1
+                else:
+                    stats["completed"] += 1
+                    if "usage" in result:
+                        stats["output_tokens"] += result["usage"]["completion_tokens"]
+                    else:
+                        stats["output_tokens"] += _count_tokens(model, result["response"])
+            out.flush()
+            for result in results:
+                if "error" not in result:
+                    ckpt.write(f"{result['line']}\n")
+            ckpt.flush()
+        
+        records = _iter_batch_input(input_path, done)
+        
+        if model.supports_batching and batch_size > 1:
+            chunk = []
+            for item in records:
+                chunk.append(item)
+                if len(chunk) >= batch_size:
+                    write_results(run_chunk(chunk))
+                    chunk = []
+            if chunk:
+                write_results(run_chunk(chunk))
+        else:
+            # Keep a bounded number of prompts in flight
+            max_pending = max(concurrency, 1) * 2
+            with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+                pending = set()
+                for line_number, record in records:
+                    pending.add(executor.submit(run_one, line_number, record))
+                    if len(pending) >= max_pending:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        write_results([future.result() for future in finished])
+                if pending:
+                    finished, _ = wait(pending)
+                    write_results([future.result() for future in finished])
+    
+    elapsed = time.perf_counter() - start_time
+    processed = stats["completed"] + stats["failed"]
+    stats["elapsed_seconds"] = round(elapsed, 2)
+    stats["prompts_per_second"] = round(processed / elapsed, 2) if elapsed else 0.0
+    stats["output_tokens_per_second"] = (
+        round(stats["output_tokens"] / elapsed, 2) if elapsed else 0.0
+    )
+    
+    print("\nBatch Summary:")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+    return stats
+
+
+def _iter_saved_sessions(
+    sessions_dir: str,
+    min_messages: Optional[int] = None,
+    max_messages: Optional[int] = None,
+) -> Iterator[Tuple[ConversationHistory, int]]:
+    """Load saved session files one at a time, with their transcript lengths."""
+    for path in sorted(Path(sessions_dir).glob("*.json")):
+        conversation = ConversationHistory()
+        try:
+            conversation.load_from_file(str(path))
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping unreadable session file %s: %s", path, e)
+            continue
+        count = len(conversation.messages)
+        if (min_messages is not None and count < min_messages) or (
+            max_messages is not None and count > max_messages
+        ):
+            continue
+        yield conversation, len(conversation.transcript)
+
+
+def run_export(
+    sessions_dir: str,
+    output_path: str,
+    fmt: Optional[str] = None,
+    min_messages: Optional[int] = None,
+    max_messages: Optional[int] = None,
+) -> None:
+    """
+    Export saved session files (see ConversationHistory.save_to_file()).
+    
+    Sessions are read, encoded and written one at a time, so memory use does
+    not grow with the number of sessions. The format follows the output
+    extension unless given: NDJSON with one session per line (gzipped for
+    ``.gz``), or Parquet with one message per row.
+    
+    Args:
+        sessions_dir: Directory of saved session files
+        output_path: Output file, or ``-`` for standard output
+        fmt: 'ndjson' or 'parquet'
+        min_messages: Only export sessions with at least this many messages
+        max_messages: Only export sessions with at most this many messages
+    """
+    fmt = fmt or ("parquet" if output_path.endswith(".parquet") else "ndjson")
+    compress = output_path.endswith(".gz")
+    sessions = _iter_saved_sessions(sessions_dir, min_messages, max_messages)
+    chunks = iter_export(sessions, fmt, compress)
+    
+    written = 0
+    if output_path == "-":
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+            written += len(chunk)
+        sys.stdout.buffer.flush()
+    else:
+        with open(output_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+    logger.info("Exported sessions from %s to %s (%s bytes)", sessions_dir, output_path, written)
+
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,288 @@
+"""Local Groq/OpenAI-compatible chat completions server for load tests."""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua ut enim ad minim veniam quis nostrud"
+).split()
+
+
+class MockConfig:
+    """Behaviour of the mock server (changeable at runtime through /mock/config)."""
+    
+    FIELDS = {
+        "ttft": float,
+        "token_delay": float,
+        "response_tokens": int,
+        "cached_fraction": float,
+        "error_429_rate": float,
+        "error_5xx_rate": float,
+        "timeout_rate": float,
+        "timeout_seconds": float,
+        "requests_per_minute": int,
+        "tokens_per_minute": int,
+        "seed": int,
+    }
+    
+    def __init__(self, **values):
+        """Initialize the configuration with defaults overridden by ``values``."""
+        self.ttft = 0.2
+        self.token_delay = 0.02
+        self.response_tokens = 64
+        self.cached_fraction = 0.0
+        self.error_429_rate = 0.0
+        self.error_5xx_rate = 0.0
+        self.timeout_rate = 0.0
+        self.timeout_seconds = 120.0
+        self.requests_per_minute = 0
+        self.tokens_per_minute = 0
+        self.seed: Optional[int] = None
+        self.update(values)
+    
+    def update(self, values: Dict[str, Any]) -> None:
+        """Set known fields, converting them to their type."""
+        for name, value in values.items():
+            if name in self.FIELDS and value is not None:
+                setattr(self, name, self.FIELDS[name](value))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the configuration as a dictionary."""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+class RateLimiter:
+    """Fixed one-minute window of requests and tokens, reported like Groq's headers."""
+    
+    def __init__(self, config: MockConfig):
+        """Initialize the limiter."""
+        self.config = config
+        self._window_start = time.monotonic()
+        self._requests = 0
+        self._tokens = 0
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: int) -> Optional[float]:
+        """
+        Count a request against the window.
+        
+        Returns:
+            Seconds until the window resets if the request is over the limit, else None
+        """
+        with self._lock:
+            self._roll()
+            reset = 60.0 - (time.monotonic() - self._window_start)
+            rpm, tpm = self.config.requests_per_minute, self.config.tokens_per_minute
+            if (rpm and self._requests + 1 > rpm) or (tpm and self._tokens + tokens > tpm):
+                return reset
+            self._requests += 1
+            self._tokens += tokens
+            return None
+    
+    def headers(self) -> Dict[str, str]:
+        """Rate-limit headers for the current window."""
+        with self._lock:
+            self._roll()
+            reset = 60.0 - (time.monotonic() - self._window_start)
+            headers = {}
+            for kind, limit, used in (
+                ("requests", self.config.requests_per_minute, self._requests),
+                ("tokens", self.config.tokens_per_minute, self._tokens),
+            ):
+                if limit:
+                    headers[f"x-ratelimit-limit-{kind}"] = str(limit)
+                    headers[f"x-ratelimit-remaining-{kind}"] = str(max(limit - used, 0))
+                    headers[f"x-ratelimit-reset-{kind}"] = f"{reset:.2f}s"
+            return headers
+    
+    def _roll(self) -> None:
+        if time.monotonic() - self._window_start >= 60.0:
+            self._window_start = time.monotonic()
+            self._requests = 0
+            self._tokens = 0
+
+
+def _count_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Approximate prompt tokens (4 characters per token)."""
+    return max(sum(len(str(message.get("content") or "")) for message in messages) // 4, 1)
+
+
+def _usage(prompt_tokens: int, completion_tokens: int, cached_fraction: float) -> Dict[str, Any]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": int(prompt_tokens * cached_fraction)},
+    }
+
+
+def _error(
+    status: int, message: str, kind: str, headers: Optional[Dict[str, str]] = None
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": kind}},
+        headers=headers,
+    )
+
+
+def create_mock_app(config: Optional[MockConfig] = None) -> FastAPI:
+    """Create the mock chat completions application."""
+    config = config or MockConfig()
+    limiter = RateLimiter(config)
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "streams": 0, "429": 0, "5xx": 0, "timeouts": 0}
+    
+    app = FastAPI(title="Mock Groq API", version="0.1.0")
+    
+    @app.get("/mock/config")
+    async def get_config():
+        """Current behaviour and request counters."""
+        return {"config": config.to_dict(), "stats": stats}
+    
+    @app.post("/mock/config")
+    async def set_config(request: Request):
+        """Change behaviour, e.g. ``{"error_429_rate": 0.1}``."""
+        config.update(await request.json())
+        if config.seed is not None:
+            rng.seed(config.seed)
+        return {"config": config.to_dict()}
+    
+    @app.post("/openai/v1/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        """Chat completions, streaming or not, with injected latency and faults."""
+        body = await request.json()
+        stats["requests"] += 1
+        messages = body.get("messages") or []
+        max_tokens = (
+            body.get("max_completion_tokens") or body.get("max_tokens") or config.response_tokens
+        )
+        completion_tokens = max(min(config.response_tokens, max_tokens), 1)
+        prompt_tokens = _count_tokens(messages)
+        
+        # Injected faults, then the rate limit
+        fault = request.headers.get("x-mock-fault")
+        roll = rng.random()
+        if fault == "timeout" or (not fault and roll < config.timeout_rate):
+            stats["timeouts"] += 1
+            await asyncio.sleep(config.timeout_seconds)
+            return _error(504, "Upstream timed out", "timeout")
+        roll -= config.timeout_rate
+        if fault == "5xx" or (not fault and 0 <= roll < config.error_5xx_rate):
+            stats["5xx"] += 1
+            return _error(503, "Service unavailable", "internal_server_error")
+        roll -= config.error_5xx_rate
+        injected = fault == "429" or (not fault and 0 <= roll < config.error_429_rate)
+        retry_after = None if injected else limiter.acquire(prompt_tokens + completion_tokens)
+        if injected or retry_after is not None:
+            stats["429"] += 1
+            headers = limiter.headers()
+            headers["retry-after"] = str(max(int(retry_after or 1), 1))
+            return _error(429, "Rate limit reached", "rate_limit_exceeded", headers)
+        
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+        usage = _usage(prompt_tokens, completion_tokens, config.cached_fraction)
+        words = [WORDS[i % len(WORDS)] for i in range(completion_tokens)]
+        headers = limiter.headers()
+        
+        if not body.get("stream"):
+            await asyncio.sleep(config.ttft + config.token_delay * (completion_tokens - 1))
+            return JSONResponse(headers=headers, content={
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop" if completion_tokens < max_tokens else "length",
+                }],
+                "usage": usage,
+            })
+        
+        stats["streams"] += 1
+        
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+        
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(config.ttft)
+            yield chunk({"role": "assistant", "content": ""})
+            for index, word in enumerate(words):
+                if index:
+                    await asyncio.sleep(config.token_delay)
+                yield chunk({"content": word if index == 0 else " " + word})
+            finish = "stop" if completion_tokens < max_tokens else "length"
+            yield chunk({}, finish, x_groq={"id": completion_id, "usage": usage})
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+    
+    return app
+
+
+def main():
+    """Run the mock server."""
+    parser = argparse.ArgumentParser(description="Mock Groq/OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttft", type=float, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, help="Seconds between tokens")
+    parser.add_argument(
+        "--response-tokens", type=int, help="Tokens per response (capped by max tokens)"
+    )
+    parser.add_argument(
+        "--cached-fraction", type=float, help="Fraction of prompt tokens reported as cached"
+    )
+    parser.add_argument(
+        "--error-429-rate", type=float, help="Fraction of requests answered with 429"
+    )
+    parser.add_argument(
+        "--error-5xx-rate", type=float, help="Fraction of requests answered with 503"
+    )
+    parser.add_argument("--timeout-rate", type=float, help="Fraction of requests that hang")
+    parser.add_argument("--timeout-seconds", type=float, help="How long hanging requests hang")
+    parser.add_argument("--requests-per-minute", type=int, help="Request rate limit (0 disables)")
+    parser.add_argument("--tokens-per-minute", type=int, help="Token rate limit (0 disables)")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible fault injection")
+    args = parser.parse_args()
+    
+    config = MockConfig(**{name: getattr(args, name) for name in MockConfig.FIELDS})
+    logger.info(
+        "Starting mock Groq API on http://%s:%s with %s", args.host, args.port, config.to_dict()
+    )
+    logger.info("Point the API at it with GROQ_BASE_URL=http://%s:%s", args.host, args.port)
+    uvicorn.run(create_mock_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,64 @@
 """Model loading and inference module."""
 
-from .base import BaseModelInterface
+from .base import BaseModelInterface, GenerationCancelled
 from .factory import ModelFactory, create_model
+from .swap import ModelSwapper
+from .mirror import TrafficMirror
 
 # Lazy imports to avoid loading heavy dependencies when not needed
 def _lazy_import_huggingface():
     from . import huggingface_model
     return huggingface_model.HuggingFaceModel
 
+def _lazy_import_onnx():
+    from . import onnx_model
+    return onnx_model.OnnxModel
+
+def _lazy_import_gguf():
+    from . import gguf_model
+    return gguf_model.GgufModel
+
 def _lazy_import_groq():
     from . import groq_model
     return groq_model.GroqModel
 
+def _lazy_import_router():
+    from . import router_model
+    return router_model.RouterModel
+
+def _lazy_import_pool():
+    from . import pool_model
+    return pool_model.PoolModel
+
 # Export classes for direct import if needed
 __all__ = [
     "BaseModelInterface",
+    "GenerationCancelled",
     "ModelFactory",
     "create_model",
+    "ModelSwapper",
+    "TrafficMirror",
     "HuggingFaceModel",
+    "OnnxModel",
+    "GgufModel",
     "GroqModel",
+    "RouterModel",
+    "PoolModel",
 ]
 
 # Lazy property access
 def __getattr__(name):
     if name == "HuggingFaceModel":
         return _lazy_import_huggingface()
+    elif name == "OnnxModel":
+        return _lazy_import_onnx()
+    elif name == "GgufModel":
+        return _lazy_import_gguf()
     elif name == "GroqModel":
         return _lazy_import_groq()
+    elif name == "RouterModel":
+        return _lazy_import_router()
+    elif name == "PoolModel":
+        return _lazy_import_pool()
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
@@ -1,12 +1,29 @@
 """Base interface for model implementations."""
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+
+class GenerationCancelled(Exception):
+    """Raised when a generation is stopped by a cancel event or deadline."""
+    
+    def __init__(self, partial_text: str = "", reason: str = "cancelled"):
+        super().__init__(f"Generation stopped ({reason})")
+        self.partial_text = partial_text
+        self.reason = reason
 
 
 class BaseModelInterface(ABC):
     """Abstract base class for model interfaces."""
     
+    # Generations run concurrently unless ADMISSION_MAX_CONCURRENCY overrides it
+    max_concurrency: int = 4
+    # Backends that override generate_batch() with real batched inference
+    supports_batching: bool = False
+    # Generation parameters the server may lower under load
+    tunable_parameters: Tuple[str, ...] = ("max_new_tokens",)
+    
     @abstractmethod
     def load(self) -> None:
         """Load the model into memory."""
@@ -37,13 +54,148 @@ class BaseModelInterface(ABC):
             top_p: Nucleus sampling parameter
             top_k: Top-k sampling parameter
             do_sample: Whether to use sampling
-            **kwargs: Additional generation parameters
+            **kwargs: Additional generation parameters. Backends accept
+                ``cancel_event`` (threading.Event) and ``deadline``
+                (time.monotonic() value) to stop early.
             
         Returns:
             Generated text response
+            
+        Raises:
+            GenerationCancelled: If stopped by ``cancel_event`` or ``deadline``
         """
         pass
     
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+        cancel_event: Optional[threading.Event] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Generate a response as a stream of text deltas.
+        
+        The default implementation yields the complete generate() result as a
+        single delta. Backends that stream natively stop early once
+        ``cancel_event`` is set.
+        
+        Args:
+            prompt: Input prompt text
+            system_prompt: Optional system prompt to set context/behavior
+            conversation_history: Optional list of previous messages for context
+            cancel_event: Optional event that cancels the generation when set
+            **kwargs: Additional generation parameters (as for generate())
+            
+        Yields:
+            Generated text deltas
+        """
+        yield self.generate(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            conversation_history=conversation_history,
+            **kwargs
+        )
+    
+    def generate_batch(
+        self,
+        prompts: List[str],
+        system_prompt: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        **kwargs
+    ) -> List[str]:
+        """
+        Generate responses for independent single-turn prompts.
+        
+        The default implementation calls generate() once per prompt, so a
+        ``cancel_event`` or ``deadline`` passed in ``kwargs`` stops the batch
+        at the prompt being generated when it fires.
+        
+        Args:
+            prompts: Input prompt texts
+            system_prompt: Optional system prompt shared by all prompts
+            max_new_tokens: Maximum number of tokens to generate per prompt
+            temperature: Sampling temperature
+            **kwargs: Additional generation parameters
+            
+        Returns:
+            Generated text responses, in prompt order
+        """
+        self._set_last_batch_usage(None)
+        responses, usages = [], []
+        for prompt in prompts:
+            responses.append(self.generate(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                **kwargs
+            ))
+            usages.append(self.get_last_usage())
+        self._set_last_batch_usage(usages)
+        return responses
+    
+    def get_last_usage(self) -> Optional[Dict[str, int]]:
+        """
+        Get token usage of the last generation on the calling thread.
+        
+        Returns:
+            Dictionary with 'prompt_tokens', 'completion_tokens', 'total_tokens'
+            and 'cached_tokens', or None if the backend did not report usage
+        """
+        return getattr(self._usage_state(), "usage", None)
+    
+    def get_last_batch_usage(self) -> Optional[List[Optional[Dict[str, int]]]]:
+        """
+        Get per-prompt token usage of the last generate_batch() on the calling thread.
+        
+        Returns:
+            One usage dictionary (or None) per prompt, in prompt order, or None
+            if the last batch did not complete
+        """
+        return getattr(self._usage_state(), "batch_usage", None)
+    
+    def get_rate_limit(self) -> Optional[Dict[str, float]]:
+        """
+        Get the rate-limit budget last reported by a remote API.
+        
+        Returns:
+            Dictionary with at least 'remaining_fraction' (0 to 1), or None
+            for backends without rate limits
+        """
+        return None
+    
+    def _set_last_usage(self, usage: Optional[Dict[str, int]]) -> None:
+        """Record token usage of a generation for the calling thread."""
+        self._usage_state().usage = usage
+    
+    def _set_last_batch_usage(self, usages: Optional[List[Optional[Dict[str, int]]]]) -> None:
+        """Record per-prompt token usage of a batch for the calling thread."""
+        self._usage_state().batch_usage = usages
+    
+    def _usage_state(self) -> threading.local:
+        """Per-instance thread-local usage storage (created on first use)."""
+        state = self.__dict__.get("_usage_local")
+        if state is None:
+            state = self.__dict__.setdefault("_usage_local", threading.local())
+        return state
+    
+    def close(self) -> None:
+        """Release the resources held by the model (it cannot be used afterwards)."""
+        pass
+    
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Approximate memory held by the model in this process.
+        
+        Returns:
+            Byte counts by component; empty for backends that hold no
+            weights or caches locally
+        """
+        return {}
+    
     @abstractmethod
     def is_loaded(self) -> bool:
         """Check if the model is loaded."""
@@ -2,7 +2,7 @@
 
 import logging
 import importlib
-from typing import Type
+from typing import Type, Union
 
 from ..config import get_settings
 from .base import BaseModelInterface
@@ -13,9 +13,13 @@ logger = logging.getLogger(__name__)
 class ModelFactory:
     """Factory for creating model instances."""
     
-    _backends: dict[str, tuple[str, str]] = {
+    _backends: dict[str, Union[tuple[str, str], Type[BaseModelInterface]]] = {
         "huggingface": ("chatbruti.models.huggingface_model", "HuggingFaceModel"),
+        "onnx": ("chatbruti.models.onnx_model", "OnnxModel"),
+        "gguf": ("chatbruti.models.gguf_model", "GgufModel"),
         "groq": ("chatbruti.models.groq_model", "GroqModel"),
+        "router": ("chatbruti.models.router_model", "RouterModel"),
+        "pool": ("chatbruti.models.pool_model", "PoolModel"),
     }
     
     @classmethod
@@ -27,7 +31,12 @@ class ModelFactory:
                 f"Available backends: {list(cls._backends.keys())}"
             )
         
-        module_name, class_name = cls._backends[backend]
+        entry = cls._backends[backend]
+        if not isinstance(entry, tuple):
+            # Registered directly with register_backend()
+            return entry
+        
+        module_name, class_name = entry
         module = importlib.import_module(module_name)
         return getattr(module, class_name)
     
@@ -37,7 +46,7 @@ class ModelFactory:
         Create a model instance based on the backend.
         
         Args:
-            backend: Backend name ('huggingface' or 'groq')
+            backend: Backend name ('huggingface', 'onnx', 'gguf', 'groq', 'router' or 'pool')
             settings: Settings instance (optional)
             
         Returns:
@@ -47,14 +56,14 @@ class ModelFactory:
         backend = backend or settings.backend
         
         model_class = cls._load_backend_class(backend)
-        logger.info(f"Creating model with backend: {backend}")
+        logger.info("Creating model with backend: %s", backend)
         return model_class(settings=settings)
     
     @classmethod
     def register_backend(cls, name: str, model_class: Type[BaseModelInterface]):
         """Register a new backend."""
         cls._backends[name] = model_class
-        logger.info(f"Registered backend: {name}")
+        logger.info("Registered backend: %s", name)
 
 
 def create_model(backend: str = None, settings=None) -> BaseModelInterface:
@@ -0,0 +1,256 @@
+"""GGUF model implementation using llama.cpp."""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Iterator, Optional
+
+try:
+    from llama_cpp import Llama, LlamaRAMCache
+except ImportError:
+    Llama = None
+
+from ..config import get_settings
+from ..utils.context import build_messages
+from .base import BaseModelInterface, GenerationCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class GgufModel(BaseModelInterface):
+    """
+    Quantized GGUF model served by llama.cpp on CPU.
+    
+    The model file is memory-mapped, so replicas of the same file share
+    pages and start quickly. llama.cpp keeps the KV cache of the previous
+    prompt and reuses its longest common prefix; with ``gguf_cache_mb`` set,
+    prompt states are also kept in an LRU RAM cache, so switching between
+    conversations does not re-evaluate their whole history.
+    """
+    
+    # One llama.cpp context serves one generation at a time
+    max_concurrency = 1
+    
+    def __init__(self, settings=None):
+        """Initialize the GGUF model."""
+        self.settings = settings or get_settings()
+        self.llama = None
+        self._lock = threading.Lock()
+        
+        if Llama is None:
+            raise ImportError(
+                "llama-cpp-python is required for GGUF backend. "
+                "Install it with: pip install llama-cpp-python"
+            )
+    
+    def load(self) -> None:
+        """Load the GGUF model file."""
+        if self.is_loaded():
+            logger.info("Model already loaded")
+            return
+        
+        model_path = self.settings.gguf_model_path
+        if not model_path or not os.path.exists(model_path):
+            raise ValueError(f"GGUF_MODEL_PATH must point to a .gguf file (got: {model_path})")
+        
+        logger.info("Loading GGUF model: %s", model_path)
+        try:
+            self.llama = Llama(
+                model_path=model_path,
+                n_ctx=self.settings.gguf_n_ctx,
+                n_threads=self.settings.gguf_n_threads or None,
+                n_batch=self.settings.gguf_n_batch,
+                use_mmap=True,
+                chat_format=self.settings.gguf_chat_format,
+                verbose=False,
+            )
+            if self.settings.gguf_cache_mb:
+                cache_bytes = self.settings.gguf_cache_mb << 20
+                self.llama.set_cache(LlamaRAMCache(capacity_bytes=cache_bytes))
+            logger.info("GGUF model loaded successfully")
+        except Exception as e:
+            logger.error("Error loading GGUF model: %s", e)
+            raise
+    
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        cancel_event: Optional[threading.Event] = None,
+        deadline: Optional[float] = None,
+        **kwargs
+    ) -> str:
+        """
+        Generate a response with llama.cpp.
+        
+        With a ``cancel_event`` or ``deadline`` (a time.monotonic() value), the
+        completion is streamed so it can be stopped between tokens, raising
+        GenerationCancelled.
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Model not loaded. Call load() first.")
+        
+        if cancel_event is not None or deadline is not None:
+            cancel_event = cancel_event or threading.Event()
+            parts = list(self.generate_stream(
+                prompt, system_prompt, conversation_history, max_new_tokens,
+                temperature, top_p, top_k, cancel_event=cancel_event, deadline=deadline, **kwargs
+            ))
+            generated_text = "".join(parts).strip()
+            if cancel_event.is_set():
+                expired = deadline is not None and time.monotonic() >= deadline
+                raise GenerationCancelled(generated_text, "deadline" if expired else "cancelled")
+            return generated_text
+        
+        self._set_last_usage(None)
+        try:
+            with self._lock:
+                completion = self.llama.create_chat_completion(
+                    **self._completion_params(
+                        prompt, system_prompt, conversation_history, max_new_tokens,
+                        temperature, top_p, top_k, **kwargs
+                    )
+                )
+            self._set_last_usage(self._parse_usage(completion.get("usage")))
+            return (completion["choices"][0]["message"]["content"] or "").strip()
+        except Exception as e:
+            logger.error("Error during generation: %s", e)
+            raise
+    
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        cancel_event: Optional[threading.Event] = None,
+        deadline: Optional[float] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Stream a response as text deltas.
+        
+        Generation stops at the next token once ``cancel_event`` is set, the
+        ``deadline`` passes (which also sets ``cancel_event``) or the consumer
+        closes this generator.
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Model not loaded. Call load() first.")
+        
+        kwargs.pop("stream", None)
+        kwargs.pop("token_cache", None)
+        cancel_event = cancel_event or threading.Event()
+        params = self._completion_params(
+            prompt, system_prompt, conversation_history, max_new_tokens,
+            temperature, top_p, top_k, **kwargs
+        )
+        
+        self._set_last_usage(None)
+        completion_tokens = 0
+        with self._lock:
+            stream = self.llama.create_chat_completion(stream=True, **params)
+            try:
+                for chunk in stream:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        cancel_event.set()
+                    if cancel_event.is_set():
+                        break
+                    delta = chunk["choices"][0]["delta"].get("content")
+                    if delta:
+                        completion_tokens += 1
+                        yield delta
+            except Exception as e:
+                logger.error("Error during streaming: %s", e)
+                raise
+            finally:
+                stream.close()
+                # The context holds the prompt followed by the generated tokens
+                prompt_tokens = max(self.llama.n_tokens - completion_tokens, 0)
+                self._set_last_usage({
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "cached_tokens": 0,
+                })
+    
+    def _completion_params(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[list],
+        max_new_tokens: Optional[int],
+        temperature: Optional[float],
+        top_p: Optional[float],
+        top_k: Optional[int],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Build create_chat_completion parameters for a request."""
+        params = {
+            "messages": build_messages(prompt, system_prompt, conversation_history),
+            "max_tokens": max_new_tokens or self.settings.max_new_tokens,
+            "temperature": temperature if temperature is not None else self.settings.temperature,
+            "top_p": top_p if top_p is not None else self.settings.top_p,
+            "top_k": top_k if top_k is not None else self.settings.top_k,
+        }
+        if kwargs.get("stop") is not None:
+            params["stop"] = kwargs["stop"]
+        return params
+    
+    @staticmethod
+    def _parse_usage(usage: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+        """Convert llama.cpp usage to the common usage dictionary."""
+        if not usage:
+            return None
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+            "cached_tokens": 0,
+        }
+    
+    def close(self) -> None:
+        """Free the llama.cpp context and unmap the model file."""
+        with self._lock:
+            if self.llama is not None:
+                self.llama.close()
+                self.llama = None
+    
+    def memory_usage(self) -> Dict[str, Any]:
+        """Size of the memory-mapped model file and of the prompt state cache."""
+        llama = self.llama
+        if llama is None:
+            return {}
+        usage = {"mapped_file_bytes": os.path.getsize(self.settings.gguf_model_path)}
+        cache = getattr(llama, "cache", None)
+        if cache is not None:
+            usage["prompt_cache_bytes"] = cache.cache_size
+        return usage
+    
+    def is_loaded(self) -> bool:
+        """Check if the model is loaded."""
+        return self.llama is not None
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get information about the loaded model."""
+        if not self.is_loaded():
+            return {"status": "not_loaded"}
+        
+        return {
+            "status": "loaded",
+            "backend": "gguf",
+            "model_name": os.path.basename(self.settings.gguf_model_path),
+            "model_path": self.settings.gguf_model_path,
+            "n_ctx": self.llama.n_ctx(),
+            "n_threads": self.llama.n_threads,
+            "n_batch": self.llama.n_batch,
+            "ram_cache_mb": self.settings.gguf_cache_mb,
+        }
@@ -1,7 +1,9 @@
 """Groq API model implementation."""
 
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, Iterator, Optional
 
 try:
     from groq import Groq
@@ -9,7 +11,8 @@ except ImportError:
     Groq = None
 
 from ..config import get_settings
-from .base import BaseModelInterface
+from ..utils.context import build_messages
+from .base import BaseModelInterface, GenerationCancelled
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +20,15 @@ logger = logging.getLogger(__name__)
 class GroqModel(BaseModelInterface):
     """Groq API model implementation for cloud inference."""
     
+    # Requests are served remotely; the limit only bounds open connections
+    max_concurrency = 16
+    tunable_parameters = ("max_new_tokens", "reasoning_effort", "model")
+    
     def __init__(self, settings=None):
         """Initialize the Groq API model."""
         self.settings = settings or get_settings()
         self.client = None
+        self._rate_limit: Optional[Dict[str, float]] = None
         
         if Groq is None:
             raise ImportError(
@@ -41,11 +49,19 @@ class GroqModel(BaseModelInterface):
             )
         
         logger.info("Initializing Groq API client...")
+        client_kwargs = {
+            "api_key": api_key,
+            "max_retries": self.settings.groq_max_retries,
+            "timeout": self.settings.groq_timeout,
+        }
+        if self.settings.groq_base_url:
+            client_kwargs["base_url"] = self.settings.groq_base_url
+            logger.info("Using Groq API base URL: %s", self.settings.groq_base_url)
         try:
-            self.client = Groq(api_key=api_key)
+            self.client = Groq(**client_kwargs)
             logger.info("API client initialized successfully")
         except Exception as e:
-            logger.error(f"Error initializing API client: {e}")
+            logger.error("Error initializing API client: %s", e)
             raise
     
     def generate(
@@ -59,70 +75,223 @@ class GroqModel(BaseModelInterface):
         top_k: Optional[int] = None,
         do_sample: Optional[bool] = None,
         stream: bool = False,
+        cancel_event: Optional[threading.Event] = None,
+        deadline: Optional[float] = None,
         **kwargs
     ) -> str:
-        """Generate a response using Groq API."""
+        """
+        Generate a response using Groq API.
+        
+        With a ``cancel_event`` or ``deadline`` (a time.monotonic() value), the
+        completion is streamed so it can be abandoned between chunks, closing
+        the HTTP stream and raising GenerationCancelled.
+        """
         if not self.is_loaded():
             raise RuntimeError("API client not initialized. Call load() first.")
         
-        # Use settings defaults if not provided
-        max_completion_tokens = max_new_tokens or self.settings.max_new_tokens
-        temperature = temperature or self.settings.temperature
-        top_p = top_p or self.settings.top_p
-        reasoning_effort = kwargs.get("reasoning_effort", self.settings.reasoning_effort)
+        if cancel_event is not None or deadline is not None:
+            cancel_event = cancel_event or threading.Event()
+            parts = list(self.generate_stream(
+                prompt, system_prompt, conversation_history, max_new_tokens,
+                temperature, top_p, cancel_event=cancel_event, deadline=deadline, **kwargs
+            ))
+            generated_text = "".join(parts).strip()
+            if cancel_event.is_set():
+                expired = deadline is not None and time.monotonic() >= deadline
+                raise GenerationCancelled(generated_text, "deadline" if expired else "cancelled")
+            return generated_text
         
-        # Format messages for Groq API
-        messages = []
-        
-        # Add conversation history if provided
-        if conversation_history:
-            messages.extend(conversation_history)
-        
-        # Add system prompt if provided (only if not already in history)
-        if system_prompt and not any(msg.get("role") == "system" for msg in messages):
-            messages.append({"role": "system", "content": system_prompt})
-        
-        # Add current user prompt
-        messages.append({"role": "user", "content": prompt})
+        api_params = self._build_api_params(
+            prompt, system_prompt, conversation_history, max_new_tokens,
+            temperature, top_p, stream, **kwargs
+        )
         
+        self._set_last_usage(None)
         try:
-            # Prepare API call parameters
-            api_params = {
-                "model": self.settings.model_name,
-                "messages": messages,
-                "temperature": temperature,
-                "max_completion_tokens": max_completion_tokens,
-                "top_p": top_p,
-                "stream": stream,
-            }
-            
-            # Add reasoning_effort if specified (for reasoning models)
-            if reasoning_effort:
-                api_params["reasoning_effort"] = reasoning_effort
-            
-            # Add stop sequences if provided
-            if "stop" in kwargs and kwargs["stop"] is not None:
-                api_params["stop"] = kwargs["stop"]
-            
             # Call the API
-            completion = self.client.chat.completions.create(**api_params)
+            completion = self._create(api_params)
             
             # Handle streaming response
             if stream:
                 generated_text = ""
                 for chunk in completion:
-                    if chunk.choices[0].delta.content:
+                    self._record_chunk_usage(chunk)
+                    if chunk.choices and chunk.choices[0].delta.content:
                         generated_text += chunk.choices[0].delta.content
                 return generated_text.strip()
             else:
                 # Non-streaming response
+                self._set_last_usage(self._parse_usage(completion.usage))
                 generated_text = completion.choices[0].message.content
                 return generated_text.strip()
             
         except Exception as e:
-            logger.error(f"Error during API generation: {e}")
+            logger.error("Error during API generation: %s", e)
             raise
     
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        cancel_event: Optional[threading.Event] = None,
+        deadline: Optional[float] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Stream a response as text deltas using Groq API.
+        
+        The HTTP stream is closed as soon as ``cancel_event`` is set, the
+        ``deadline`` passes (which also sets ``cancel_event``) or the consumer
+        closes this generator.
+        """
+        if not self.is_loaded():
+            raise RuntimeError("API client not initialized. Call load() first.")
+        
+        kwargs.pop("stream", None)
+        cancel_event = cancel_event or threading.Event()
+        api_params = self._build_api_params(
+            prompt, system_prompt, conversation_history, max_new_tokens,
+            temperature, top_p, True, **kwargs
+        )
+        if deadline is not None:
+            # Bound connection and time to first chunk by the remaining budget
+            api_params["timeout"] = max(deadline - time.monotonic(), 0.1)
+        
+        self._set_last_usage(None)
+        if deadline is not None and time.monotonic() >= deadline:
+            cancel_event.set()
+        if cancel_event.is_set():
+            # Stopped before the request was sent; spend no API call on it
+            return
+        try:
+            completion = self._create(api_params)
+        except Exception as e:
+            if deadline is not None and time.monotonic() >= deadline:
+                # Timed out against the request deadline: report as cancelled
+                cancel_event.set()
+                return
+            logger.error("Error during API generation: %s", e)
+            raise
+        
+        try:
+            for chunk in completion:
+                if deadline is not None and time.monotonic() >= deadline:
+                    cancel_event.set()
+                if cancel_event.is_set():
+                    break
+                self._record_chunk_usage(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            if deadline is not None and time.monotonic() >= deadline:
+                # Read timed out against the request deadline
+                cancel_event.set()
+                return
+            logger.error("Error during API streaming: %s", e)
+            raise
+        finally:
+            completion.close()
+    
+    def _create(self, api_params: Dict[str, Any]):
+        """Create a chat completion, recording the rate-limit headers of the response."""
+        raw = self.client.chat.completions.with_raw_response.create(**api_params)
+        self._record_rate_limit(raw.headers)
+        return raw.parse()
+    
+    def _record_rate_limit(self, headers) -> None:
+        """Keep the remaining request and token budget reported by the API."""
+        budget: Dict[str, float] = {}
+        fractions = []
+        for kind in ("requests", "tokens"):
+            try:
+                limit = float(headers.get(f"x-ratelimit-limit-{kind}"))
+                remaining = float(headers.get(f"x-ratelimit-remaining-{kind}"))
+            except (TypeError, ValueError):
+                continue
+            budget[f"limit_{kind}"] = limit
+            budget[f"remaining_{kind}"] = remaining
+            if limit > 0:
+                fractions.append(remaining / limit)
+        if fractions:
+            budget["remaining_fraction"] = min(fractions)
+            self._rate_limit = budget
+    
+    def get_rate_limit(self) -> Optional[Dict[str, float]]:
+        """Get the rate-limit budget reported with the last API response."""
+        return self._rate_limit
+    
+    def _build_api_params(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[list],
+        max_new_tokens: Optional[int],
+        temperature: Optional[float],
+        top_p: Optional[float],
+        stream: bool,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Build chat completion parameters for a request."""
+        # Use settings defaults if not provided
+        max_completion_tokens = max_new_tokens or self.settings.max_new_tokens
+        temperature = temperature or self.settings.temperature
+        top_p = top_p or self.settings.top_p
+        reasoning_effort = kwargs.get("reasoning_effort", self.settings.reasoning_effort)
+        
+        # Stable system prompt first so the prompt prefix is cacheable across turns
+        messages = build_messages(prompt, system_prompt, conversation_history)
+        
+        # Prepare API call parameters
+        api_params = {
+            "model": kwargs.get("model") or self.settings.model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_completion_tokens": max_completion_tokens,
+            "top_p": top_p,
+            "stream": stream,
+        }
+        
+        # Add reasoning_effort if specified (for reasoning models)
+        if reasoning_effort:
+            api_params["reasoning_effort"] = reasoning_effort
+        
+        # Add stop sequences if provided
+        if "stop" in kwargs and kwargs["stop"] is not None:
+            api_params["stop"] = kwargs["stop"]
+        
+        return api_params
+    
+    def _record_chunk_usage(self, chunk) -> None:
+        """Record usage reported on a stream chunk (Groq sends it on the last chunk)."""
+        usage = getattr(chunk, "usage", None)
+        if usage is None:
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+        if usage is not None:
+            self._set_last_usage(self._parse_usage(usage))
+    
+    @staticmethod
+    def _parse_usage(usage) -> Optional[Dict[str, int]]:
+        """Convert an API usage object to a plain dictionary."""
+        if usage is None:
+            return None
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+            "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+        }
+    
+    def close(self) -> None:
+        """Close the API client's connections."""
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+    
     def is_loaded(self) -> bool:
         """Check if the API client is initialized."""
         return self.client is not None
@@ -1,32 +1,82 @@
 """Hugging Face model implementation."""
 
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import torch
 from transformers import (
     AutoTokenizer,
     AutoModelForCausalLM,
     BitsAndBytesConfig,
-    pipeline
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
 )
 
 from ..config import get_settings
-from .base import BaseModelInterface
+from ..utils.context import build_messages
+from .base import BaseModelInterface, GenerationCancelled
 
 logger = logging.getLogger(__name__)
 
+# Used when the tokenizer ships without a chat template
+FALLBACK_CHAT_TEMPLATE = (
+    "{% for message in messages %}"
+    "{% if message['role'] == 'system' %}{{ message['content'] }}\n\n"
+    "{% elif message['role'] == 'user' %}User: {{ message['content'] }}\n"
+    "{% else %}Assistant: {{ message['content'] }}\n"
+    "{% endif %}"
+    "{% endfor %}"
+    "{% if add_generation_prompt %}Assistant:{% endif %}"
+)
+
+
+class CancelledCriteria(StoppingCriteria):
+    """Stopping criterion that ends generation once an event is set or a deadline passes."""
+    
+    def __init__(self, cancel_event: threading.Event, deadline: Optional[float] = None):
+        self.cancel_event = cancel_event
+        self.deadline = deadline
+    
+    def __call__(
+        self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs
+    ) -> torch.BoolTensor:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel_event.set()
+        return torch.full(
+            (input_ids.shape[0],),
+            self.cancel_event.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device,
+        )
+
 
 class HuggingFaceModel(BaseModelInterface):
     """Hugging Face model implementation for local inference."""
     
+    # Concurrent generate() calls on one local model only compete for compute
+    max_concurrency = 1
+    # generate_batch() runs left-padded forward batches
+    supports_batching = True
+    
     def __init__(self, settings=None):
         """Initialize the Hugging Face model."""
         self.settings = settings or get_settings()
         self.model = None
         self.tokenizer = None
-        self.pipeline = None
+        self._supports_system_role = True
         self._device = None
         self._torch_dtype = None
+        self.draft_model = None
+        self._forward_counts = threading.local()
+        self._speculative_lock = threading.Lock()
+        self._speculative_stats = {
+            "generations": 0,
+            "new_tokens": 0,
+            "target_forwards": 0,
+            "draft_forwards": 0,
+        }
         
     def _determine_device(self) -> str:
         """Determine the best device to use."""
@@ -79,21 +129,12 @@ class HuggingFaceModel(BaseModelInterface):
             logger.info("Model already loaded")
             return
         
-        logger.info(f"Loading model: {self.settings.model_name}")
-        logger.info(f"Device: {self._determine_device()}")
-        logger.info(f"Dtype: {self._determine_dtype()}")
+        logger.info("Loading model: %s", self.settings.model_name)
+        logger.info("Device: %s", self._determine_device())
+        logger.info("Dtype: %s", self._determine_dtype())
         
         try:
-            # Load tokenizer
-            logger.info("Loading tokenizer...")
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                self.settings.model_name,
-                trust_remote_code=True,
-            )
-            
-            # Set pad token if not set
-            if self.tokenizer.pad_token is None:
-                self.tokenizer.pad_token = self.tokenizer.eos_token
+            self._load_tokenizer()
             
             # Prepare model loading kwargs
             model_kwargs = {
@@ -104,7 +145,7 @@ class HuggingFaceModel(BaseModelInterface):
             quantization_config = self._create_quantization_config()
             if quantization_config:
                 model_kwargs["quantization_config"] = quantization_config
-                logger.info(f"Using quantization: {quantization_config}")
+                logger.info("Using quantization: %s", quantization_config)
             
             # Add device map for multi-GPU or CPU
             device = self._determine_device()
@@ -128,20 +169,35 @@ class HuggingFaceModel(BaseModelInterface):
             self._device = device
             self._torch_dtype = self._determine_dtype()
             
-            # Create pipeline for easier generation
-            self.pipeline = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device=0 if device == "cuda" else -1,
-            )
+            # Load draft model for assisted generation if configured
+            if self.settings.draft_model_name:
+                self._load_draft_model(model_kwargs, device, quantization_config)
+            self._register_forward_counters()
             
             logger.info("Model loaded successfully")
             
         except Exception as e:
-            logger.error(f"Error loading model: {e}")
+            logger.error("Error loading model: %s", e)
             raise
     
+    def _load_tokenizer(self) -> None:
+        """Load the tokenizer and prepare its chat template."""
+        logger.info("Loading tokenizer...")
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            self.settings.model_name,
+            trust_remote_code=True,
+        )
+        
+        # Set pad token if not set
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        
+        # Prompts are built with the tokenizer's chat template
+        if not self.tokenizer.chat_template:
+            logger.warning("Tokenizer has no chat template, using a plain User/Assistant template")
+            self.tokenizer.chat_template = FALLBACK_CHAT_TEMPLATE
+        self._supports_system_role = self._probe_system_role()
+    
     def generate(
         self,
         prompt: str,
@@ -152,9 +208,137 @@ class HuggingFaceModel(BaseModelInterface):
         top_p: Optional[float] = None,
         top_k: Optional[int] = None,
         do_sample: Optional[bool] = None,
+        token_cache: Optional[Dict[str, Any]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        deadline: Optional[float] = None,
         **kwargs
     ) -> str:
-        """Generate a response from the model."""
+        """
+        Generate a response from the model.
+        
+        The prompt is rendered with the tokenizer's chat template. When a
+        ``token_cache`` (see ``ConversationHistory.token_cache``) is passed,
+        token ids of earlier messages are reused and only new turns are tokenized.
+        Generation stops at the next token once ``cancel_event`` is set or
+        ``deadline`` (a time.monotonic() value) passes, raising GenerationCancelled.
+        """
+        if cancel_event is None and deadline is not None:
+            cancel_event = threading.Event()
+        input_tensor, generation_kwargs = self._prepare_generation(
+            prompt, system_prompt, conversation_history, max_new_tokens,
+            temperature, top_p, top_k, do_sample, token_cache,
+            cancel_event=cancel_event, deadline=deadline, **kwargs
+        )
+        
+        try:
+            self._reset_forward_counts()
+            
+            with torch.inference_mode():
+                output = self.model.generate(
+                    input_ids=input_tensor,
+                    attention_mask=torch.ones_like(input_tensor),
+                    **generation_kwargs
+                )
+            
+            # Decode only the newly generated tokens
+            new_ids = output[0, input_tensor.shape[1]:]
+            self._record_speculative_stats(len(new_ids))
+            self._set_last_usage(self._usage(input_tensor.shape[1], len(new_ids)))
+            generated_text = self.tokenizer.decode(new_ids, skip_special_tokens=True)
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled(generated_text.strip(), self._cancel_reason(deadline))
+            return generated_text.strip()
+            
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            logger.error("Error during generation: %s", e)
+            raise
+    
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        do_sample: Optional[bool] = None,
+        token_cache: Optional[Dict[str, Any]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        deadline: Optional[float] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Stream a response as text deltas.
+        
+        Generation runs on a background thread feeding a TextIteratorStreamer.
+        It stops at the next token once ``cancel_event`` is set, ``deadline``
+        passes (which also sets ``cancel_event``) or the consumer closes this
+        generator.
+        """
+        cancel_event = cancel_event or threading.Event()
+        input_tensor, generation_kwargs = self._prepare_generation(
+            prompt, system_prompt, conversation_history, max_new_tokens,
+            temperature, top_p, top_k, do_sample, token_cache,
+            cancel_event=cancel_event, deadline=deadline, **kwargs
+        )
+        streamer = TextIteratorStreamer(
+            self.tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        errors = []
+        new_tokens = []
+        
+        def run() -> None:
+            try:
+                self._reset_forward_counts()
+                with torch.inference_mode():
+                    output = self.model.generate(
+                        input_ids=input_tensor,
+                        attention_mask=torch.ones_like(input_tensor),
+                        streamer=streamer,
+                        **generation_kwargs
+                    )
+                new_tokens.append(output.shape[1] - input_tensor.shape[1])
+                self._record_speculative_stats(new_tokens[0])
+            except Exception as e:
+                logger.error("Error during streaming generation: %s", e)
+                errors.append(e)
+                streamer.end()
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        finally:
+            # Stop generation if the consumer went away early
+            cancel_event.set()
+            thread.join()
+            if new_tokens:
+                self._set_last_usage(self._usage(input_tensor.shape[1], new_tokens[0]))
+        
+        if errors:
+            raise errors[0]
+    
+    def _prepare_generation(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[list],
+        max_new_tokens: Optional[int],
+        temperature: Optional[float],
+        top_p: Optional[float],
+        top_k: Optional[int],
+        do_sample: Optional[bool],
+        token_cache: Optional[Dict[str, Any]],
+        cancel_event: Optional[threading.Event] = None,
+        deadline: Optional[float] = None,
+        **kwargs
+    ) -> Tuple[torch.Tensor, Dict[str, Any]]:
+        """Build the input ids and model.generate kwargs for a single prompt."""
         if not self.is_loaded():
             raise RuntimeError("Model not loaded. Call load() first.")
         
@@ -165,59 +349,343 @@ class HuggingFaceModel(BaseModelInterface):
         top_k = top_k or self.settings.top_k
         do_sample = do_sample if do_sample is not None else self.settings.do_sample
         
-        # Build full prompt with conversation history
-        full_prompt_parts = []
+        # Callers may pass a "stream" flag, which model.generate does not accept
+        kwargs.pop("stream", None)
+        self._set_last_usage(None)
         
-        # Add conversation history if provided
-        if conversation_history:
-            for msg in conversation_history:
-                if msg.get("role") == "user":
-                    full_prompt_parts.append(f"User: {msg.get('content', '')}")
-                elif msg.get("role") == "assistant":
-                    full_prompt_parts.append(f"Assistant: {msg.get('content', '')}")
+        messages = self._build_chat_messages(prompt, system_prompt, conversation_history)
+        input_ids = self._encode_messages(messages, token_cache)
         
-        # Add current prompt
-        full_prompt_parts.append(f"User: {prompt}")
+        generation_kwargs = self._generation_kwargs(
+            max_new_tokens, temperature, top_p, top_k, do_sample
+        )
+        generation_kwargs.update(self._speculative_kwargs())
+        if cancel_event is not None:
+            generation_kwargs["stopping_criteria"] = StoppingCriteriaList(
+                [CancelledCriteria(cancel_event, deadline)]
+            )
+        generation_kwargs.update(kwargs)
         
-        # Combine all parts
-        combined_prompt = "\n".join(full_prompt_parts)
+        input_tensor = torch.tensor([input_ids], device=self.model.device)
+        return input_tensor, generation_kwargs
+    
+    def generate_batch(
+        self,
+        prompts: List[str],
+        system_prompt: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        do_sample: Optional[bool] = None,
+        cancel_event: Optional[threading.Event] = None,
+        deadline: Optional[float] = None,
+        **kwargs
+    ) -> List[str]:
+        """
+        Generate responses for several prompts in one left-padded forward batch.
         
-        # Format prompt for Mistral Instruct (include system prompt if provided)
-        if system_prompt:
-            formatted_prompt = self._format_prompt_with_system(system_prompt, combined_prompt)
-        else:
-            formatted_prompt = self._format_prompt(combined_prompt)
+        Speculative decoding is skipped here since assisted generation only
+        supports a batch size of one. A ``cancel_event`` or ``deadline`` (a
+        time.monotonic() value) stops the whole batch.
         
-        try:
-            # Generate using pipeline
-            outputs = self.pipeline(
-                formatted_prompt,
-                max_new_tokens=max_new_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                top_k=top_k,
-                do_sample=do_sample,
-                return_full_text=False,
-                **kwargs
+        Raises:
+            GenerationCancelled: If the batch was cancelled or hit the deadline
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Model not loaded. Call load() first.")
+        self._set_last_batch_usage(None)
+        if not prompts:
+            return []
+        
+        # Use settings defaults if not provided
+        max_new_tokens = max_new_tokens or self.settings.max_new_tokens
+        temperature = temperature or self.settings.temperature
+        top_p = top_p or self.settings.top_p
+        top_k = top_k or self.settings.top_k
+        do_sample = do_sample if do_sample is not None else self.settings.do_sample
+        kwargs.pop("stream", None)
+        
+        encoded = [
+            self._encode_messages(self._build_chat_messages(prompt, system_prompt))
+            for prompt in prompts
+        ]
+        max_len = max(len(ids) for ids in encoded)
+        pad_id = self.tokenizer.pad_token_id
+        input_ids = [[pad_id] * (max_len - len(ids)) + ids for ids in encoded]
+        attention_mask = [[0] * (max_len - len(ids)) + [1] * len(ids) for ids in encoded]
+        
+        generation_kwargs = self._generation_kwargs(
+            max_new_tokens, temperature, top_p, top_k, do_sample
+        )
+        if cancel_event is not None or deadline is not None:
+            cancel_event = cancel_event or threading.Event()
+            generation_kwargs["stopping_criteria"] = StoppingCriteriaList(
+                [CancelledCriteria(cancel_event, deadline)]
             )
-            
-            # Extract generated text
-            generated_text = outputs[0]["generated_text"]
-            return generated_text.strip()
-            
+        generation_kwargs.update(kwargs)
+        
+        try:
+            with torch.inference_mode():
+                output = self.model.generate(
+                    input_ids=torch.tensor(input_ids, device=self.model.device),
+                    attention_mask=torch.tensor(attention_mask, device=self.model.device),
+                    **generation_kwargs
+                )
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled("", self._cancel_reason(deadline))
+            # Finished rows are padded up to the longest one; padding is not output
+            self._set_last_batch_usage([
+                self._usage(len(ids), int((row[max_len:] != pad_id).sum()))
+                for ids, row in zip(encoded, output)
+            ])
+            return [
+                self.tokenizer.decode(row[max_len:], skip_special_tokens=True).strip()
+                for row in output
+            ]
+        except GenerationCancelled:
+            raise
         except Exception as e:
-            logger.error(f"Error during generation: {e}")
+            logger.error("Error during batch generation: %s", e)
             raise
     
-    def _format_prompt(self, prompt: str) -> str:
-        """Format prompt for Mistral Instruct model."""
-        # Mistral Instruct uses a specific format
-        return f"<s>[INST] {prompt} [/INST]"
+    def _generation_kwargs(
+        self,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        top_k: int,
+        do_sample: bool,
+    ) -> Dict[str, Any]:
+        """Build the keyword arguments shared by all model.generate calls."""
+        generation_kwargs = {
+            "max_new_tokens": max_new_tokens,
+            "do_sample": do_sample,
+            "pad_token_id": self.tokenizer.pad_token_id,
+        }
+        if do_sample:
+            generation_kwargs.update(temperature=temperature, top_p=top_p, top_k=top_k)
+        return generation_kwargs
+    
+    def _build_chat_messages(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+    ) -> List[Dict[str, str]]:
+        """Build the chat message list passed to the chat template."""
+        if self._supports_system_role:
+            return build_messages(prompt, system_prompt, conversation_history)
+        
+        # Templates without a system role get the system prompt in the first user turn
+        messages = build_messages(prompt, None, conversation_history)
+        if system_prompt:
+            for msg in messages:
+                if msg["role"] == "user":
+                    msg["content"] = f"{system_prompt}\n\n{msg['content']}"
+                    break
+        return messages
+    
+    @staticmethod
+    def _cancel_reason(deadline: Optional[float]) -> str:
+        """Tell whether a stopped generation hit its deadline or was cancelled."""
+        if deadline is not None and time.monotonic() >= deadline:
+            return "deadline"
+        return "cancelled"
+    
+    @staticmethod
+    def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+        """Build a usage dictionary for a local generation."""
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cached_tokens": 0,
+        }
+    
+    def _render_chat(self, messages: List[Dict[str, str]], add_generation_prompt: bool) -> str:
+        """Render messages to text with the tokenizer's chat template."""
+        return self.tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=add_generation_prompt,
+        )
+    
+    def _tokenize(self, text: str) -> List[int]:
+        """Tokenize rendered template text (special tokens are already in the text)."""
+        if not text:
+            return []
+        return self.tokenizer(text, add_special_tokens=False)["input_ids"]
     
-    def _format_prompt_with_system(self, system_prompt: str, user_prompt: str) -> str:
-        """Format prompt with system message for Mistral Instruct model."""
-        # Mistral Instruct format with system prompt
-        return f"<s>[INST] {system_prompt}\n\n{user_prompt} [/INST]"
+    def _encode_messages(
+        self,
+        messages: List[Dict[str, str]],
+        token_cache: Optional[Dict[str, Any]] = None,
+    ) -> List[int]:
+        """
+        Encode chat messages to input ids, reusing cached per-message token ids.
+        
+        Each cached entry holds the template text a message contributes and its
+        token ids. Entries are reused while they match the leading messages;
+        only the remaining messages and the generation prompt are tokenized.
+        Templates that are not append-only (e.g. ones that move the system
+        prompt to the last user turn) fall back to tokenizing the full prompt.
+        The cache is tied to the tokenizer that filled it, so after a model
+        swap ids of another vocabulary are never reused.
+        """
+        full_text = self._render_chat(messages, add_generation_prompt=True)
+        if token_cache is None:
+            return self._tokenize(full_text)
+        
+        tokenizer_key = (getattr(self.tokenizer, "name_or_path", None), len(self.tokenizer))
+        if token_cache.get("tokenizer") != tokenizer_key:
+            token_cache["tokenizer"] = tokenizer_key
+            token_cache["messages"] = []
+        
+        entries = []
+        for entry, msg in zip(token_cache.get("messages", []), messages):
+            if entry["role"] != msg["role"] or entry["content"] != msg["content"]:
+                break
+            entries.append(entry)
+        
+        prefix = "".join(entry["text"] for entry in entries)
+        if not full_text.startswith(prefix):
+            entries, prefix = [], ""
+        
+        for i in range(len(entries), len(messages)):
+            rendered = self._render_chat(messages[: i + 1], add_generation_prompt=False)
+            if not rendered.startswith(prefix) or not full_text.startswith(rendered):
+                token_cache["messages"] = []
+                return self._tokenize(full_text)
+            
+            segment = rendered[len(prefix):]
+            entries.append({
+                "role": messages[i]["role"],
+                "content": messages[i]["content"],
+                "text": segment,
+                "ids": self._tokenize(segment),
+            })
+            prefix = rendered
+        
+        token_cache["messages"] = entries
+        input_ids = [token_id for entry in entries for token_id in entry["ids"]]
+        input_ids.extend(self._tokenize(full_text[len(prefix):]))
+        return input_ids
+    
+    def _probe_system_role(self) -> bool:
+        """Check whether the chat template accepts a system message."""
+        try:
+            self._render_chat(
+                [{"role": "system", "content": "system"}, {"role": "user", "content": "user"}],
+                add_generation_prompt=True,
+            )
+            return True
+        except Exception:
+            logger.info("Chat template has no system role, merging system prompt into user turn")
+            return False
+    
+    def _load_draft_model(
+        self, model_kwargs: Dict[str, Any], device: str, quantization_config
+    ) -> None:
+        """Load the small draft model used for assisted generation."""
+        logger.info("Loading draft model: %s", self.settings.draft_model_name)
+        self.draft_model = AutoModelForCausalLM.from_pretrained(
+            self.settings.draft_model_name,
+            **model_kwargs
+        )
+        if device != "cuda" or quantization_config:
+            self.draft_model = self.draft_model.to(device)
+        
+        # The draft model proposes this many tokens per round; "heuristic"
+        # adapts the count to the observed acceptance rate.
+        self.draft_model.generation_config.num_assistant_tokens = self.settings.num_assistant_tokens
+        self.draft_model.generation_config.num_assistant_tokens_schedule = "heuristic"
+    
+    def _speculative_mode(self) -> Optional[str]:
+        """Return the active speculative decoding mode, if any."""
+        if self.draft_model is not None:
+            return "assisted"
+        if self.settings.prompt_lookup_num_tokens:
+            return "prompt_lookup"
+        return None
+    
+    def _speculative_kwargs(self) -> Dict[str, Any]:
+        """Build generation kwargs for the active speculative decoding mode."""
+        mode = self._speculative_mode()
+        if mode == "assisted":
+            return {"assistant_model": self.draft_model}
+        if mode == "prompt_lookup":
+            return {"prompt_lookup_num_tokens": self.settings.prompt_lookup_num_tokens}
+        return {}
+    
+    def _register_forward_counters(self) -> None:
+        """Count forward passes of the main and draft models per generating thread."""
+        def make_hook(name):
+            def hook(module, args, output):
+                setattr(self._forward_counts, name, getattr(self._forward_counts, name, 0) + 1)
+            return hook
+        
+        self.model.register_forward_hook(make_hook("target"))
+        if self.draft_model is not None:
+            self.draft_model.register_forward_hook(make_hook("draft"))
+    
+    def _reset_forward_counts(self) -> None:
+        """Reset the forward pass counters of the current thread."""
+        self._forward_counts.target = 0
+        self._forward_counts.draft = 0
+    
+    def _record_speculative_stats(self, new_tokens: int) -> None:
+        """Accumulate forward pass counters of the last generation."""
+        with self._speculative_lock:
+            stats = self._speculative_stats
+            stats["generations"] += 1
+            stats["new_tokens"] += new_tokens
+            stats["target_forwards"] += self._forward_counts.target
+            stats["draft_forwards"] += self._forward_counts.draft
+    
+    def get_speculative_stats(self) -> Dict[str, Any]:
+        """
+        Get speculative decoding metrics.
+        
+        Plain decoding produces one token per forward pass of the main model,
+        so every token beyond that count was proposed by the draft (or by
+        prompt lookup) and accepted. The acceptance rate is approximate: each
+        draft forward pass is counted as one proposed token.
+        """
+        with self._speculative_lock:
+            stats = dict(self._speculative_stats)
+        
+        accepted = max(stats["new_tokens"] - stats["target_forwards"], 0)
+        stats["mode"] = self._speculative_mode()
+        stats["accepted_tokens"] = accepted
+        stats["tokens_per_target_forward"] = (
+            stats["new_tokens"] / stats["target_forwards"] if stats["target_forwards"] else None
+        )
+        stats["acceptance_rate"] = (
+            accepted / stats["draft_forwards"] if stats["draft_forwards"] else None
+        )
+        return stats
+    
+    def close(self) -> None:
+        """Drop the model weights and return cached GPU memory."""
+        self.model = None
+        self.draft_model = None
+        self.tokenizer = None
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
+    def memory_usage(self) -> Dict[str, Any]:
+        """Bytes of the parameters and buffers of the model and draft model."""
+        usage = {}
+        for name, model in (("model", self.model), ("draft_model", self.draft_model)):
+            if model is None:
+                continue
+            usage[name] = {
+                "device": str(model.device),
+                "parameter_bytes": sum(p.numel() * p.element_size() for p in model.parameters()),
+                "buffer_bytes": sum(b.numel() * b.element_size() for b in model.buffers()),
+            }
+        return usage
     
     def is_loaded(self) -> bool:
         """Check if the model is loaded."""
@@ -237,5 +705,7 @@ class HuggingFaceModel(BaseModelInterface):
                 "8bit": self.settings.load_in_8bit,
                 "4bit": self.settings.load_in_4bit,
             },
+            "draft_model_name": self.settings.draft_model_name,
+            "speculative_decoding": self.get_speculative_stats(),
         }
 
@@ -0,0 +1,246 @@
+"""Mirroring of sampled production requests to a candidate model."""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils.metrics import metrics
+from .base import BaseModelInterface
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ("primary", "candidate")
+
+
+class TrafficMirror:
+    """
+    Replay a sample of served requests on a candidate model and compare.
+    
+    Mirroring never delays the request it copies: the candidate runs on its
+    own worker threads after the primary response is ready, its output is
+    discarded, and a request is dropped instead of queued when all of the
+    candidate's ``max_concurrency`` slots are busy. Latency, time to first
+    token, token counts and errors of the primary and candidate runs of the
+    same requests are recorded side by side.
+    """
+    
+    def __init__(
+        self,
+        build: Callable[[], BaseModelInterface],
+        rate: float,
+        max_concurrency: int = 0,
+        timeout_seconds: float = 120.0,
+    ):
+        """
+        Initialize the mirror and load the candidate in the background.
+        
+        Args:
+            build: Creates the (unloaded) candidate model
+            rate: Fraction of requests to mirror (0 to 1)
+            max_concurrency: Maximum concurrent candidate generations
+                (0 uses the candidate's own limit, which also caps it)
+            timeout_seconds: Deadline of a candidate generation
+        """
+        self.rate = rate
+        self.timeout_seconds = timeout_seconds
+        self.candidate: Optional[BaseModelInterface] = None
+        self.state = "loading"
+        self.error: Optional[str] = None
+        self._requested_concurrency = max_concurrency
+        self.max_concurrency = 0
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._totals = {
+            target: {"requests": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+            for target in TARGETS
+        }
+        self._dropped: Dict[str, int] = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._load, args=(build,), name="mirror-load", daemon=True).start()
+    
+    def _load(self, build: Callable[[], BaseModelInterface]) -> None:
+        """Build and load the candidate, then start accepting requests."""
+        try:
+            candidate = build()
+            candidate.load()
+        except Exception as e:
+            logger.error("Mirror candidate failed to load, mirroring disabled: %s", e)
+            self.state = "failed"
+            self.error = str(e)
+            return
+        limit = candidate.max_concurrency
+        self.max_concurrency = max(min(self._requested_concurrency or limit, limit), 1)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="mirror"
+        )
+        self.candidate = candidate
+        self.state = "ready"
+        logger.info(
+            "Mirroring %.0f%% of requests to candidate %s",
+            self.rate * 100,
+            candidate.get_model_info(),
+        )
+    
+    def submit(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[List[Dict[str, str]]],
+        params: Dict[str, Any],
+        primary: Dict[str, Any],
+    ) -> bool:
+        """
+        Mirror a served request if it is sampled and a candidate slot is free.
+        
+        Returns immediately; the candidate runs in the background.
+        
+        Args:
+            prompt: User message of the request
+            system_prompt: System prompt sent to the primary model
+            conversation_history: Earlier turns sent to the primary model
+            params: Generation parameters of the primary request
+            primary: Primary run: 'latency', 'usage' and 'error', and 'ttft'
+                when it was streamed
+        
+        Returns:
+            Whether the request was mirrored
+        """
+        if self.rate <= 0 or random.random() >= self.rate:
+            return False
+        if self.state != "ready":
+            self._drop("unavailable")
+            return False
+        if not self._slots.acquire(blocking=False):
+            self._drop("busy")
+            return False
+        
+        with self._lock:
+            self._in_flight += 1
+        self._record(
+            "primary",
+            primary.get("latency"),
+            primary.get("ttft"),
+            primary.get("usage"),
+            primary.get("error"),
+        )
+        params = {
+            key: value for key, value in params.items()
+            if key == "temperature" or key in self.candidate.tunable_parameters
+        }
+        history = [dict(message) for message in conversation_history or []]
+        try:
+            self._pool.submit(self._run, prompt, system_prompt, history, params)
+        except RuntimeError:
+            self._release()
+            return False
+        return True
+    
+    def _run(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        history: List[Dict[str, str]],
+        params: Dict[str, Any],
+    ) -> None:
+        """Generate on the candidate, measuring time to first token, and discard the text."""
+        started = time.perf_counter()
+        ttft = None
+        try:
+            for _ in self.candidate.generate_stream(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                conversation_history=history,
+                cancel_event=threading.Event(),
+                deadline=time.monotonic() + self.timeout_seconds,
+                **params,
+            ):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+            self._record(
+                "candidate",
+                time.perf_counter() - started,
+                ttft,
+                self.candidate.get_last_usage(),
+                None,
+            )
+        except Exception as e:
+            logger.debug("Mirrored request failed on the candidate: %s", e)
+            self._record("candidate", time.perf_counter() - started, ttft, None, str(e))
+        finally:
+            self._release()
+    
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+    
+    def _record(
+        self,
+        target: str,
+        latency: Optional[float],
+        ttft: Optional[float],
+        usage: Optional[Dict[str, int]],
+        error: Optional[str],
+    ) -> None:
+        """Record one run of a mirrored request."""
+        metrics.inc("mirror_requests", target=target, result="error" if error else "ok")
+        with self._lock:
+            totals = self._totals[target]
+            totals["requests"] += 1
+            if error:
+                totals["errors"] += 1
+            elif usage:
+                totals["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                totals["completion_tokens"] += usage.get("completion_tokens", 0)
+        if error:
+            return
+        if latency is not None:
+            metrics.observe("mirror_latency_seconds", latency, target=target)
+        if ttft is not None:
+            metrics.observe("mirror_ttft_seconds", ttft, target=target)
+        if usage:
+            metrics.observe(
+                "mirror_completion_tokens", usage.get("completion_tokens", 0), target=target
+            )
+    
+    def _drop(self, reason: str) -> None:
+        metrics.inc("mirror_dropped", reason=reason)
+        with self._lock:
+            self._dropped[reason] = self._dropped.get(reason, 0) + 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Side-by-side comparison of the primary and candidate runs."""
+        with self._lock:
+            totals = {target: dict(values) for target, values in self._totals.items()}
+            dropped = dict(self._dropped)
+            in_flight = self._in_flight
+        
+        comparison = {}
+        for target, values in totals.items():
+            succeeded = values["requests"] - values["errors"]
+            comparison[target] = {
+                **values,
+                "error_rate": values["errors"] / values["requests"] if values["requests"] else None,
+                "mean_completion_tokens": (
+                    values["completion_tokens"] / succeeded if succeeded else None
+                ),
+                "latency_p50": metrics.percentile("mirror_latency_seconds", 50, target=target),
+                "latency_p95": metrics.percentile("mirror_latency_seconds", 95, target=target),
+                "ttft_p50": metrics.percentile("mirror_ttft_seconds", 50, target=target),
+                "ttft_p95": metrics.percentile("mirror_ttft_seconds", 95, target=target),
+            }
+        return {
+            "state": self.state,
+            "error": self.error,
+            "rate": self.rate,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": in_flight,
+            "candidate_model": self.candidate.get_model_info() if self.candidate else None,
+            "dropped": dropped,
+            "comparison": comparison,
+        }
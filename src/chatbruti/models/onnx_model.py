@@ -0,0 +1,208 @@
+"""ONNX Runtime model implementation for CPU inference."""
+
+import glob
+import logging
+import os
+import re
+import shutil
+import tempfile
+from typing import Dict, Any, Optional
+
+import torch
+
+try:
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForCausalLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+except ImportError:
+    ort = None
+    ORTModelForCausalLM = None
+
+from .huggingface_model import HuggingFaceModel
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE_NAME = "model.onnx"
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+
+class OnnxModel(HuggingFaceModel):
+    """
+    Causal LM exported to ONNX and run on ONNX Runtime's CPU execution provider.
+    
+    The graph is exported with KV-cache inputs, so decoding reuses past keys
+    and values like the PyTorch model. Tokenization, chat templates,
+    streaming, batching and cancellation are shared with HuggingFaceModel.
+    Draft-model speculative decoding is not available; prompt lookup is.
+    """
+    
+    def __init__(self, settings=None):
+        """Initialize the ONNX Runtime model."""
+        super().__init__(settings)
+        self._model_path: Optional[str] = None
+        
+        if ORTModelForCausalLM is None:
+            raise ImportError(
+                "optimum[onnxruntime] is required for ONNX backend. "
+                "Install it with: pip install optimum[onnxruntime]"
+            )
+    
+    def load(self) -> None:
+        """Load (exporting and quantizing if needed) the ONNX model and tokenizer."""
+        if self.is_loaded():
+            logger.info("Model already loaded")
+            return
+        
+        logger.info("Loading ONNX model: %s", self.settings.model_name)
+        
+        try:
+            self._load_tokenizer()
+            
+            model_dir = self.settings.onnx_model_dir or self._cache_dir()
+            if glob.glob(os.path.join(model_dir, "*.onnx")):
+                logger.info("Using exported ONNX model from %s", model_dir)
+            else:
+                self._export(model_dir)
+            
+            # Name the file explicitly: the directory may also hold a quantized copy
+            file_name = (
+                self._quantize(model_dir) if self.settings.onnx_quantize else MODEL_FILE_NAME
+            )
+            
+            self.model = ORTModelForCausalLM.from_pretrained(
+                model_dir,
+                file_name=file_name,
+                use_cache=True,
+                provider="CPUExecutionProvider",
+                session_options=self._session_options(),
+            )
+            self._model_path = os.path.join(model_dir, file_name)
+            self._device = "cpu"
+            self._torch_dtype = torch.float32
+            
+            if self.settings.draft_model_name:
+                logger.warning("DRAFT_MODEL_NAME is ignored by the ONNX backend")
+            self._register_forward_counters()
+            
+            logger.info("ONNX model loaded successfully")
+        
+        except Exception as e:
+            logger.error("Error loading ONNX model: %s", e)
+            raise
+    
+    def _cache_dir(self) -> str:
+        """Export directory of the model when ONNX_MODEL_DIR is unset, reused across loads."""
+        cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        name = re.sub(r"[^A-Za-z0-9._-]+", "--", self.settings.model_name)
+        return os.path.join(cache, "chatbruti", "onnx", name)
+    
+    def _export(self, model_dir: str) -> None:
+        """
+        Export the Hugging Face model to ONNX into ``model_dir``.
+        
+        The export is written next to ``model_dir`` and renamed into place, so
+        an interrupted export leaves nothing behind and concurrent loads (e.g.
+        pool replicas) never read a partial model.
+        """
+        logger.info("Exporting model to ONNX (this may take a while)...")
+        model = ORTModelForCausalLM.from_pretrained(
+            self.settings.model_name,
+            export=True,
+            use_cache=True,
+            trust_remote_code=True,
+        )
+        parent = os.path.dirname(os.path.abspath(model_dir))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".chatbruti-onnx-", dir=parent)
+        try:
+            model.save_pretrained(staging)
+            if os.path.isdir(model_dir) and not os.listdir(model_dir):
+                os.rmdir(model_dir)
+            try:
+                os.rename(staging, model_dir)
+            except OSError:
+                # Another process finished the same export first
+                if not glob.glob(os.path.join(model_dir, "*.onnx")):
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        logger.info("Exported ONNX model to %s", model_dir)
+    
+    def _quantize(self, model_dir: str) -> str:
+        """Dynamically quantize the weights to int8 and return the quantized file name."""
+        if os.path.exists(os.path.join(model_dir, QUANTIZED_FILE_NAME)):
+            return QUANTIZED_FILE_NAME
+        
+        logger.info("Quantizing ONNX model to int8...")
+        quantizer = ORTQuantizer.from_pretrained(model_dir, file_name=MODEL_FILE_NAME)
+        if self._has_cpu_flag("avx512_vnni"):
+            config = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        else:
+            config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=model_dir, quantization_config=config)
+        return QUANTIZED_FILE_NAME
+    
+    def _session_options(self):
+        """ONNX Runtime session options with the configured thread count."""
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.settings.onnx_num_threads:
+            options.intra_op_num_threads = self.settings.onnx_num_threads
+        # Decoding is sequential; parallelism comes from intra-op threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        return options
+    
+    @staticmethod
+    def _has_cpu_flag(flag: str) -> bool:
+        """Check /proc/cpuinfo for a CPU feature flag."""
+        try:
+            with open("/proc/cpuinfo") as f:
+                return any(flag in line.split() for line in f if line.startswith("flags"))
+        except OSError:
+            return False
+    
+    def _register_forward_counters(self) -> None:
+        """Count forward passes of the ONNX session per generating thread."""
+        forward = self.model.forward
+        
+        def counted(*args, **kwargs):
+            self._forward_counts.target = getattr(self._forward_counts, "target", 0) + 1
+            return forward(*args, **kwargs)
+        
+        self.model.forward = counted
+    
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Size of the ONNX model file and its external weight data.
+        
+        The weights live in the ONNX Runtime session rather than in torch
+        parameters, and the session loads them in full, so the file sizes
+        approximate the memory they take.
+        """
+        if self.model is None or self._model_path is None:
+            return {}
+        files = [self._model_path] + [
+            path for path in (f"{self._model_path}_data", f"{self._model_path}.data")
+            if os.path.exists(path)
+        ]
+        return {
+            "model": {
+                "device": "cpu",
+                "onnx_file": self._model_path,
+                "weight_bytes": sum(os.path.getsize(path) for path in files),
+            },
+        }
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get information about the loaded model."""
+        info = super().get_model_info()
+        if self.is_loaded():
+            info.update({
+                "backend": "onnx",
+                "model_path": self._model_path,
+                "quantization": {"int8": self.settings.onnx_quantize},
+                "num_threads": self.settings.onnx_num_threads or "auto",
+                "execution_provider": "CPUExecutionProvider",
+            })
+        return info
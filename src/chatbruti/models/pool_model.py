@@ -0,0 +1,529 @@
+"""Pool of model replicas in worker processes, each pinned to a core set."""
+
+import glob
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from ..config import get_settings
+from ..utils.metrics import metrics
+from .base import BaseModelInterface, GenerationCancelled
+
+logger = logging.getLogger(__name__)
+
+# How often waiting callers check their cancel event, and the pool its replicas
+POLL_SECONDS = 0.1
+HEALTH_CHECK_SECONDS = 1.0
+
+
+def parse_cpulist(text: str) -> List[int]:
+    """Parse a Linux cpulist such as '0-15,32-47' into core ids."""
+    cores: List[int] = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cores.extend(range(int(start), int(end) + 1))
+        else:
+            cores.append(int(part))
+    return cores
+
+
+def plan_core_sets(replicas: int = 0, core_sets: Optional[str] = None) -> List[List[int]]:
+    """
+    Decide which cores each replica is pinned to.
+    
+    Args:
+        replicas: Number of replicas (0 for one per NUMA node)
+        core_sets: Explicit cpulists separated by ';' (overrides ``replicas``)
+    
+    Returns:
+        One list of core ids per replica
+    """
+    if core_sets:
+        return [parse_cpulist(cores) for cores in core_sets.split(";") if cores.strip()]
+    
+    if hasattr(os, "sched_getaffinity"):
+        available = set(os.sched_getaffinity(0))
+    else:
+        available = set(range(os.cpu_count() or 1))
+    nodes = []
+    for path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*/cpulist")):
+        with open(path) as f:
+            cores = [core for core in parse_cpulist(f.read()) if core in available]
+        if cores:
+            nodes.append(cores)
+    if not nodes:
+        nodes = [sorted(available)]
+    
+    replicas = replicas or len(nodes)
+    if replicas == len(nodes):
+        return nodes
+    
+    # Contiguous slices keep each replica on as few nodes as possible
+    ordered = [core for cores in nodes for core in cores]
+    size = max(len(ordered) // replicas, 1)
+    return [ordered[i * size:(i + 1) * size] or ordered for i in range(replicas)]
+
+
+def _replica_main(index, backend, settings, cores, requests, controls, responses) -> None:
+    """Worker process: pin to ``cores``, load the model and serve requests in order."""
+    from .factory import ModelFactory
+    
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    try:
+        import torch
+        torch.set_num_threads(max(len(cores), 1))
+    except ImportError:
+        pass
+    
+    try:
+        model = ModelFactory.create(backend, settings)
+        model.load()
+    except Exception as e:
+        responses.put((index, None, "failed", str(e)))
+        return
+    responses.put((index, None, "ready", os.getpid()))
+    
+    events: Dict[int, threading.Event] = {}
+    cancelled = set()
+    lock = threading.Lock()
+    
+    def listen() -> None:
+        while True:
+            request_id = controls.get()
+            if request_id is None:
+                return
+            with lock:
+                if request_id in events:
+                    events[request_id].set()
+                else:
+                    cancelled.add(request_id)
+    
+    threading.Thread(target=listen, daemon=True).start()
+    
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        request_id, method, args, kwargs = message
+        event = threading.Event()
+        with lock:
+            events[request_id] = event
+            if request_id in cancelled:
+                cancelled.discard(request_id)
+                event.set()
+        try:
+            result = None
+            if method == "generate_stream":
+                for delta in model.generate_stream(*args, cancel_event=event, **kwargs):
+                    responses.put((index, request_id, "delta", delta))
+            elif method == "generate":
+                result = model.generate(*args, cancel_event=event, **kwargs)
+            else:
+                result = (
+                    model.generate_batch(*args, cancel_event=event, **kwargs),
+                    model.get_last_batch_usage(),
+                )
+            usage = model.get_last_usage()
+            responses.put((index, request_id, "done", (result, usage, event.is_set())))
+        except GenerationCancelled as e:
+            responses.put((index, request_id, "cancelled", (e.partial_text, e.reason)))
+        except Exception as e:
+            responses.put((index, request_id, "error", f"{type(e).__name__}: {e}"))
+        finally:
+            with lock:
+                events.pop(request_id, None)
+
+
+class _Replica:
+    """Parent-side state of one worker process."""
+    
+    def __init__(self, index: int, cores: List[int]):
+        self.index = index
+        self.cores = cores
+        self.state = "stopped"
+        self.process = None
+        self.requests = None
+        self.controls = None
+        self.pid: Optional[int] = None
+        self.in_flight = 0
+        self.served = 0
+        self.errors = 0
+        self.restarts = 0
+    
+    def info(self) -> Dict[str, Any]:
+        """Get the replica's state for model info."""
+        return {
+            "index": self.index,
+            "state": self.state,
+            "pid": self.pid,
+            "cores": self.cores,
+            "in_flight": self.in_flight,
+            "served": self.served,
+            "errors": self.errors,
+            "restarts": self.restarts,
+        }
+
+
+class PoolModel(BaseModelInterface):
+    """
+    Serve requests from K replicas of a local model, one per core set.
+    
+    Each replica runs in its own process, pinned (with ``sched_setaffinity``
+    and ``torch.set_num_threads``) to one NUMA node by default, so its
+    weights live in node-local memory. Requests go to the healthy replica
+    with the fewest requests in flight; batches are split across replicas.
+    Replicas that exit are restarted and their in-flight requests fail.
+    
+    Conversation token caches stay in the server process and are not used
+    by replicas.
+    """
+    
+    supports_batching = True
+    tunable_parameters = ("max_new_tokens",)
+    
+    def __init__(self, settings=None):
+        """Initialize the pool (replicas start in load())."""
+        self.settings = settings or get_settings()
+        self.replica_backend = self.settings.pool_backend
+        self._replicas = [
+            _Replica(index, cores)
+            for index, cores in enumerate(
+                plan_core_sets(self.settings.pool_replicas, self.settings.pool_core_sets)
+            )
+        ]
+        self._context = multiprocessing.get_context("spawn")
+        self._responses = None
+        self._pending: Dict[int, queue.Queue] = {}
+        self._assigned: Dict[int, _Replica] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._state_changed = threading.Condition(self._lock)
+        self._dispatcher: Optional[threading.Thread] = None
+        self._closed = False
+    
+    @property
+    def max_concurrency(self) -> int:
+        """One generation per replica."""
+        return len(self._replicas)
+    
+    def load(self) -> None:
+        """Start the replicas and wait until each is ready or has failed."""
+        if self.is_loaded():
+            logger.info("Replica pool already running")
+            return
+        
+        self._responses = self._context.Queue()
+        for replica in self._replicas:
+            self._start(replica)
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_loop, name="pool-dispatcher", daemon=True
+        )
+        self._dispatcher.start()
+        
+        with self._state_changed:
+            self._state_changed.wait_for(
+                lambda: all(replica.state != "starting" for replica in self._replicas)
+            )
+            ready = sum(1 for replica in self._replicas if replica.state == "ready")
+        if not ready:
+            self.close()
+            raise RuntimeError("No replica of the pool could load the model")
+        logger.info("Replica pool ready: %s/%s replicas", ready, len(self._replicas))
+    
+    def close(self) -> None:
+        """Stop all replicas."""
+        self._closed = True
+        for replica in self._replicas:
+            if replica.process is not None and replica.process.is_alive():
+                replica.requests.put(None)
+                replica.controls.put(None)
+                replica.process.join(timeout=5)
+                if replica.process.is_alive():
+                    replica.process.terminate()
+            replica.state = "stopped"
+    
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+        cancel_event: Optional[threading.Event] = None,
+        **kwargs
+    ) -> str:
+        """Generate a response on the least-loaded replica."""
+        kwargs.pop("token_cache", None)
+        kwargs.pop("stream", None)
+        self._set_last_usage(None)
+        request_id, replica = self._submit(
+            "generate", (prompt, system_prompt, conversation_history), kwargs
+        )
+        for kind, payload in self._collect(request_id, replica, cancel_event):
+            if kind == "done":
+                return payload
+        raise RuntimeError("Replica returned no result")
+    
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+        cancel_event: Optional[threading.Event] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """Stream a response from the least-loaded replica."""
+        kwargs.pop("token_cache", None)
+        kwargs.pop("stream", None)
+        self._set_last_usage(None)
+        request_id, replica = self._submit(
+            "generate_stream", (prompt, system_prompt, conversation_history), kwargs
+        )
+        for kind, payload in self._collect(request_id, replica, cancel_event):
+            if kind == "delta":
+                yield payload
+    
+    def generate_batch(
+        self,
+        prompts: List[str],
+        system_prompt: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        cancel_event: Optional[threading.Event] = None,
+        **kwargs
+    ) -> List[str]:
+        """Split a batch across the healthy replicas and run the parts in parallel."""
+        self._set_last_batch_usage(None)
+        if not prompts:
+            return []
+        healthy = max(sum(1 for replica in self._replicas if replica.state == "ready"), 1)
+        size = math.ceil(len(prompts) / healthy)
+        kwargs.update(
+            system_prompt=system_prompt, max_new_tokens=max_new_tokens, temperature=temperature
+        )
+        
+        submitted: List[Tuple[int, _Replica]] = []
+        collected = 0
+        try:
+            for start in range(0, len(prompts), size):
+                submitted.append(
+                    self._submit("generate_batch", (prompts[start:start + size],), dict(kwargs))
+                )
+            responses: List[str] = []
+            usages: List[Optional[Dict[str, int]]] = []
+            for request_id, replica in submitted:
+                collected += 1
+                for kind, payload in self._collect(request_id, replica, cancel_event):
+                    if kind == "done":
+                        part, part_usage = payload
+                        responses.extend(part)
+                        usages.extend(part_usage or [None] * len(part))
+            self._set_last_batch_usage(usages)
+            return responses
+        finally:
+            # After a failed part, cancel the parts not collected yet
+            for request_id, replica in submitted[collected:]:
+                self._release(request_id, replica, "cancelled", cancel=True)
+    
+    def is_loaded(self) -> bool:
+        """Check if at least one replica is ready."""
+        return any(replica.state == "ready" for replica in self._replicas)
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get information about the pool and its replicas."""
+        return {
+            "status": "loaded" if self.is_loaded() else "not_loaded",
+            "backend": "pool",
+            "replica_backend": self.replica_backend,
+            "model_name": self.settings.model_name,
+            "replicas": [replica.info() for replica in self._replicas],
+        }
+    
+    def _start(self, replica: _Replica) -> None:
+        """Spawn the worker process of a replica."""
+        replica.requests = self._context.Queue()
+        replica.controls = self._context.Queue()
+        replica.process = self._context.Process(
+            target=_replica_main,
+            args=(
+                replica.index, self.replica_backend, self.settings, replica.cores,
+                replica.requests, replica.controls, self._responses,
+            ),
+            name=f"pool-replica-{replica.index}",
+            daemon=True,
+        )
+        replica.state = "starting"
+        replica.process.start()
+        logger.info("Starting replica %s on cores %s", replica.index, replica.cores)
+    
+    def _submit(self, method: str, args: Tuple, kwargs: Dict[str, Any]) -> Tuple[int, _Replica]:
+        """Send a request to the least-loaded healthy replica."""
+        with self._lock:
+            candidates = [replica for replica in self._replicas if replica.state == "ready"]
+            if not candidates:
+                raise RuntimeError("No healthy replica available")
+            replica = min(candidates, key=lambda candidate: candidate.in_flight)
+            replica.in_flight += 1
+            request_id = next(self._ids)
+            self._pending[request_id] = queue.Queue()
+            self._assigned[request_id] = replica
+        metrics.set_gauge("pool_in_flight", replica.in_flight, replica=replica.index)
+        replica.requests.put((request_id, method, args, kwargs))
+        return request_id, replica
+    
+    def _collect(
+        self,
+        request_id: int,
+        replica: _Replica,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield ('delta', text) messages of a request, then ('done', result).
+        
+        Raises:
+            GenerationCancelled: If the replica stopped the generation early
+            RuntimeError: If the replica failed or exited
+        """
+        started = time.perf_counter()
+        pending = self._pending[request_id]
+        outcome = "error"
+        cancel_sent = False
+        finished = False
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set() and not cancel_sent:
+                    replica.controls.put(request_id)
+                    cancel_sent = True
+                try:
+                    kind, payload = pending.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                
+                if kind == "delta":
+                    yield kind, payload
+                    continue
+                finished = True
+                if kind == "done":
+                    result, usage, stopped = payload
+                    self._set_last_usage(usage)
+                    if stopped and cancel_event is not None:
+                        # Deadline hit inside the replica: report it like local backends do
+                        cancel_event.set()
+                    outcome = "ok"
+                    yield kind, result
+                    return
+                elif kind == "cancelled":
+                    outcome = "cancelled"
+                    raise GenerationCancelled(*payload)
+                else:
+                    raise RuntimeError(f"Replica {replica.index}: {payload}")
+        finally:
+            # If the caller went away (e.g. a closed stream), stop the replica's work too
+            self._release(
+                request_id, replica, outcome, started, cancel=not finished and not cancel_sent
+            )
+    
+    def _release(
+        self,
+        request_id: int,
+        replica: _Replica,
+        outcome: str,
+        started: Optional[float] = None,
+        cancel: bool = False,
+    ) -> None:
+        """Drop the bookkeeping of a request, optionally cancelling it on the replica."""
+        if cancel:
+            try:
+                replica.controls.put(request_id)
+            except (OSError, ValueError):
+                pass
+        with self._lock:
+            if self._pending.pop(request_id, None) is None:
+                return
+            self._assigned.pop(request_id, None)
+            replica.in_flight -= 1
+            replica.served += 1
+            if outcome == "error":
+                replica.errors += 1
+        metrics.set_gauge("pool_in_flight", replica.in_flight, replica=replica.index)
+        metrics.inc("pool_requests", replica=replica.index, outcome=outcome)
+        if started is not None:
+            metrics.observe(
+                "pool_latency_seconds", time.perf_counter() - started, replica=replica.index
+            )
+    
+    def _dispatch_loop(self) -> None:
+        """Route replica messages to waiting callers and watch replica health."""
+        last_check = time.monotonic()
+        while not self._closed:
+            try:
+                index, request_id, kind, payload = self._responses.get(timeout=HEALTH_CHECK_SECONDS)
+            except queue.Empty:
+                index = None
+            except (EOFError, OSError):
+                break
+            
+            if index is not None and request_id is None:
+                self._replica_started(self._replicas[index], kind, payload)
+            elif index is not None:
+                with self._lock:
+                    pending = self._pending.get(request_id)
+                if pending is not None:
+                    pending.put((kind, payload))
+            
+            if time.monotonic() - last_check >= HEALTH_CHECK_SECONDS:
+                self._check_health()
+                last_check = time.monotonic()
+    
+    def _replica_started(self, replica: _Replica, kind: str, payload: Any) -> None:
+        """Record the outcome of a replica's model load."""
+        with self._state_changed:
+            if kind == "ready":
+                replica.state = "ready"
+                replica.pid = payload
+                logger.info("Replica %s ready (pid %s)", replica.index, payload)
+            else:
+                replica.state = "failed"
+                logger.error("Replica %s failed to load: %s", replica.index, payload)
+            self._state_changed.notify_all()
+        self._update_health_gauge()
+    
+    def _check_health(self) -> None:
+        """Fail the requests of replicas that exited and restart them."""
+        for replica in self._replicas:
+            if replica.state not in ("starting", "ready") or replica.process.is_alive():
+                continue
+            
+            logger.error("Replica %s exited with code %s", replica.index, replica.process.exitcode)
+            metrics.inc("pool_replica_exits", replica=replica.index)
+            with self._state_changed:
+                was_ready = replica.state == "ready"
+                replica.state = "failed"
+                lost = [
+                    self._pending[request_id]
+                    for request_id, assigned in self._assigned.items()
+                    if assigned is replica and request_id in self._pending
+                ]
+                self._state_changed.notify_all()
+            for pending in lost:
+                pending.put(("error", "replica exited"))
+            
+            # Only restart replicas that loaded once, so a broken model does not loop
+            if was_ready and not self._closed:
+                replica.restarts += 1
+                self._start(replica)
+        self._update_health_gauge()
+    
+    def _update_health_gauge(self) -> None:
+        metrics.set_gauge(
+            "pool_healthy_replicas",
+            sum(1 for replica in self._replicas if replica.state == "ready"),
+        )
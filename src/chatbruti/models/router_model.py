@@ -0,0 +1,317 @@
+"""Complexity-based routing between a small and a large model."""
+
+import difflib
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from ..config import get_settings
+from ..utils.metrics import metrics
+from .base import BaseModelInterface
+
+logger = logging.getLogger(__name__)
+
+# Turns that never need the large model
+EASY_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|yo|thanks|thank you|thx|ok|okay|cool|nice|great|bye|goodbye|yes|no|"
+    r"salut|bonjour|bonsoir|coucou|merci|oui|non|d'accord|au revoir)\b[\s!.?]*$",
+    re.IGNORECASE,
+)
+
+# Words suggesting reasoning, code or long-form output
+HARD_KEYWORDS = (
+    "explain", "why", "how does", "how do", "compare", "analy", "debug", "code",
+    "implement", "prove", "step by step", "algorithm", "function", "calculate",
+    "optimi", "summari", "translate", "write a", "essay",
+    "pourquoi", "explique", "comment", "compar", "résume", "traduis", "écris",
+)
+
+# Maximum number of shadow evaluations running at once
+SHADOW_WORKERS = 2
+
+
+def score_complexity(prompt: str, conversation_history: Optional[list] = None) -> float:
+    """
+    Estimate how hard a turn is, from 0 (trivial) to 1 (hard).
+    
+    Combines prompt length, conversation depth, keywords and code blocks.
+    """
+    history = conversation_history or []
+    if EASY_PATTERN.match(prompt):
+        return 0.0
+    
+    text = prompt.lower()
+    score = 0.4 * min(len(prompt) / 800, 1.0)
+    score += 0.2 * min(len(history) / 20, 1.0)
+    if "```" in prompt or any(keyword in text for keyword in HARD_KEYWORDS):
+        score += 0.5
+    if prompt.count("?") > 1:
+        score += 0.1
+    return min(score, 1.0)
+
+
+class RouterModel(BaseModelInterface):
+    """
+    Route each request to a small, fast model or the large model.
+    
+    Requests scoring below ``router_threshold`` (see score_complexity) go to
+    ``router_small_model``; the rest go to ``model_name``. With
+    ``router_shadow_rate`` set, a sample of requests is also run on the other
+    route in the background and the answers are compared, to evaluate the
+    routing decisions without affecting responses.
+    """
+    
+    def __init__(self, settings=None):
+        """Initialize the router and its two sub-models."""
+        # Imported here: the factory module imports this one lazily
+        from .factory import ModelFactory
+        
+        self.settings = settings or get_settings()
+        self.threshold = self.settings.router_threshold
+        self.shadow_rate = self.settings.router_shadow_rate
+        
+        small_settings = self._copy_settings(model_name=self.settings.router_small_model)
+        self.small = ModelFactory.create(self.settings.router_small_backend, small_settings)
+        self.large = ModelFactory.create(self.settings.router_large_backend, self.settings)
+        
+        self._shadow_pool: Optional[ThreadPoolExecutor] = None
+        self._shadow_slots = threading.BoundedSemaphore(SHADOW_WORKERS)
+    
+    def load(self) -> None:
+        """Load both sub-models."""
+        self.small.load()
+        self.large.load()
+        if self.shadow_rate > 0 and self._shadow_pool is None:
+            self._shadow_pool = ThreadPoolExecutor(
+                max_workers=SHADOW_WORKERS, thread_name_prefix="router-shadow"
+            )
+        logger.info(
+            "Router ready: small=%s, large=%s, threshold=%s",
+            self.settings.router_small_model, self.settings.model_name, self.threshold,
+        )
+    
+    @property
+    def supports_batching(self) -> bool:
+        """Batch natively only if both routes do."""
+        return self.small.supports_batching and self.large.supports_batching
+    
+    @property
+    def max_concurrency(self) -> int:
+        """Concurrency limit of the more constrained route."""
+        return min(self.small.max_concurrency, self.large.max_concurrency)
+    
+    @property
+    def tunable_parameters(self) -> Tuple[str, ...]:
+        """Parameters both routes accept; the route itself already picks the model."""
+        return tuple(
+            name for name in self.large.tunable_parameters
+            if name in self.small.tunable_parameters and name != "model"
+        )
+    
+    def route(self, prompt: str, conversation_history: Optional[list] = None) -> Tuple[str, float]:
+        """
+        Choose a route for a request.
+        
+        Returns:
+            Tuple of route name ('small' or 'large') and complexity score
+        """
+        score = score_complexity(prompt, conversation_history)
+        return ("large" if score >= self.threshold else "small"), score
+    
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+        **kwargs
+    ) -> str:
+        """Generate a response with the model chosen for this request."""
+        name, model = self._choose(prompt, conversation_history, kwargs)
+        started = time.perf_counter()
+        response = model.generate(prompt, system_prompt, conversation_history, **kwargs)
+        latency = time.perf_counter() - started
+        metrics.observe("router_latency_seconds", latency, route=name)
+        self._maybe_shadow(
+            name, prompt, system_prompt, conversation_history, kwargs, response, latency
+        )
+        return response
+    
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """Stream a response from the model chosen for this request."""
+        name, model = self._choose(prompt, conversation_history, kwargs)
+        started = time.perf_counter()
+        parts = []
+        for delta in model.generate_stream(prompt, system_prompt, conversation_history, **kwargs):
+            parts.append(delta)
+            yield delta
+        latency = time.perf_counter() - started
+        metrics.observe("router_latency_seconds", latency, route=name)
+        self._maybe_shadow(
+            name,
+            prompt,
+            system_prompt,
+            conversation_history,
+            kwargs,
+            "".join(parts).strip(),
+            latency,
+        )
+    
+    def generate_batch(
+        self,
+        prompts: List[str],
+        system_prompt: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        **kwargs
+    ) -> List[str]:
+        """Split a batch by route and run each part on its model."""
+        self._set_last_batch_usage(None)
+        routes: Dict[str, List[int]] = {"small": [], "large": []}
+        for index, prompt in enumerate(prompts):
+            name, _ = self.route(prompt)
+            routes[name].append(index)
+            metrics.inc("router_routes", route=name)
+        
+        responses: List[str] = [""] * len(prompts)
+        usages: List[Optional[Dict[str, int]]] = [None] * len(prompts)
+        for name, indices in routes.items():
+            if not indices:
+                continue
+            model = self.small if name == "small" else self.large
+            started = time.perf_counter()
+            outputs = model.generate_batch(
+                [prompts[index] for index in indices],
+                system_prompt=system_prompt,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                **kwargs
+            )
+            metrics.observe("router_latency_seconds", time.perf_counter() - started, route=name)
+            part_usage = model.get_last_batch_usage() or [None] * len(indices)
+            for index, output, usage in zip(indices, outputs, part_usage):
+                responses[index] = output
+                usages[index] = usage
+        self._set_last_batch_usage(usages)
+        return responses
+    
+    def get_last_usage(self) -> Optional[Dict[str, int]]:
+        """Get token usage of the last generation on the calling thread, from its route."""
+        model = getattr(self._usage_state(), "model", None)
+        return model.get_last_usage() if model is not None else None
+    
+    def get_rate_limit(self) -> Optional[Dict[str, float]]:
+        """Get the tighter of the two routes' rate-limit budgets."""
+        budgets = [
+            budget for budget in (self.small.get_rate_limit(), self.large.get_rate_limit())
+            if budget
+        ]
+        return min(budgets, key=lambda budget: budget["remaining_fraction"]) if budgets else None
+    
+    def close(self) -> None:
+        """Close both sub-models and stop shadow evaluation."""
+        if self._shadow_pool is not None:
+            self._shadow_pool.shutdown(wait=False, cancel_futures=True)
+            self._shadow_pool = None
+        self.small.close()
+        self.large.close()
+    
+    def memory_usage(self) -> Dict[str, Any]:
+        """Memory held by each sub-model."""
+        return {"small": self.small.memory_usage(), "large": self.large.memory_usage()}
+    
+    def is_loaded(self) -> bool:
+        """Check if both sub-models are loaded."""
+        return self.small.is_loaded() and self.large.is_loaded()
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get information about the router and its routes."""
+        return {
+            "status": "loaded" if self.is_loaded() else "not_loaded",
+            "backend": "router",
+            "model_name": self.settings.model_name,
+            "threshold": self.threshold,
+            "shadow_rate": self.shadow_rate,
+            "routes": {
+                "small": self.small.get_model_info(),
+                "large": self.large.get_model_info(),
+            },
+        }
+    
+    def _choose(
+        self,
+        prompt: str,
+        conversation_history: Optional[list],
+        kwargs: Dict[str, Any],
+    ) -> Tuple[str, BaseModelInterface]:
+        """Pick the route for a request and prepare its per-route state."""
+        name, score = self.route(prompt, conversation_history)
+        model = self.small if name == "small" else self.large
+        metrics.inc("router_routes", route=name)
+        metrics.observe("router_score", score)
+        logger.debug("Routed to %s (score %.2f)", name, score)
+        
+        # Token caches are tokenizer-specific; keep one per route
+        if kwargs.get("token_cache") is not None:
+            kwargs["token_cache"] = kwargs["token_cache"].setdefault(f"router_{name}", {})
+        self._usage_state().model = model
+        return name, model
+    
+    def _maybe_shadow(
+        self,
+        name: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[list],
+        kwargs: Dict[str, Any],
+        response: str,
+        latency: float,
+    ) -> None:
+        """Run a sampled request on the other route in the background and compare."""
+        if self._shadow_pool is None or random.random() >= self.shadow_rate:
+            return
+        if not self._shadow_slots.acquire(blocking=False):
+            metrics.inc("router_shadow_skipped")
+            return
+        
+        other = "large" if name == "small" else "small"
+        model = self.large if other == "large" else self.small
+        shadow_kwargs = {
+            key: value for key, value in kwargs.items()
+            if key not in ("token_cache", "cancel_event", "deadline", "stream")
+        }
+        history = list(conversation_history or [])
+        
+        def evaluate() -> None:
+            try:
+                started = time.perf_counter()
+                shadow = model.generate(prompt, system_prompt, history, **shadow_kwargs)
+                shadow_latency = time.perf_counter() - started
+                similarity = difflib.SequenceMatcher(None, response, shadow).quick_ratio()
+                metrics.observe("router_shadow_similarity", similarity, route=name)
+                metrics.observe(
+                    "router_shadow_latency_delta_seconds", shadow_latency - latency, route=name
+                )
+                metrics.inc("router_shadow_evaluations", route=name)
+            except Exception as e:
+                logger.warning("Shadow evaluation on %s route failed: %s", other, e)
+                metrics.inc("router_shadow_errors", route=other)
+            finally:
+                self._shadow_slots.release()
+        
+        self._shadow_pool.submit(evaluate)
+    
+    def _copy_settings(self, **update):
+        """Copy the settings with some fields replaced."""
+        if hasattr(self.settings, "model_copy"):
+            return self.settings.model_copy(update=update)
+        return self.settings.copy(update=update)
@@ -0,0 +1,174 @@
+"""Zero-downtime replacement of the serving model."""
+
+import gc
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from ..utils.metrics import metrics
+from .base import BaseModelInterface
+
+logger = logging.getLogger(__name__)
+
+
+class ModelSwapper:
+    """
+    Hold the serving model and replace it while traffic keeps flowing.
+    
+    Requests take a lease on the current model for the duration of a
+    generation. A swap builds, loads and warms the new model on a background
+    thread while the old one keeps serving, then replaces it in one step:
+    new leases go to the new model, and the old one is closed once its
+    leases are released (or ``drain_timeout`` passes). If loading or warm-up
+    fails, the new model is discarded and the old one stays in place.
+    """
+    
+    def __init__(self, drain_timeout: float = 300.0):
+        """
+        Initialize the swapper.
+        
+        Args:
+            drain_timeout: Maximum time to wait for in-flight requests on a
+                replaced model before closing it
+        """
+        self.drain_timeout = drain_timeout
+        self.current: Optional[BaseModelInterface] = None
+        self.state = "idle"
+        self.error: Optional[str] = None
+        self.swaps = 0
+        self.target: Optional[Dict[str, Any]] = None
+        self._leases: Dict[int, int] = {}
+        self._retiring: Optional[BaseModelInterface] = None
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+    
+    @contextmanager
+    def lease(self) -> Iterator[BaseModelInterface]:
+        """Use the current model; a swap does not close it until the block exits."""
+        with self._cond:
+            model = self.current
+            if model is None:
+                raise RuntimeError("No model loaded")
+            self._leases[id(model)] = self._leases.get(id(model), 0) + 1
+        try:
+            yield model
+        finally:
+            with self._cond:
+                self._leases[id(model)] -= 1
+                if not self._leases[id(model)]:
+                    del self._leases[id(model)]
+                    self._cond.notify_all()
+    
+    def in_flight(self, model: BaseModelInterface) -> int:
+        """Number of leases held on a model."""
+        with self._cond:
+            return self._leases.get(id(model), 0)
+    
+    @property
+    def swapping(self) -> bool:
+        """Whether a swap is in progress."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start_swap(
+        self,
+        build: Callable[[], BaseModelInterface],
+        warm_up: Callable[[BaseModelInterface], None],
+        on_swap: Optional[Callable[[BaseModelInterface], None]] = None,
+        target: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Start replacing the model on a background thread.
+        
+        Args:
+            build: Creates the new (unloaded) model
+            warm_up: Exercises the loaded model; raising aborts the swap
+            on_swap: Called with the new model right after it starts serving
+            target: Description of the new model, reported by ``status()``
+        
+        Raises:
+            RuntimeError: If a swap is already in progress
+        """
+        with self._cond:
+            if self.swapping:
+                raise RuntimeError("A model swap is already in progress")
+            self.state = "loading"
+            self.error = None
+            self.target = target
+            self._thread = threading.Thread(
+                target=self._swap, args=(build, warm_up, on_swap), name="model-swap", daemon=True
+            )
+            self._thread.start()
+    
+    def _swap(
+        self,
+        build: Callable[[], BaseModelInterface],
+        warm_up: Callable[[BaseModelInterface], None],
+        on_swap: Optional[Callable[[BaseModelInterface], None]],
+    ) -> None:
+        started = time.perf_counter()
+        model = None
+        try:
+            model = build()
+            model.load()
+            self.state = "warming"
+            warm_up(model)
+        except Exception as e:
+            logger.error("Model swap failed, keeping the current model: %s", e)
+            self.state = "failed"
+            self.error = str(e)
+            metrics.inc("model_swaps", result="failed")
+            if model is not None:
+                self._close(model)
+            return
+        
+        with self._cond:
+            old, self.current = self.current, model
+            self.swaps += 1
+        if on_swap is not None:
+            try:
+                on_swap(model)
+            except Exception as e:
+                logger.error("Error in model swap callback: %s", e)
+        metrics.inc("model_swaps", result="succeeded")
+        metrics.observe("model_swap_seconds", time.perf_counter() - started)
+        logger.info("Swapped in new model after %.1fs", time.perf_counter() - started)
+        if old is None:
+            self.state = "idle"
+            return
+        
+        # Let requests already running on the old model finish
+        self.state = "draining"
+        with self._cond:
+            self._retiring = old
+            drained = self._cond.wait_for(
+                lambda: not self._leases.get(id(old)), timeout=self.drain_timeout
+            )
+            remaining = self._leases.get(id(old), 0)
+            self._retiring = None
+        if not drained:
+            logger.warning("Closing the replaced model with %s requests still running", remaining)
+        self._close(old)
+        self.state = "idle"
+    
+    @staticmethod
+    def _close(model: BaseModelInterface) -> None:
+        """Close a model and collect its memory."""
+        try:
+            model.close()
+        except Exception as e:
+            logger.error("Error closing model: %s", e)
+        gc.collect()
+    
+    def status(self) -> Dict[str, Any]:
+        """State of the swapper and the current model's in-flight requests."""
+        with self._cond:
+            return {
+                "state": self.state,
+                "error": self.error,
+                "target": self.target,
+                "swaps": self.swaps,
+                "in_flight": self._leases.get(id(self.current), 0) if self.current else 0,
+                "draining": self._leases.get(id(self._retiring), 0) if self._retiring else 0,
+            }
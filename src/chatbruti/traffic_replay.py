@@ -0,0 +1,236 @@
+"""Replay a captured /chat traffic file against a running API server."""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+FILLER = "lorem ipsum dolor sit amet "
+# Turns starting later than this after their captured time count as late
+LATE_SECONDS = 0.01
+
+
+def load_capture(path: str, limit: Optional[int] = None, run: int = -1) -> List[Dict[str, Any]]:
+    """
+    Read the request records of one capture run, in arrival order.
+    
+    Each run starts with a header line, and arrival times and session hashes
+    restart with it, so runs appended to one file are never mixed.
+    
+    Args:
+        path: Capture file written by TrafficRecorder
+        limit: Maximum number of records to read
+        run: Index of the run to read (negative counts from the last)
+    
+    Returns:
+        Request records of the run (header lines are skipped)
+    
+    Raises:
+        ValueError: If the file has no such run
+    """
+    runs: List[List[Dict[str, Any]]] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "capture" in record or not runs:
+                runs.append([])
+            if "capture" not in record:
+                runs[-1].append(record)
+    if not -len(runs) <= run < len(runs):
+        raise ValueError(f"{path} holds {len(runs)} capture run(s), not run {run}")
+    if len(runs) > 1:
+        logger.info("%s holds %d capture runs, replaying run %d", path, len(runs), run % len(runs))
+    records = sorted(runs[run], key=lambda record: record["t"])
+    return records[:limit] if limit is not None else records
+
+
+def _message(record: Dict[str, Any]) -> str:
+    """The captured message, or filler text of the captured length."""
+    if record.get("m") is not None:
+        return record["m"]
+    length = max(record.get("mc", 1), 1)
+    return (FILLER * (length // len(FILLER) + 1))[:length]
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(max(math.ceil(q / 100 * len(ordered)) - 1, 0), len(ordered) - 1)]
+
+
+class Replayer:
+    """
+    Re-drive captured traffic with its original timing and session structure.
+    
+    Each captured session runs as its own sequence of turns: a turn is sent
+    at its captured arrival time (divided by ``speed``) but never before the
+    previous turn of its session was answered, and continues the session
+    created by the session's first turn. Turns that cannot start on time
+    because the server is slower than in the capture are counted as late.
+    """
+    
+    def __init__(
+        self, url: str, speed: float = 1.0, api_key: Optional[str] = None, timeout: float = 300.0
+    ):
+        """
+        Initialize the replayer.
+        
+        Args:
+            url: Base URL of the API server
+            speed: Replay speed multiplier (2 replays twice as fast)
+            api_key: API key sent as X-API-Key
+            timeout: Request timeout in seconds
+        """
+        self.url = url.rstrip("/")
+        self.speed = speed
+        self.headers = {"X-API-Key": api_key} if api_key else {}
+        self.timeout = timeout
+        self.latencies: List[float] = []
+        self.lateness: List[float] = []
+        self.statuses: Counter = Counter()
+    
+    async def run(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Replay records and summarize the results.
+        
+        Args:
+            records: Request records in arrival order
+        
+        Returns:
+            Request counts by status, throughput, latency and lateness
+        """
+        sessions: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            sessions.setdefault(record["s"], []).append(record)
+        
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(
+            base_url=self.url, headers=self.headers, timeout=self.timeout, limits=limits
+        ) as client:
+            started = time.monotonic()
+            await asyncio.gather(*(
+                self._session(client, turns, started) for turns in sessions.values()
+            ))
+            elapsed = time.monotonic() - started
+        return self.report(len(sessions), elapsed)
+    
+    async def _session(
+        self, client: "httpx.AsyncClient", turns: List[Dict[str, Any]], started: float
+    ) -> None:
+        session_id = None
+        for record in turns:
+            delay = started + record["t"] / self.speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay > LATE_SECONDS:
+                self.lateness.append(-delay)
+            
+            body: Dict[str, Any] = {"message": _message(record)}
+            if session_id is not None and not record.get("n"):
+                body["session_id"] = session_id
+            if record.get("mt") is not None:
+                body["max_tokens"] = record["mt"]
+            if record.get("tp") is not None:
+                body["temperature"] = record["tp"]
+            
+            sent = time.monotonic()
+            try:
+                response = await client.post("/chat", json=body)
+            except httpx.HTTPError as e:
+                logger.debug("Request failed: %s", e)
+                self.statuses["error"] += 1
+                continue
+            self.latencies.append(time.monotonic() - sent)
+            self.statuses[str(response.status_code)] += 1
+            if response.status_code == 200:
+                session_id = response.json().get("session_id", session_id)
+    
+    def report(self, sessions: int, elapsed: float) -> Dict[str, Any]:
+        """Summarize the replay."""
+        requests = sum(self.statuses.values())
+        succeeded = self.statuses.get("200", 0)
+        return {
+            "sessions": sessions,
+            "requests": requests,
+            "statuses": dict(self.statuses),
+            "error_rate": (requests - succeeded) / requests if requests else None,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_rps": round(requests / elapsed, 3) if elapsed else None,
+            "latency_seconds": {
+                name: round(_percentile(self.latencies, q), 4) if self.latencies else None
+                for name, q in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99), ("max", 100))
+            },
+            "late_requests": len(self.lateness),
+            "max_lateness_seconds": round(max(self.lateness), 4) if self.lateness else 0.0,
+        }
+
+
+def main():
+    """Replay a capture file."""
+    parser = argparse.ArgumentParser(
+        description="Replay captured /chat traffic against an API server"
+    )
+    parser.add_argument("capture", help="Capture file written by the recording server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the API server")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="Replay speed multiplier (e.g. 2 for 2x)"
+    )
+    parser.add_argument("--api-key", help="API key sent as X-API-Key")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--run", type=int, default=-1,
+                        help="Capture run to replay if the file holds several (default: the last)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Request timeout in seconds")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    
+    if httpx is None:
+        raise ImportError(
+            "httpx is required for traffic replay. Install it with: pip install httpx"
+        )
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    
+    try:
+        records = load_capture(args.capture, args.limit, args.run)
+    except ValueError as e:
+        parser.error(str(e))
+    logger.info("Replaying %s requests against %s at %gx", len(records), args.url, args.speed)
+    replayer = Replayer(args.url, speed=args.speed, api_key=args.api_key, timeout=args.timeout)
+    report = asyncio.run(replayer.run(records))
+    
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"Sessions:   {report['sessions']}")
+    print(f"Requests:   {report['requests']} in {report['elapsed_seconds']}s "
+          f"({report['throughput_rps']} req/s)")
+    print(f"Statuses:   {report['statuses']}")
+    print("Latency:    " + ", ".join(
+        f"{name}={value:.3f}s" if value is not None else f"{name}=n/a"
+        for name, value in report["latency_seconds"].items()
+    ))
+    print(f"Late:       {report['late_requests']} (max {report['max_lateness_seconds']:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,53 @@
 
 from .system_prompt import load_system_prompt, get_system_prompt
 from .conversation import ConversationHistory
+from .session_index import SessionIndex
+from .compaction import ConversationCompactor
+from .context import build_messages
+from .usage import QuotaExceeded, UsageTracker, tenant_from_headers
+from .metrics import Metrics, metrics
+from .admission import AdmissionController, AdmissionRejected, PRIORITIES
+from .degradation import DegradationPolicy
+from .cluster import Cluster, HashRing
+from .idempotency import IdempotencyConflict, IdempotencyStore, request_fingerprint
+from .capture import TrafficRecorder
+from .memory import AllocationTracer, deep_sizeof, process_memory, torch_memory
+from .export import EXPORT_FORMATS, iter_export, session_record, snapshot_sessions
+from .log_queue import DroppingQueueHandler, setup_queue_logging
+from .audit import AuditLog
 
-__all__ = ["load_system_prompt", "get_system_prompt", "ConversationHistory"]
+__all__ = [
+    "load_system_prompt",
+    "get_system_prompt",
+    "ConversationHistory",
+    "SessionIndex",
+    "ConversationCompactor",
+    "build_messages",
+    "QuotaExceeded",
+    "UsageTracker",
+    "tenant_from_headers",
+    "Metrics",
+    "metrics",
+    "AdmissionController",
+    "AdmissionRejected",
+    "PRIORITIES",
+    "DegradationPolicy",
+    "Cluster",
+    "HashRing",
+    "IdempotencyConflict",
+    "IdempotencyStore",
+    "request_fingerprint",
+    "TrafficRecorder",
+    "AllocationTracer",
+    "deep_sizeof",
+    "process_memory",
+    "torch_memory",
+    "EXPORT_FORMATS",
+    "iter_export",
+    "session_record",
+    "snapshot_sessions",
+    "DroppingQueueHandler",
+    "setup_queue_logging",
+    "AuditLog",
+]
 
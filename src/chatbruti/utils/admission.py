@@ -0,0 +1,195 @@
+"""Admission control and priority scheduling in front of the model."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower rank is served first
+PRIORITIES: Dict[str, int] = {"interactive": 0, "api": 1, "batch": 2}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued."""
+    
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Request rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded priority queue limiting concurrent generations.
+    
+    At most ``max_concurrency`` requests hold a slot; the rest wait in a
+    queue of at most ``max_queue`` entries, served by priority class and then
+    arrival order. A request is rejected immediately when the queue is full
+    or when its expected wait, estimated from the recent service time, exceeds
+    its maximum wait or deadline.
+    
+    Must be used from a single event loop.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        max_wait_seconds: Dict[str, float],
+        initial_service_seconds: float = 1.0,
+    ):
+        """
+        Initialize the controller.
+        
+        Args:
+            max_concurrency: Maximum number of requests holding a slot
+            max_queue: Maximum number of waiting requests
+            max_wait_seconds: Maximum queueing time per priority class
+            initial_service_seconds: Service time assumed before any request completed
+        """
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.service_seconds = initial_service_seconds
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future, str]] = []
+        self._counter = itertools.count()
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a slot."""
+        return sum(1 for _, _, future, _ in self._waiters if not future.done())
+    
+    def expected_wait(self, priority: str) -> float:
+        """Estimate the queueing time of a new request of the given priority."""
+        if self.active < self.max_concurrency and not self.queue_depth:
+            return 0.0
+        rank = PRIORITIES[priority]
+        ahead = sum(
+            1 for waiter_rank, _, future, _ in self._waiters
+            if waiter_rank <= rank and not future.done()
+        )
+        return (ahead + 1) * self.service_seconds / self.max_concurrency
+    
+    async def acquire(self, priority: str, deadline: Optional[float] = None) -> float:
+        """
+        Wait for a slot.
+        
+        Args:
+            priority: Priority class ('interactive', 'api' or 'batch')
+            deadline: Optional time.monotonic() value the request must start before
+            
+        Returns:
+            Time spent waiting, in seconds
+            
+        Raises:
+            AdmissionRejected: If the request is shed
+        """
+        started = time.monotonic()
+        max_wait = self.max_wait_seconds.get(priority, 0.0)
+        if deadline is not None:
+            max_wait = min(max_wait, max(deadline - started, 0.0))
+        
+        if self.active < self.max_concurrency and not self.queue_depth:
+            self.active += 1
+            self._observe(priority, 0.0)
+            return 0.0
+        
+        expected = self.expected_wait(priority)
+        if self.queue_depth >= self.max_queue:
+            self._reject(priority, "queue_full", expected)
+        if expected > max_wait:
+            self._reject(priority, "expected_wait", expected)
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[priority], next(self._counter), future, priority))
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=max_wait)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._update_gauges()
+                self._reject(priority, "timeout", self.expected_wait(priority))
+        except asyncio.CancelledError:
+            # Caller went away; give back a slot handed over in the meantime
+            if future.done() and not future.cancelled():
+                self.release(0.0)
+            else:
+                future.cancel()
+            self._update_gauges()
+            raise
+        
+        waited = time.monotonic() - started
+        self._observe(priority, waited)
+        return waited
+    
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        """
+        Release a slot, handing it to the highest priority waiter.
+        
+        Args:
+            service_seconds: How long the slot was held, used for wait estimates
+        """
+        if service_seconds:
+            self.service_seconds = 0.8 * self.service_seconds + 0.2 * service_seconds
+            metrics.observe("generation_seconds", service_seconds)
+        
+        while self._waiters:
+            _, _, future, _ = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+    
+    def resize(self, max_concurrency: int) -> None:
+        """Change the concurrency limit, admitting waiters if it grew (call from the event loop)."""
+        self.max_concurrency = max(max_concurrency, 1)
+        while self._waiters and self.active < self.max_concurrency:
+            _, _, future, _ = heapq.heappop(self._waiters)
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+        self._update_gauges()
+    
+    @asynccontextmanager
+    async def slot(self, priority: str, deadline: Optional[float] = None) -> AsyncIterator[float]:
+        """Hold a slot for the duration of the block; yields the time spent waiting."""
+        waited = await self.acquire(priority, deadline)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(time.monotonic() - started)
+    
+    def stats(self) -> Dict[str, float]:
+        """Get the current state of the controller."""
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "service_seconds": round(self.service_seconds, 3),
+        }
+    
+    def _reject(self, priority: str, reason: str, expected: float) -> None:
+        metrics.inc("admission_rejected", priority=priority, reason=reason)
+        logger.warning("Shedding %s request (%s, expected wait %.1fs)", priority, reason, expected)
+        raise AdmissionRejected(reason, max(expected, 1.0))
+    
+    def _observe(self, priority: str, waited: float) -> None:
+        metrics.observe("admission_wait_seconds", waited, priority=priority)
+        self._update_gauges()
+    
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("admission_active", self.active)
+        metrics.set_gauge("admission_queue_depth", self.queue_depth)
@@ -0,0 +1,182 @@
+"""Structured audit log of conversation events."""
+
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Events written per batch at most
+AUDIT_BATCH_SIZE = 256
+
+
+class AuditLog:
+    """
+    Batch conversation events to rotating gzip-compressed JSON Lines files.
+    
+    ``record()`` only enqueues the event; a background thread writes events
+    in batches (at least every ``flush_seconds`` while events trickle in),
+    so a slow disk delays the audit log rather than requests. When more than
+    ``queue_size`` events are waiting, new ones are dropped and counted.
+    
+    Each batch is appended as a complete gzip member, so files can be read
+    with any gzip reader while they are written, and a crash loses only the
+    events still queued.
+    
+    A file is closed and a new one started once it reaches
+    ``max_file_bytes`` compressed; only the newest ``max_files`` are kept.
+    """
+    
+    def __init__(
+        self,
+        directory: str,
+        max_file_bytes: int = 64 << 20,
+        max_files: int = 20,
+        queue_size: int = 10000,
+        flush_seconds: float = 1.0,
+    ):
+        """
+        Initialize the log and start its writer thread.
+        
+        Args:
+            directory: Directory of the audit files (created if missing)
+            max_file_bytes: Compressed size at which a file is rotated
+            max_files: Number of files kept (0 keeps all)
+            queue_size: Maximum number of events waiting to be written
+            flush_seconds: Longest time a queued event waits for its batch
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.dropped = 0
+        self.files = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._file: Optional[BinaryIO] = None
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+    
+    def record(self, event: str, session_id: Optional[str], **fields: Any) -> bool:
+        """
+        Queue an event (never blocks).
+        
+        Args:
+            event: Event type (e.g. 'turn', 'session_deleted')
+            session_id: Session the event belongs to
+            **fields: Event data (JSON-serializable)
+        
+        Returns:
+            Whether the event was queued (False if it was dropped)
+        """
+        entry = {
+            "ts": datetime.now().isoformat(),
+            "event": event,
+            "session_id": session_id,
+            **fields,
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("audit_events_dropped")
+            return False
+        return True
+    
+    def _run(self) -> None:
+        """Collect queued events into batches and write them."""
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+            batch: List[Dict[str, Any]] = []
+            deadline = time.monotonic() + self.flush_seconds
+            while entry is not None:
+                batch.append(entry)
+                if len(batch) >= AUDIT_BATCH_SIZE:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            if entry is None:
+                self._close_file()
+                return
+    
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """Append a batch to the current file, rotating it when full."""
+        data = gzip.compress("".join(
+            json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in batch
+        ).encode("utf-8"))
+        try:
+            if self._file is None:
+                self._open_file()
+            self._file.write(data)
+            self._file.flush()
+            if self._file.tell() >= self.max_file_bytes:
+                self._close_file()
+        except OSError as e:
+            logger.error("Error writing audit log: %s", e)
+            self.dropped += len(batch)
+            metrics.inc("audit_events_dropped", len(batch))
+            self._close_file()
+            return
+        self.written += len(batch)
+        metrics.inc("audit_events_written", len(batch))
+    
+    def _open_file(self) -> None:
+        path = self.directory / f"audit-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.jsonl.gz"
+        self._file = open(path, "ab")
+        self.files += 1
+        self._prune()
+    
+    def _close_file(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+        except OSError as e:
+            logger.error("Error closing audit log file: %s", e)
+        self._file = None
+    
+    def _prune(self) -> None:
+        """Delete the oldest files beyond ``max_files``."""
+        if not self.max_files:
+            return
+        paths = sorted(self.directory.glob("audit-*.jsonl.gz"))
+        for path in paths[:-self.max_files]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning("Could not delete old audit log %s: %s", path, e)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Events written, dropped and waiting."""
+        return {
+            "directory": str(self.directory),
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "files_opened": self.files,
+        }
+    
+    def close(self, timeout: float = 5.0) -> None:
+        """Write the remaining events and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
@@ -0,0 +1,150 @@
+"""Capture of /chat traffic shapes for replay benchmarks."""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_VERSION = 1
+
+
+class TrafficRecorder:
+    """
+    Write one compact JSON line per /chat request to a capture file.
+    
+    Each recorder writes its own file, named after ``path`` with the start
+    time and process ID added (``capture.jsonl`` becomes e.g.
+    ``capture-20250101-120000-1234.jsonl``), since arrival times and session
+    hashes are only meaningful within one run.
+    
+    Records hold the arrival time (seconds since the capture started), an
+    anonymized session ID, message and response sizes, generation parameters,
+    status, latency and token usage; message text only with
+    ``include_content``. Session IDs are hashed with a random per-capture key,
+    so they group a session's turns without revealing the real ID.
+    
+    Sampling is per session, so captured sessions keep all their turns.
+    Lines are written by a background thread; when its queue is full,
+    records are dropped rather than delaying requests.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        include_content: bool = False,
+        sample_rate: float = 1.0,
+        queue_size: int = 10000,
+    ):
+        """
+        Initialize the recorder and start its writer thread.
+        
+        Args:
+            path: Capture file name, extended with the start time and process ID
+            include_content: Whether to record message text
+            sample_rate: Fraction of sessions to capture (0 to 1)
+            queue_size: Maximum number of records waiting to be written
+        """
+        started_at = datetime.now()
+        root, ext = os.path.splitext(path)
+        self.path = f"{root}-{started_at.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}{ext}"
+        self.include_content = include_content
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._key = os.urandom(16)
+        self._started = time.monotonic()
+        self._queue: queue.Queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._queue.put({
+            "capture": CAPTURE_VERSION,
+            "started_at": started_at.isoformat(),
+            "content": include_content,
+        })
+        self._thread = threading.Thread(target=self._write, name="traffic-capture", daemon=True)
+        self._thread.start()
+    
+    def sampled(self, session_id: str) -> bool:
+        """Whether a session's turns are captured."""
+        if self.sample_rate >= 1:
+            return True
+        digest = hashlib.sha256(session_id.encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "big") / 2 ** 32 < self.sample_rate
+    
+    def record(
+        self,
+        session_id: str,
+        new_session: bool,
+        message: str,
+        arrived: float,
+        status_code: int,
+        latency: float,
+        response: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> None:
+        """
+        Queue a record of one request (never blocks).
+        
+        Args:
+            session_id: Session of the request
+            new_session: Whether the request created the session
+            message: User message
+            arrived: time.monotonic() at arrival
+            status_code: HTTP status of the response
+            latency: Seconds from arrival to response
+            response: Response text, if the request succeeded
+            usage: Token usage reported by the backend
+            max_tokens: Requested max_tokens
+            temperature: Requested temperature
+        """
+        if not self.sampled(session_id):
+            return
+        entry: Dict[str, Any] = {
+            "t": round(arrived - self._started, 3),
+            "s": hmac.new(self._key, session_id.encode("utf-8"), hashlib.sha256).hexdigest()[:16],
+            "n": int(new_session),
+            "mc": len(message),
+            "rc": len(response) if response is not None else None,
+            "st": status_code,
+            "l": round(latency, 3),
+        }
+        if usage:
+            entry["pt"] = usage.get("prompt_tokens")
+            entry["ct"] = usage.get("completion_tokens")
+        if max_tokens is not None:
+            entry["mt"] = max_tokens
+        if temperature is not None:
+            entry["tp"] = temperature
+        if self.include_content:
+            entry["m"] = message
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("capture_dropped")
+    
+    def _write(self) -> None:
+        """Write queued records, flushing whenever the queue runs empty."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                entry = self._queue.get()
+                if entry is None:
+                    f.flush()
+                    return
+                f.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+                if self._queue.empty():
+                    f.flush()
+    
+    def close(self, timeout: float = 5.0) -> None:
+        """Write the remaining records and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
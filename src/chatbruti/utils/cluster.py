@@ -0,0 +1,178 @@
+"""Session ownership across API nodes with consistent hashing."""
+
+import bisect
+import hashlib
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def _hash(key: str) -> int:
+    """Stable 64-bit hash of a string (identical on every node)."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _normalize(url: str) -> str:
+    return url.strip().rstrip("/")
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes.
+    
+    Each node is placed on the ring ``vnodes`` times; a key belongs to the
+    first node clockwise from its hash. Adding or removing one of N nodes
+    moves only about 1/N of the keys, and only to or from that node.
+    """
+    
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 128):
+        """
+        Initialize the ring.
+        
+        Args:
+            nodes: Initial node names
+            vnodes: Ring positions per node (more spreads keys more evenly)
+        """
+        self.vnodes = max(vnodes, 1)
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self._nodes: set = set()
+        for node in nodes:
+            self.add(node)
+    
+    @property
+    def nodes(self) -> List[str]:
+        """Nodes on the ring, sorted."""
+        return sorted(self._nodes)
+    
+    def add(self, node: str) -> None:
+        """Place a node on the ring (no-op if already present)."""
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for replica in range(self.vnodes):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+    
+    def remove(self, node: str) -> None:
+        """Take a node off the ring (no-op if absent)."""
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+    
+    def owner(self, key: str) -> Optional[str]:
+        """Node owning ``key``, or None if the ring is empty."""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class Cluster:
+    """
+    Membership of the API nodes sharing session traffic.
+    
+    Nodes are identified by their base URL. Every node must be given the
+    same member list so they agree on each session's owner; the owner holds
+    the session's history and backend caches, and other nodes forward its
+    requests there. With no members configured, every session is local. A
+    node left out of the member list is draining: it owns no sessions.
+    """
+    
+    def __init__(self, self_url: Optional[str], members: Iterable[str] = (), vnodes: int = 128):
+        """
+        Initialize the cluster view.
+        
+        Args:
+            self_url: Base URL other nodes reach this node at
+            members: Base URLs of all nodes, including this one
+            vnodes: Ring positions per node
+        
+        Raises:
+            ValueError: If members are given without ``self_url``
+        """
+        members = [_normalize(member) for member in members if member.strip()]
+        if members and not self_url:
+            raise ValueError("CLUSTER_SELF_URL is required when CLUSTER_MEMBERS is set")
+        self.self_url = _normalize(self_url) if self_url else None
+        self.vnodes = vnodes
+        self._ring = HashRing(vnodes=vnodes)
+        self._lock = threading.Lock()
+        self.set_members(members)
+    
+    @classmethod
+    def from_settings(
+        cls, self_url: Optional[str], members: Optional[str], vnodes: int = 128
+    ) -> "Cluster":
+        """Create a cluster view from a comma-separated member list."""
+        return cls(self_url, (members or "").split(","), vnodes)
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether sessions are assigned to nodes by the ring."""
+        return bool(self._ring.nodes)
+    
+    @property
+    def members(self) -> List[str]:
+        """Current member URLs."""
+        return self._ring.nodes
+    
+    @property
+    def is_member(self) -> bool:
+        """Whether this node is on the ring (False while draining)."""
+        return self.self_url in self._ring.nodes
+    
+    def set_members(self, members: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Replace the member list.
+        
+        Returns:
+            Members added and members removed
+        """
+        wanted = {_normalize(member) for member in members if member.strip()}
+        with self._lock:
+            current = set(self._ring.nodes)
+            added, removed = sorted(wanted - current), sorted(current - wanted)
+            # Build a new ring so concurrent lookups never see a half-updated one
+            ring = HashRing(self._ring.nodes, self.vnodes)
+            for member in removed:
+                ring.remove(member)
+            for member in added:
+                ring.add(member)
+            self._ring = ring
+        return added, removed
+    
+    def owner(self, session_id: str) -> Optional[str]:
+        """URL of the node owning a session (None when clustering is off)."""
+        if not self.enabled:
+            return None
+        return self._ring.owner(session_id)
+    
+    def is_local(self, session_id: str) -> bool:
+        """Whether this node owns a session."""
+        owner = self.owner(session_id)
+        return owner is None or owner == self.self_url
+    
+    def new_session_id(self) -> str:
+        """Random session ID owned by this node, so new sessions need no forwarding."""
+        if self.enabled and not self.is_member:
+            return str(uuid.uuid4())
+        while True:
+            session_id = str(uuid.uuid4())
+            if self.is_local(session_id):
+                return session_id
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Membership and ring configuration."""
+        return {
+            "enabled": self.enabled,
+            "self_url": self.self_url,
+            "is_member": self.is_member,
+            "members": self.members,
+            "vnodes": self.vnodes,
+        }
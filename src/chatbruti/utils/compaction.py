@@ -0,0 +1,101 @@
+"""Conversation compaction by summarizing old turns."""
+
+import logging
+from typing import Dict, List
+
+from .conversation import ConversationHistory
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "You compress chat transcripts. Summarize the conversation below in a few "
+    "short paragraphs. Keep names, facts, decisions, open questions and anything "
+    "the assistant promised. Write in the language of the conversation. "
+    "Reply with the summary only."
+)
+
+
+class ConversationCompactor:
+    """Summarizes the older turns of long conversations into a single summary."""
+    
+    def __init__(self, token_threshold: int, keep_messages: int = 6, max_summary_tokens: int = 512):
+        """
+        Initialize the compactor.
+        
+        Args:
+            token_threshold: Estimated prompt tokens above which a conversation is compacted
+            keep_messages: Number of most recent messages kept verbatim
+            max_summary_tokens: Maximum tokens generated for a summary
+        """
+        self.token_threshold = token_threshold
+        self.keep_messages = keep_messages
+        self.max_summary_tokens = max_summary_tokens
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether compaction is enabled."""
+        return self.token_threshold > 0
+    
+    def needs_compaction(self, conversation: ConversationHistory) -> bool:
+        """Check whether a conversation should be compacted."""
+        return (
+            self.enabled
+            and not conversation.compacting
+            and conversation.estimate_tokens() > self.token_threshold
+            and bool(self.select_messages(conversation))
+        )
+    
+    def select_messages(self, conversation: ConversationHistory) -> List[Dict[str, str]]:
+        """
+        Select the messages to summarize.
+        
+        Everything but the last ``keep_messages`` messages is selected, moved
+        back so that the kept part starts with a user turn.
+        """
+        turns = [m for m in conversation.messages if m["role"] != "system"]
+        cut = max(len(turns) - self.keep_messages, 0)
+        while 0 < cut < len(turns) and turns[cut]["role"] != "user":
+            cut -= 1
+        return turns[:cut]
+    
+    def compact(self, conversation: ConversationHistory, model) -> bool:
+        """
+        Summarize old turns of a conversation and replace them with the summary.
+        
+        Blocking; the server runs it in a worker thread, off the request path.
+        
+        Args:
+            conversation: Conversation to compact
+            model: Loaded model used to write the summary
+            
+        Returns:
+            True if the conversation was compacted
+        """
+        conversation.compacting = True
+        try:
+            replaced = self.select_messages(conversation)
+            if not replaced:
+                return False
+            
+            transcript = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in replaced)
+            if conversation.summary:
+                transcript = f"Earlier summary:\n{conversation.summary}\n\n{transcript}"
+            
+            summary = model.generate(
+                prompt=transcript,
+                system_prompt=SUMMARY_INSTRUCTIONS,
+                max_new_tokens=self.max_summary_tokens,
+            )
+            if not summary:
+                return False
+            
+            conversation.apply_summary(summary, replaced)
+            logger.info(
+                "Compacted %d messages of conversation %s", len(replaced), conversation.session_id
+            )
+            return True
+        except Exception as e:
+            logger.error("Error compacting conversation %s: %s", conversation.session_id, e)
+            return False
+        finally:
+            conversation.compacting = False
@@ -0,0 +1,42 @@
+"""Prompt context assembly shared by model backends."""
+
+from typing import Dict, List, Optional
+
+
+def build_messages(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    conversation_history: Optional[list] = None,
+) -> List[Dict[str, str]]:
+    """
+    Build the chat messages for a turn in a stable, prefix-friendly order.
+    
+    The system prompt always comes first, followed by the earlier turns and
+    the new user prompt, each exactly once: if the history already ends with
+    the prompt as a user message (the caller appended it before generating),
+    that message is dropped. Messages of earlier turns are copied as plain
+    ``role``/``content`` pairs, so the prompt of one turn is a byte-identical
+    prefix of the next and provider-side prompt caching can hit.
+    
+    Args:
+        prompt: New user message
+        system_prompt: Optional system prompt
+        conversation_history: Earlier turns, not including ``prompt``
+        
+    Returns:
+        List of message dictionaries with 'role' and 'content'
+    """
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    
+    history = list(conversation_history or [])
+    if history and history[-1].get("role") == "user" and history[-1].get("content") == prompt:
+        history.pop()
+    
+    for msg in history:
+        if msg.get("role") in ("user", "assistant"):
+            messages.append({"role": msg["role"], "content": msg.get("content", "")})
+    
+    messages.append({"role": "user", "content": prompt})
+    return messages
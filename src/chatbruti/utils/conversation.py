@@ -2,9 +2,11 @@
 
 import json
 import logging
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,16 @@ class ConversationHistory:
         self.max_history = max_history
         self.messages: List[Dict[str, str]] = []
         self.history_file: Optional[Path] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        # Backend-owned per-message token ids, reused across turns (not persisted)
+        self.token_cache: Dict[str, Any] = {}
+        # Every message ever added, kept for audit when turns are trimmed or compacted
+        self.transcript: List[Dict[str, str]] = []
+        # Summary of compacted turns, prepended to the system prompt
+        self.summary: Optional[str] = None
+        self.compacting = False
+        self._lock = threading.Lock()
     
     def add_message(self, role: str, content: str) -> None:
         """
@@ -33,18 +45,22 @@ class ConversationHistory:
             role: Message role ('user', 'assistant', or 'system')
             content: Message content
         """
-        self.messages.append({
+        message = {
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat()
-        })
-        
-        # Keep only the last max_history message pairs (user + assistant)
-        if len(self.messages) > self.max_history * 2:
-            # Keep system message if present, then recent messages
-            system_msgs = [m for m in self.messages if m["role"] == "system"]
-            recent_msgs = self.messages[-self.max_history * 2:]
-            self.messages = system_msgs + recent_msgs
+        }
+        with self._lock:
+            self.messages.append(message)
+            self.transcript.append(message)
+            self.updated_at = time.time()
+            
+            # Keep only the last max_history message pairs (user + assistant)
+            if len(self.messages) > self.max_history * 2:
+                # Keep system message if present, then recent messages
+                system_msgs = [m for m in self.messages if m["role"] == "system"]
+                recent_msgs = self.messages[-self.max_history * 2:]
+                self.messages = system_msgs + recent_msgs
     
     def get_messages(self, include_system: bool = True) -> List[Dict[str, str]]:
         """
@@ -63,10 +79,49 @@ class ConversationHistory:
             return [{"role": msg["role"], "content": msg["content"]} 
                    for msg in self.messages if msg["role"] != "system"]
     
+    def estimate_tokens(self) -> int:
+        """Estimate the prompt tokens of the conversation (about 4 characters per token)."""
+        chars = sum(len(m["content"]) for m in self.messages if m["role"] != "system")
+        return (chars + len(self.summary or "")) // 4
+    
+    def build_system_prompt(self, system_prompt: Optional[str]) -> Optional[str]:
+        """
+        Combine the base system prompt with the summary of compacted turns.
+        
+        Args:
+            system_prompt: Base system prompt
+            
+        Returns:
+            System prompt to send to the model
+        """
+        if not self.summary:
+            return system_prompt
+        summary = f"Summary of the earlier conversation:\n{self.summary}"
+        return f"{system_prompt}\n\n{summary}" if system_prompt else summary
+    
+    def apply_summary(self, summary: str, replaced: List[Dict[str, str]]) -> None:
+        """
+        Replace compacted messages with a summary.
+        
+        Messages added while the summary was being generated are kept; only
+        the given messages are removed. The transcript is left untouched.
+        
+        Args:
+            summary: Summary of the replaced messages (and any previous summary)
+            replaced: Messages covered by the summary
+        """
+        replaced_ids = {id(m) for m in replaced}
+        with self._lock:
+            self.messages = [m for m in self.messages if id(m) not in replaced_ids]
+            self.summary = summary
+            self.token_cache.clear()
+    
     def clear(self) -> None:
         """Clear conversation history (keeps system messages)."""
         system_msgs = [m for m in self.messages if m["role"] == "system"]
         self.messages = system_msgs
+        self.summary = None
+        self.token_cache.clear()
     
     def to_dict(self) -> Dict:
         """Convert conversation to dictionary."""
@@ -76,6 +131,29 @@ class ConversationHistory:
             "message_count": len(self.messages)
         }
     
+    def to_state(self) -> Dict[str, Any]:
+        """Full persistent state (backend caches excluded), for moving a session between nodes."""
+        return {
+            "session_id": self.session_id,
+            "max_history": self.max_history,
+            "messages": self.messages,
+            "transcript": self.transcript,
+            "summary": self.summary,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+    
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ConversationHistory":
+        """Rebuild a conversation from ``to_state()`` output."""
+        conversation = cls(session_id=state["session_id"], max_history=state.get("max_history", 20))
+        conversation.messages = list(state.get("messages", []))
+        conversation.transcript = list(state.get("transcript", conversation.messages))
+        conversation.summary = state.get("summary")
+        conversation.created_at = state.get("created_at", conversation.created_at)
+        conversation.updated_at = state.get("updated_at", conversation.updated_at)
+        return conversation
+    
     def save_to_file(self, file_path: Optional[str] = None) -> Path:
         """
         Save conversation history to a JSON file.
@@ -97,6 +175,8 @@ class ConversationHistory:
         data = {
             "session_id": self.session_id,
             "messages": self.messages,
+            "summary": self.summary,
+            "transcript": self.transcript,
             "created_at": self.messages[0]["timestamp"] if self.messages else None,
             "updated_at": datetime.now().isoformat()
         }
@@ -104,7 +184,7 @@ class ConversationHistory:
         with open(self.history_file, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         
-        logger.info(f"Conversation saved to {self.history_file}")
+        logger.info("Conversation saved to %s", self.history_file)
         return self.history_file
     
     def load_from_file(self, file_path: str) -> None:
@@ -123,7 +203,10 @@ class ConversationHistory:
         
         self.session_id = data.get("session_id", self.session_id)
         self.messages = data.get("messages", [])
+        self.summary = data.get("summary")
+        self.transcript = data.get("transcript", list(self.messages))
         self.history_file = history_file
+        self.token_cache.clear()
         
-        logger.info(f"Conversation loaded from {history_file}")
+        logger.info("Conversation loaded from %s", history_file)
 
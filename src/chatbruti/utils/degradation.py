@@ -0,0 +1,204 @@
+"""Load-adaptive generation budgets."""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Signals a tier can be triggered by, and the parameters it can lower
+TRIGGERS = ("queue_depth", "latency_seconds", "rate_limit_remaining")
+PARAMETERS = ("max_new_tokens", "reasoning_effort", "model")
+
+EFFORT_ORDER = ("low", "medium", "high")
+
+
+class DegradationPolicy:
+    """
+    Lower generation budgets as load rises and restore them as it falls.
+    
+    Tiers are ordered from mildest to most severe. A tier is entered as soon
+    as any of its thresholds is reached (``queue_depth`` waiting requests,
+    ``latency_seconds`` p95 generation time, or ``rate_limit_remaining`` as the
+    fraction of the API rate limit left) and its parameters then cap every
+    request. Load must stay below a tier's thresholds for ``cooldown_seconds``
+    before stepping back down one tier, so the policy does not flap.
+    """
+    
+    def __init__(self, tiers: List[Dict[str, Any]], cooldown_seconds: float = 30.0):
+        """
+        Initialize the policy.
+        
+        Args:
+            tiers: Tier definitions, mildest first
+            cooldown_seconds: Time below a tier's thresholds before leaving it
+            
+        Raises:
+            ValueError: If a tier has no trigger or no parameter
+        """
+        for index, tier in enumerate(tiers):
+            tier.setdefault("name", f"tier{index + 1}")
+            if not any(key in tier for key in TRIGGERS):
+                raise ValueError(
+                    f"Degradation tier {tier['name']} has no trigger ({', '.join(TRIGGERS)})"
+                )
+            if not any(key in tier for key in PARAMETERS):
+                raise ValueError(
+                    f"Degradation tier {tier['name']} changes none of {', '.join(PARAMETERS)}"
+                )
+        self.tiers = tiers
+        self.cooldown_seconds = cooldown_seconds
+        self.level = 0
+        self._calm_since: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_json(cls, text: Optional[str], cooldown_seconds: float = 30.0) -> "DegradationPolicy":
+        """
+        Create a policy from a JSON list of tiers (empty disables degradation).
+        
+        Raises:
+            ValueError: If the text is not a valid list of tiers
+        """
+        try:
+            tiers = json.loads(text) if text else []
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Degradation tiers are not valid JSON: {e}") from e
+        if not isinstance(tiers, list) or not all(isinstance(tier, dict) for tier in tiers):
+            raise ValueError("Degradation tiers must be a JSON list of objects")
+        return cls(tiers, cooldown_seconds)
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether any tiers are configured."""
+        return bool(self.tiers)
+    
+    @property
+    def tier(self) -> Optional[Dict[str, Any]]:
+        """The active tier, or None under normal load."""
+        return self.tiers[self.level - 1] if self.level else None
+    
+    def update(
+        self,
+        queue_depth: int,
+        latency_seconds: float,
+        rate_limit_remaining: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Re-evaluate the tier from current load signals.
+        
+        Args:
+            queue_depth: Requests waiting for a generation slot
+            latency_seconds: Recent p95 generation time
+            rate_limit_remaining: Fraction of the API rate limit left, if known
+            
+        Returns:
+            The active tier, or None under normal load
+        """
+        target = 0
+        for index, tier in enumerate(self.tiers, start=1):
+            if self._triggered(tier, queue_depth, latency_seconds, rate_limit_remaining):
+                target = index
+        
+        now = time.monotonic()
+        with self._lock:
+            if target > self.level:
+                self.level = target
+                self._calm_since = None
+                self._changed("up")
+            elif target < self.level:
+                if self._calm_since is None:
+                    self._calm_since = now
+                elif now - self._calm_since >= self.cooldown_seconds:
+                    self.level -= 1
+                    self._calm_since = now
+                    self._changed("down")
+            else:
+                self._calm_since = None
+            metrics.set_gauge("degradation_level", self.level)
+            return self.tier
+    
+    def overrides(
+        self,
+        max_new_tokens: Optional[int],
+        default_max_new_tokens: int,
+        default_reasoning_effort: Optional[str],
+        supported: Iterable[str] = PARAMETERS,
+    ) -> Dict[str, Any]:
+        """
+        Get the generation parameters the active tier imposes on a request.
+        
+        Parameters are only ever lowered, never raised above what the request
+        or the settings ask for.
+        
+        Args:
+            max_new_tokens: Requested maximum tokens (None for the default)
+            default_max_new_tokens: Configured maximum tokens
+            default_reasoning_effort: Configured reasoning effort
+            supported: Parameters the backend accepts
+            
+        Returns:
+            Keyword arguments to pass to the model
+        """
+        tier = self.tier
+        if tier is None:
+            return {}
+        
+        params: Dict[str, Any] = {}
+        requested = max_new_tokens or default_max_new_tokens
+        if (
+            "max_new_tokens" in supported
+            and tier.get("max_new_tokens")
+            and tier["max_new_tokens"] < requested
+        ):
+            params["max_new_tokens"] = tier["max_new_tokens"]
+        effort = tier.get("reasoning_effort")
+        if (
+            "reasoning_effort" in supported
+            and effort in EFFORT_ORDER
+            and default_reasoning_effort in EFFORT_ORDER
+            and EFFORT_ORDER.index(effort) < EFFORT_ORDER.index(default_reasoning_effort)
+        ):
+            params["reasoning_effort"] = effort
+        if "model" in supported and tier.get("model"):
+            params["model"] = tier["model"]
+        
+        for parameter in params:
+            metrics.inc("degradation_downgrades", tier=tier["name"], parameter=parameter)
+        return params
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the current state of the policy."""
+        tier = self.tier
+        return {
+            "level": self.level,
+            "tier": tier["name"] if tier else None,
+            "tiers": [tier["name"] for tier in self.tiers],
+        }
+    
+    @staticmethod
+    def _triggered(
+        tier: Dict[str, Any],
+        queue_depth: int,
+        latency_seconds: float,
+        rate_limit_remaining: Optional[float],
+    ) -> bool:
+        if "queue_depth" in tier and queue_depth >= tier["queue_depth"]:
+            return True
+        if "latency_seconds" in tier and latency_seconds >= tier["latency_seconds"]:
+            return True
+        return (
+            "rate_limit_remaining" in tier
+            and rate_limit_remaining is not None
+            and rate_limit_remaining <= tier["rate_limit_remaining"]
+        )
+    
+    def _changed(self, direction: str) -> None:
+        name = self.tier["name"] if self.tier else "normal"
+        metrics.inc("degradation_changes", direction=direction, tier=name)
+        log = logger.warning if direction == "up" else logger.info
+        log(f"Load degradation {direction} to {name}")
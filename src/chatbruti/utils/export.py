@@ -0,0 +1,191 @@
+"""Streaming export of conversation sessions."""
+
+import json
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .conversation import ConversationHistory
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ("ndjson", "parquet")
+
+# Output is handed out in chunks of about this many bytes
+CHUNK_BYTES = 64 * 1024
+# Messages per Parquet row group
+ROW_GROUP_MESSAGES = 10000
+
+# A session and the length of its transcript when the export started
+SessionSnapshot = Tuple[ConversationHistory, int]
+
+
+def snapshot_sessions(
+    conversations: Dict[str, ConversationHistory],
+    matches: Optional[Callable[[ConversationHistory], bool]] = None,
+) -> List[SessionSnapshot]:
+    """
+    Fix the sessions and transcript lengths an export covers.
+    
+    Only references and lengths are taken, not messages, so this is quick
+    and needs no session locks: transcripts are append-only, and an export
+    later reads each one up to the recorded length. Sessions created and
+    messages added after the snapshot are left out.
+    
+    Args:
+        conversations: Session registry
+        matches: Optional filter on sessions
+    
+    Returns:
+        Sessions with their transcript lengths
+    """
+    return [
+        (conversation, len(conversation.transcript))
+        for conversation in list(conversations.values())
+        if matches is None or matches(conversation)
+    ]
+
+
+def session_record(conversation: ConversationHistory, length: int) -> Dict[str, Any]:
+    """Export record of a session, with its transcript up to ``length`` messages."""
+    messages = conversation.transcript[:length]
+    return {
+        "session_id": conversation.session_id,
+        "created_at": messages[0]["timestamp"] if messages else None,
+        "updated_at": messages[-1]["timestamp"] if messages else None,
+        "message_count": len(messages),
+        "summary": conversation.summary,
+        "messages": messages,
+    }
+
+
+def iter_ndjson(sessions: Iterable[SessionSnapshot], compress: bool = False) -> Iterator[bytes]:
+    """
+    Encode sessions as NDJSON, one session per line.
+    
+    Args:
+        sessions: Sessions with their transcript lengths (consumed lazily)
+        compress: Whether to gzip the output
+    
+    Yields:
+        Chunks of the encoded output
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer: List[bytes] = []
+    size = 0
+    for conversation, length in sessions:
+        line = json.dumps(session_record(conversation, length), ensure_ascii=False) + "\n"
+        data = line.encode("utf-8")
+        if compressor is not None:
+            data = compressor.compress(data)
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if compressor is not None:
+        buffer.append(compressor.flush())
+    if buffer:
+        yield b"".join(buffer)
+
+
+class _ChunkSink:
+    """Write-only file object collecting what the Parquet writer produces."""
+    
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def close(self) -> None:
+        self.closed = True
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(sessions: Iterable[SessionSnapshot]) -> Iterator[bytes]:
+    """
+    Encode sessions as a Parquet file with one row per message.
+    
+    Columns are session_id, position (index in the transcript), role,
+    content and timestamp; summaries are not included. Messages are written
+    in row groups of ROW_GROUP_MESSAGES, so memory stays bounded.
+    
+    Args:
+        sessions: Sessions with their transcript lengths (consumed lazily)
+    
+    Yields:
+        Chunks of the Parquet file
+    """
+    schema = pa.schema([
+        ("session_id", pa.string()),
+        ("position", pa.int32()),
+        ("role", pa.string()),
+        ("content", pa.string()),
+        ("timestamp", pa.string()),
+    ])
+    columns: Dict[str, List[Any]] = {name: [] for name in schema.names}
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    
+    def write_group() -> bytes:
+        writer.write_table(pa.table(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+        return sink.drain()
+    
+    for conversation, length in sessions:
+        for position, message in enumerate(conversation.transcript[:length]):
+            columns["session_id"].append(conversation.session_id)
+            columns["position"].append(position)
+            columns["role"].append(message.get("role"))
+            columns["content"].append(message.get("content"))
+            columns["timestamp"].append(message.get("timestamp"))
+            if len(columns["position"]) >= ROW_GROUP_MESSAGES:
+                yield write_group()
+    if columns["position"]:
+        yield write_group()
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(
+    sessions: Iterable[SessionSnapshot], fmt: str = "ndjson", compress: bool = False
+) -> Iterator[bytes]:
+    """
+    Encode sessions in an export format.
+    
+    Args:
+        sessions: Sessions with their transcript lengths
+        fmt: 'ndjson' or 'parquet'
+        compress: Gzip NDJSON output (Parquet is always compressed)
+    
+    Returns:
+        Iterator over chunks of the encoded output
+    
+    Raises:
+        ValueError: If the format is not supported
+        ImportError: If Parquet is requested and pyarrow is not installed
+    """
+    if fmt == "ndjson":
+        return iter_ndjson(sessions, compress)
+    if fmt == "parquet":
+        if pa is None:
+            raise ImportError(
+                "pyarrow is required for Parquet export. Install it with: pip install pyarrow"
+            )
+        return iter_parquet(sessions)
+    raise ValueError(f"Export format must be one of {', '.join(EXPORT_FORMATS)}")
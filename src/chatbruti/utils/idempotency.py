@@ -0,0 +1,114 @@
+"""Deduplication of retried requests by idempotency key."""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .metrics import metrics
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused with a different request."""
+
+
+def request_fingerprint(body: str) -> str:
+    """Digest identifying a request body, to detect keys reused for other requests."""
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Run each keyed request once and answer retries with its result.
+    
+    A retry arriving while the original request is still running waits for
+    the same result; one arriving after it succeeded gets the stored result
+    until ``ttl_seconds`` pass. At most ``max_entries`` results are kept,
+    oldest first out. Failures are not stored, so a retry after an error
+    runs again.
+    
+    The work of a key runs in its own task, so it completes (and its result
+    is stored) even if the request that started it goes away.
+    
+    Must be used from a single event loop.
+    """
+    
+    def __init__(self, ttl_seconds: float = 3600.0, max_entries: int = 10000):
+        """
+        Initialize the store.
+        
+        Args:
+            ttl_seconds: How long completed results are kept
+            max_entries: Maximum number of completed results kept
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key -> (fingerprint, task)
+        self._pending: Dict[str, Tuple[str, asyncio.Task]] = {}
+        # key -> (expires_at, fingerprint, result), oldest first
+        self._completed: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+    
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Get the result for a key, running ``compute`` if no earlier request did.
+        
+        Args:
+            key: Idempotency key (scoped by the caller, e.g. per tenant)
+            fingerprint: Digest of the request, see request_fingerprint()
+            compute: Coroutine function producing the result
+        
+        Returns:
+            The result, and whether it came from an earlier request
+        
+        Raises:
+            IdempotencyConflict: If the key was used for a different request
+        """
+        self._expire()
+        
+        entry = self._completed.get(key)
+        if entry is not None:
+            self._check(key, entry[1], fingerprint)
+            metrics.inc("idempotency_replays", state="completed")
+            return entry[2], True
+        
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._check(key, pending[0], fingerprint)
+            metrics.inc("idempotency_replays", state="in_flight")
+            return await asyncio.shield(pending[1]), True
+        
+        task = asyncio.ensure_future(compute())
+        self._pending[key] = (fingerprint, task)
+        task.add_done_callback(lambda done: self._finish(key, fingerprint, done))
+        return await asyncio.shield(task), False
+    
+    def _finish(self, key: str, fingerprint: str, task: asyncio.Task) -> None:
+        """Store the result of a completed task."""
+        self._pending.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._completed[key] = (time.monotonic() + self.ttl_seconds, fingerprint, task.result())
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+        metrics.set_gauge("idempotency_stored", len(self._completed))
+    
+    def _expire(self) -> None:
+        """Drop expired results (entries expire in insertion order)."""
+        now = time.monotonic()
+        while self._completed:
+            key, (expires_at, _, _) = next(iter(self._completed.items()))
+            if expires_at > now:
+                break
+            del self._completed[key]
+    
+    @staticmethod
+    def _check(key: str, stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            metrics.inc("idempotency_conflicts")
+            raise IdempotencyConflict(f"Idempotency key reused for a different request: {key}")
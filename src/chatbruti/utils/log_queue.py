@@ -0,0 +1,91 @@
+"""Logging through a queue, so handlers do their I/O off the request path."""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from .metrics import metrics
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that drops records instead of blocking when the queue is full.
+    
+    Records are queued as they are: formatting, including the merge of the
+    message with its arguments, happens in the listener thread. Arguments
+    must therefore not be mutated after logging, which holds for the
+    strings and numbers passed with %-style logging.
+    """
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("log_records_dropped")
+
+
+class _DrainingListener(QueueListener):
+    """Queue listener whose stop waits for room in a full queue instead of failing."""
+    
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+    
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+
+
+def setup_queue_logging(
+    queue_size: int = 10000, level: int = logging.INFO
+) -> Optional[QueueListener]:
+    """
+    Route root logger output through a bounded queue and a listener thread.
+    
+    The root logger's handlers (a stream handler if there are none) are moved
+    behind the queue, so a log call only enqueues its record; formatting and
+    writing happen in the listener thread. When more than ``queue_size``
+    records are waiting, new ones are dropped and counted
+    (``log_records_dropped``). Calling it again has no effect.
+    
+    Args:
+        queue_size: Maximum number of records waiting to be written
+            (0 leaves logging synchronous)
+        level: Root logger level if it has no handlers yet
+    
+    Returns:
+        The running listener, or None if logging stays synchronous
+    """
+    global _listener
+    if _listener is not None or queue_size <= 0:
+        return _listener
+    
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    if not handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers = [handler]
+        root.setLevel(level)
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    
+    _listener = _DrainingListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
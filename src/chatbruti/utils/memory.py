@@ -0,0 +1,188 @@
+"""Approximate memory accounting for the debug endpoint."""
+
+import sys
+import threading
+import tracemalloc
+import types
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# tracemalloc groupings accepted by AllocationTracer.diff()
+GROUP_BY = ("lineno", "filename", "traceback")
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Approximate the bytes held by an object and everything it references.
+    
+    Follows containers and instance ``__dict__``s, counting each object
+    once. Objects shared with other structures are counted in full, so the
+    result is an upper bound of what freeing ``obj`` would return.
+    
+    Args:
+        obj: Object to measure
+    
+    Returns:
+        Size in bytes
+    """
+    seen = set()
+    pending = [obj]
+    total = 0
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        try:
+            total += sys.getsizeof(item)
+        except TypeError:
+            continue
+        if isinstance(item, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        if isinstance(item, dict):
+            # Copy first: the structure may change while it is measured
+            for key, value in list(item.items()):
+                pending.append(key)
+                pending.append(value)
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(list(item))
+        elif hasattr(item, "__dict__") and not isinstance(item, (type, types.ModuleType)):
+            pending.append(item.__dict__)
+    return total
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Resident set size of the process now and at its peak, in bytes."""
+    usage = {"rss_bytes": None, "peak_rss_bytes": None}
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    usage["rss_bytes"] = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    usage["peak_rss_bytes"] = int(line.split()[1]) * 1024
+    except OSError:
+        if resource is None:
+            return usage
+        # No procfs (e.g. macOS, where ru_maxrss is in bytes rather than KiB)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    return usage
+
+
+def torch_memory() -> Optional[Dict[str, Any]]:
+    """
+    CUDA caching allocator statistics per device.
+    
+    Returns:
+        Allocated, reserved and peak bytes plus allocation retries and
+        out-of-memory errors per device, or None without torch or CUDA
+    """
+    if torch is None or not torch.cuda.is_available():
+        return None
+    devices = {}
+    for index in range(torch.cuda.device_count()):
+        stats = torch.cuda.memory_stats(index)
+        devices[f"cuda:{index}"] = {
+            "allocated_bytes": stats.get("allocated_bytes.all.current", 0),
+            "reserved_bytes": stats.get("reserved_bytes.all.current", 0),
+            "peak_allocated_bytes": stats.get("allocated_bytes.all.peak", 0),
+            "inactive_split_bytes": stats.get("inactive_split_bytes.all.current", 0),
+            "alloc_retries": stats.get("num_alloc_retries", 0),
+            "ooms": stats.get("num_ooms", 0),
+        }
+    return devices
+
+
+class AllocationTracer:
+    """
+    On-demand tracemalloc snapshots, each compared with the previous one.
+    
+    Tracing starts with the first ``diff()`` call (it slows allocations
+    down, so it is not on by default) and runs until ``stop()``. Each later
+    call reports where memory grew since the call before it.
+    """
+    
+    def __init__(self, frames: int = 1):
+        """
+        Initialize the tracer.
+        
+        Args:
+            frames: Stack frames recorded per allocation (more frames make
+                'traceback' grouping more useful and tracing slower)
+        """
+        self.frames = frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def tracing(self) -> bool:
+        """Whether allocations are being traced."""
+        return tracemalloc.is_tracing()
+    
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+    
+    def diff(self, limit: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+        """
+        Take a snapshot and report the allocation sites that grew most.
+        
+        Args:
+            limit: Number of allocation sites to report
+            group_by: 'lineno', 'filename' or 'traceback'
+        
+        Returns:
+            Traced and peak bytes and the top sites by growth since the
+            previous snapshot (empty on the call that starts tracing)
+        
+        Raises:
+            ValueError: If ``group_by`` is not supported
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._previous = None
+            snapshot = self._snapshot()
+            previous, self._previous = self._previous, snapshot
+            top: List[Dict[str, Any]] = []
+            if previous is not None:
+                for stat in snapshot.compare_to(previous, group_by)[:limit]:
+                    top.append({
+                        "location": [str(frame) for frame in stat.traceback],
+                        "size_bytes": stat.size,
+                        "size_diff_bytes": stat.size_diff,
+                        "count": stat.count,
+                        "count_diff": stat.count_diff,
+                    })
+            traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "baseline": previous is None,
+            "traced_bytes": traced,
+            "peak_traced_bytes": peak,
+            "top": top,
+        }
+    
+    def stop(self) -> bool:
+        """Stop tracing and drop the stored snapshot; returns whether tracing was on."""
+        with self._lock:
+            self._previous = None
+            if not tracemalloc.is_tracing():
+                return False
+            tracemalloc.stop()
+            return True
@@ -0,0 +1,102 @@
+"""In-process metrics registry."""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+# Recent observations kept per histogram for percentiles
+_RESERVOIR_SIZE = 1024
+
+
+def _key(name: str, labels: Dict[str, Any]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{rendered}}}"
+
+
+class Metrics:
+    """
+    Thread-safe counters, gauges and histograms.
+    
+    Histograms keep count, sum and max over all observations and percentiles
+    over the most recent observations.
+    """
+    
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[str, Tuple[Dict[str, float], Deque[float]]] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to a value."""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+    
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record an observation in a histogram."""
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = (
+                    {"count": 0, "sum": 0.0, "max": 0.0},
+                    deque(maxlen=_RESERVOIR_SIZE),
+                )
+            totals, recent = self._histograms[key]
+            totals["count"] += 1
+            totals["sum"] += value
+            totals["max"] = max(totals["max"], value)
+            recent.append(value)
+    
+    def percentile(self, name: str, q: float, **labels) -> float:
+        """
+        Get a percentile of the recent observations of a histogram.
+        
+        Args:
+            name: Histogram name
+            q: Percentile between 0 and 100
+            
+        Returns:
+            The percentile, or 0.0 if there are no observations
+        """
+        with self._lock:
+            entry = self._histograms.get(_key(name, labels))
+            values = sorted(entry[1]) if entry else []
+        if not values:
+            return 0.0
+        index = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+        return values[index]
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get all metric values."""
+        with self._lock:
+            histograms = {
+                key: (dict(totals), sorted(recent))
+                for key, (totals, recent) in self._histograms.items()
+            }
+            result = {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {},
+            }
+        
+        for key, (totals, values) in histograms.items():
+            summary = dict(totals)
+            summary["mean"] = totals["sum"] / totals["count"] if totals["count"] else 0.0
+            for q in (50, 95, 99):
+                index = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+                summary[f"p{q}"] = values[index] if values else 0.0
+            result["histograms"][key] = summary
+        return result
+
+
+# Global metrics registry
+metrics = Metrics()
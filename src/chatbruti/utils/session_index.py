@@ -0,0 +1,115 @@
+"""Index of conversation sessions ordered by last activity."""
+
+import base64
+import binascii
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class SessionIndex:
+    """
+    Keeps session ids sorted by last activity for cursor-based pagination.
+    
+    Pages run from the most recently active session backwards. A cursor
+    encodes the (last activity, session id) key of the last returned entry,
+    so paging stays stable while other sessions are created or updated.
+    """
+    
+    def __init__(self):
+        """Initialize an empty index."""
+        self._keys: List[Tuple[float, str]] = []
+        self._activity: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._activity)
+    
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._activity
+    
+    def touch(self, session_id: str, timestamp: Optional[float] = None) -> None:
+        """
+        Record activity for a session, adding it to the index if needed.
+        
+        Args:
+            session_id: Session identifier
+            timestamp: Activity time (epoch seconds), defaults to now
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._discard(session_id)
+            self._activity[session_id] = timestamp
+            bisect.insort(self._keys, (timestamp, session_id))
+    
+    def remove(self, session_id: str) -> None:
+        """Remove a session from the index."""
+        with self._lock:
+            self._discard(session_id)
+    
+    def _discard(self, session_id: str) -> None:
+        """Remove a session's key (caller holds the lock)."""
+        previous = self._activity.pop(session_id, None)
+        if previous is not None:
+            position = bisect.bisect_left(self._keys, (previous, session_id))
+            del self._keys[position]
+    
+    def page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        predicate: Optional[Callable[[str], bool]] = None,
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Get one page of session ids, most recently active first.
+        
+        Args:
+            cursor: Cursor returned by the previous page, or None for the first page
+            limit: Maximum number of session ids to return
+            predicate: Optional filter; sessions for which it returns False are skipped
+            
+        Returns:
+            Tuple of (session ids, cursor for the next page or None at the end)
+        """
+        with self._lock:
+            keys = self._keys
+            if cursor:
+                position = bisect.bisect_left(keys, self.decode_cursor(cursor)) - 1
+            else:
+                position = len(keys) - 1
+            
+            session_ids = []
+            last_key = None
+            while position >= 0 and len(session_ids) < limit:
+                key = keys[position]
+                position -= 1
+                if predicate is None or predicate(key[1]):
+                    session_ids.append(key[1])
+                    last_key = key
+            
+            has_more = position >= 0
+        
+        next_cursor = self.encode_cursor(last_key) if has_more and last_key else None
+        return session_ids, next_cursor
+    
+    @staticmethod
+    def encode_cursor(key: Tuple[float, str]) -> str:
+        """Encode an index key as an opaque cursor string."""
+        raw = f"{key[0]!r}:{key[1]}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, str]:
+        """
+        Decode a cursor string back to an index key.
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+            timestamp, session_id = raw.split(":", 1)
+            return float(timestamp), session_id
+        except (binascii.Error, UnicodeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
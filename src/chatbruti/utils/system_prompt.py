@@ -51,7 +51,7 @@ def load_system_prompt(file_path: Optional[str] = None) -> Optional[str]:
         full_path = project_root / prompt_file
     
     if not full_path.exists():
-        logger.warning(f"System prompt file not found: {full_path}")
+        logger.warning("System prompt file not found: %s", full_path)
         return None
     
     try:
@@ -60,14 +60,14 @@ def load_system_prompt(file_path: Optional[str] = None) -> Optional[str]:
         
         if prompt:
             _system_prompt_cache = prompt
-            logger.info(f"Loaded system prompt from: {full_path}")
+            logger.info("Loaded system prompt from: %s", full_path)
             return prompt
         else:
-            logger.warning(f"System prompt file is empty: {full_path}")
+            logger.warning("System prompt file is empty: %s", full_path)
             return None
             
     except Exception as e:
-        logger.error(f"Error loading system prompt from {full_path}: {e}")
+        logger.error("Error loading system prompt from %s: %s", full_path, e)
         return None
 
 
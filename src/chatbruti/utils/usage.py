@@ -0,0 +1,240 @@
+"""Token usage accounting and quotas per session and tenant."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+def _empty_totals() -> Dict[str, float]:
+    return {
+        "requests": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "total_tokens": 0,
+        "latency_seconds": 0.0,
+    }
+
+
+class QuotaExceeded(Exception):
+    """
+    Raised when a request is rejected by a quota.
+    
+    ``reason`` is 'requests' or 'tokens' for a full tenant window (retrying
+    after ``retry_after`` seconds may succeed), 'session_budget' for a
+    session that used up its token budget, or 'too_large' for a request
+    that could never fit the request quota; the last two have no
+    ``retry_after`` since waiting does not help.
+    """
+    
+    def __init__(self, reason: str, retry_after: Optional[float] = None):
+        super().__init__(f"Usage quota exceeded: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def tenant_from_headers(api_key: Optional[str], origin: Optional[str]) -> str:
+    """
+    Derive a tenant identifier from request headers.
+    
+    API keys are hashed so they never appear in usage reports; requests
+    without a key are attributed to the embedding site's origin.
+    
+    Args:
+        api_key: Value of the X-API-Key header
+        origin: Value of the Origin header
+        
+    Returns:
+        Tenant identifier
+    """
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    if origin:
+        return f"origin:{origin}"
+    return "anonymous"
+
+
+class UsageTracker:
+    """
+    Aggregates usage per session and per tenant and enforces quotas.
+    
+    Quotas use a sliding window per tenant: a tenant that has made
+    ``requests_per_window`` requests or used ``tokens_per_window`` tokens in the
+    last ``window_seconds`` is rejected until enough of its window expires.
+    A limit of 0 disables that quota.
+    
+    Tenant identifiers come from client headers, so at most ``max_tenants``
+    tenants are tracked: beyond that, the least recently active tenant's
+    totals and windows are dropped.
+    """
+    
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        requests_per_window: int = 0,
+        tokens_per_window: int = 0,
+        session_token_limit: int = 0,
+        max_tenants: int = 10000,
+    ):
+        """
+        Initialize the tracker.
+        
+        Args:
+            window_seconds: Length of the tenant quota window
+            requests_per_window: Maximum requests per tenant and window (0 disables)
+            tokens_per_window: Maximum tokens per tenant and window (0 disables)
+            session_token_limit: Maximum total tokens per session (0 disables)
+            max_tenants: Maximum number of tenants tracked (0 for no limit)
+        """
+        self.window_seconds = window_seconds
+        self.requests_per_window = requests_per_window
+        self.tokens_per_window = tokens_per_window
+        self.session_token_limit = session_token_limit
+        self.max_tenants = max_tenants
+        self._sessions: Dict[str, Dict[str, float]] = {}
+        self._tenants: Dict[str, Dict[str, float]] = {}
+        self._request_times: Dict[str, Deque[float]] = {}
+        self._token_times: Dict[str, Deque[Tuple[float, int]]] = {}
+        self._rejected: Dict[str, int] = {}
+        # Tenants by last activity, least recent first
+        self._active: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def check(self, tenant: str, session_id: Optional[str] = None, requests: int = 1) -> None:
+        """
+        Check quotas before a request reaches the backend.
+        
+        Admitted requests are counted against the tenant's request quota.
+        
+        Args:
+            tenant: Tenant identifier
+            session_id: Optional session identifier
+            requests: Number of requests being admitted (e.g. batch size)
+        
+        Raises:
+            QuotaExceeded: If the request is rejected
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                self._check_quotas(tenant, session_id, requests, now)
+            except QuotaExceeded:
+                self._touch(tenant, now)
+                self._rejected[tenant] = self._rejected.get(tenant, 0) + 1
+                raise
+            
+            self._touch(tenant, now)
+            times = self._request_times.setdefault(tenant, deque())
+            times.extend([now] * requests)
+    
+    def _check_quotas(
+        self, tenant: str, session_id: Optional[str], requests: int, now: float
+    ) -> None:
+        """Raise QuotaExceeded if a request does not fit the quotas (caller holds the lock)."""
+        if self.session_token_limit and session_id in self._sessions:
+            if self._sessions[session_id]["total_tokens"] >= self.session_token_limit:
+                # Session budgets do not refill
+                raise QuotaExceeded("session_budget")
+        if self.requests_per_window and requests > self.requests_per_window:
+            raise QuotaExceeded("too_large")
+        
+        cutoff = now - self.window_seconds
+        
+        times = self._request_times.get(tenant)
+        if times is not None:
+            while times and times[0] <= cutoff:
+                times.popleft()
+            if self.requests_per_window and len(times) + requests > self.requests_per_window:
+                raise QuotaExceeded("requests", max(times[0] - cutoff, 0.0))
+        
+        tokens = self._token_times.get(tenant)
+        if tokens is not None:
+            while tokens and tokens[0][0] <= cutoff:
+                tokens.popleft()
+            if self.tokens_per_window and tokens:
+                if sum(count for _, count in tokens) >= self.tokens_per_window:
+                    raise QuotaExceeded("tokens", max(tokens[0][0] - cutoff, 0.0))
+    
+    def _touch(self, tenant: str, now: float) -> None:
+        """Mark a tenant active and drop the least recently active beyond the cap (lock held)."""
+        self._active[tenant] = now
+        self._active.move_to_end(tenant)
+        while self.max_tenants and len(self._active) > self.max_tenants:
+            evicted, _ = self._active.popitem(last=False)
+            self._tenants.pop(evicted, None)
+            self._request_times.pop(evicted, None)
+            self._token_times.pop(evicted, None)
+            self._rejected.pop(evicted, None)
+    
+    def record(
+        self,
+        tenant: str,
+        session_id: Optional[str],
+        usage: Optional[Dict[str, int]],
+        latency: float,
+    ) -> None:
+        """
+        Record usage of a completed request.
+        
+        Args:
+            tenant: Tenant identifier
+            session_id: Session identifier
+            usage: Usage reported by the backend (may be None)
+            latency: Request latency in seconds
+        """
+        usage = usage or {}
+        now = time.time()
+        with self._lock:
+            self._touch(tenant, now)
+            targets = [self._tenants.setdefault(tenant, _empty_totals())]
+            if session_id:
+                targets.append(self._sessions.setdefault(session_id, _empty_totals()))
+            for totals in targets:
+                totals["requests"] += 1
+                totals["latency_seconds"] += latency
+                for key in ("prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens"):
+                    totals[key] += usage.get(key, 0)
+            
+            if usage.get("total_tokens"):
+                self._token_times.setdefault(tenant, deque()).append((now, usage["total_tokens"]))
+    
+    def forget_session(self, session_id: str) -> None:
+        """Drop the usage of a deleted session."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+    
+    def session_usage(self, session_id: str) -> Optional[Dict[str, float]]:
+        """Get aggregated usage of a session."""
+        with self._lock:
+            totals = self._sessions.get(session_id)
+            return dict(totals) if totals else None
+    
+    def summary(self, top: int = 20) -> Dict[str, Any]:
+        """
+        Get usage per tenant and the sessions with the highest token usage.
+        
+        Args:
+            top: Number of sessions to include
+        """
+        with self._lock:
+            tenants = {
+                tenant: dict(totals, rejected=self._rejected.get(tenant, 0))
+                for tenant, totals in self._tenants.items()
+            }
+            sessions = sorted(
+                self._sessions.items(), key=lambda item: item[1]["total_tokens"], reverse=True
+            )[:top]
+        
+        return {
+            "tenants": tenants,
+            "top_sessions": [dict(totals, session_id=sid) for sid, totals in sessions],
+            "quotas": {
+                "window_seconds": self.window_seconds,
+                "requests_per_window": self.requests_per_window,
+                "tokens_per_window": self.tokens_per_window,
+                "session_token_limit": self.session_token_limit,
+                "max_tenants": self.max_tenants,
+            },
+        }